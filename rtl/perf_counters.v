@@ -0,0 +1,70 @@
+module perf_counters (
+    input wire clk,
+    input wire reset,
+
+    // ID stage
+    input wire [31:0] id_instruction,
+    input wire stall,
+    input wire branch_flush,
+
+    // EX stage forwarding selects
+    input wire [1:0] forwardA,
+    input wire [1:0] forwardB,
+
+    // MEM stage memory accesses
+    input wire mem_MemRead,
+    input wire mem_MemWrite,
+
+    // Counter outputs
+    output reg [63:0] cycles,
+    output reg [63:0] instret,        // instructions leaving ID (branches resolve there)
+    output reg [63:0] load_use_stalls,
+    output reg [63:0] branch_flushes,
+    output reg [63:0] forwardA_mem,
+    output reg [63:0] forwardA_wb,
+    output reg [63:0] forwardB_mem,
+    output reg [63:0] forwardB_wb,
+    output reg [63:0] mem_reads,
+    output reg [63:0] mem_writes
+);
+
+    // An all-zero word in ID is a bubble (reset or if_id_flush)
+    wire id_valid = (id_instruction != 32'b0);
+
+    always @(posedge clk or posedge reset) begin
+        if (reset) begin
+            cycles <= 64'b0;
+            instret <= 64'b0;
+            load_use_stalls <= 64'b0;
+            branch_flushes <= 64'b0;
+            forwardA_mem <= 64'b0;
+            forwardA_wb <= 64'b0;
+            forwardB_mem <= 64'b0;
+            forwardB_wb <= 64'b0;
+            mem_reads <= 64'b0;
+            mem_writes <= 64'b0;
+        end
+        else begin
+            cycles <= cycles + 64'd1;
+            if (id_valid && !stall)
+                instret <= instret + 64'd1;
+            if (stall)
+                load_use_stalls <= load_use_stalls + 64'd1;
+            if (branch_flush)
+                branch_flushes <= branch_flushes + 64'd1;
+            if (forwardA == 2'b01)
+                forwardA_mem <= forwardA_mem + 64'd1;
+            if (forwardA == 2'b10)
+                forwardA_wb <= forwardA_wb + 64'd1;
+            if (forwardB == 2'b01)
+                forwardB_mem <= forwardB_mem + 64'd1;
+            if (forwardB == 2'b10)
+                forwardB_wb <= forwardB_wb + 64'd1;
+            if (mem_MemRead)
+                mem_reads <= mem_reads + 64'd1;
+            if (mem_MemWrite)
+                mem_writes <= mem_writes + 64'd1;
+        end
+    end
+
+endmodule
@@ -303,5 +303,28 @@ module pipelined_processor (
     );
     
     assign if_id_stall = stall;
+    
+    // ========== Performance Counters ==========
+    perf_counters perf (
+        .clk(clk),
+        .reset(reset),
+        .id_instruction(id_instruction),
+        .stall(stall),
+        .branch_flush(id_Branch),
+        .forwardA(forwardA),
+        .forwardB(forwardB),
+        .mem_MemRead(mem_MemRead),
+        .mem_MemWrite(mem_MemWrite),
+        .cycles(),
+        .instret(),
+        .load_use_stalls(),
+        .branch_flushes(),
+        .forwardA_mem(),
+        .forwardA_wb(),
+        .forwardB_mem(),
+        .forwardB_wb(),
+        .mem_reads(),
+        .mem_writes()
+    );
 
 endmodule
\ No newline at end of file
@@ -0,0 +1,25 @@
+"""
+RISC-V Processor Analysis Scripts
+Run any script as a subcommand with `python -m scripts <command>`. Importing
+the package is cheap: it selects the non-interactive Agg backend for
+matplotlib through the environment (without importing matplotlib) and puts
+this directory on sys.path so the scripts' sibling imports resolve; the
+scripts themselves load only when first used
+"""
+
+import importlib
+import os
+import sys
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS not in sys.path:
+    sys.path.insert(0, SCRIPTS)
+
+
+def __getattr__(name):
+    """`from scripts import pipeline_model` shares the module the scripts import"""
+    if name.startswith('_') or not os.path.exists(os.path.join(SCRIPTS, f'{name}.py')):
+        raise AttributeError(f"module 'scripts' has no attribute {name!r}")
+    return importlib.import_module(name)
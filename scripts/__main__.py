@@ -0,0 +1,47 @@
+"""
+Command-Line Entry Point of the Analysis Scripts
+`python -m scripts <command> [args]` runs scripts/<command>.py as if it were
+started directly; `python -m scripts` lists the commands. Nothing but the
+chosen script is imported, so light commands start without numpy or
+matplotlib
+"""
+
+import ast
+import os
+import runpy
+import sys
+
+from scripts import SCRIPTS
+
+
+def commands():
+    """Script names that can run as a command"""
+    return sorted(name[:-3] for name in os.listdir(SCRIPTS)
+                  if name.endswith('.py') and not name.startswith('_'))
+
+
+def summary(command):
+    """First docstring line, read without importing the script"""
+    with open(os.path.join(SCRIPTS, f'{command}.py')) as f:
+        doc = ast.get_docstring(ast.parse(f.read())) or ''
+    return doc.strip().splitlines()[0] if doc.strip() else ''
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help', 'list'):
+        print("usage: python -m scripts <command> [args]\n\ncommands:")
+        for command in commands():
+            print(f"  {command:<28} {summary(command)}")
+        return 0
+    command = argv[0].removesuffix('.py')
+    if command not in commands():
+        print(f"unknown command {command!r} (python -m scripts list)", file=sys.stderr)
+        return 2
+    sys.argv = [os.path.join(SCRIPTS, f'{command}.py')] + argv[1:]
+    runpy.run_module(command, run_name='__main__', alter_sys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
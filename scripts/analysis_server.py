@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Long-Lived Analysis Server for the Timing and Cycle Models
+Answers JSON-lines queries on stdin/stdout or a Unix socket from one warm
+process: the DELAYS table and path functions stay loaded and functional
+traces are cached, so a sweep sends thousands of delay corners or workload
+runs without a process launch each. Every line is one request, answered
+concurrently with asyncio; responses carry the request id and may arrive
+out of order
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import stat
+import sys
+from collections import OrderedDict
+
+import pipeline_model
+import workloads
+from functional_sim import FunctionalSimulator
+from images import read_image
+from pipeline_model import BRANCH_POLICIES, BYPASS_DELAYS, OP_CLASSES, clock_period
+from timing_analysis import DELAYS, multi_cycle_stages, pipelined_stages, single_cycle_paths
+
+CORE_PATHS = {
+    'single_cycle': single_cycle_paths,
+    'multi_cycle': multi_cycle_stages,
+    'pipelined': pipelined_stages,
+}
+TRACE_CACHE_SIZE = 32       # functional traces kept warm (LRU)
+SCALAR_TYPES = (int, float, str, bool)
+
+
+def corner_delays(delays=None, scale=1.0):
+    """DELAYS with overrides applied and every entry scaled"""
+    unknown = set(delays or {}) - set(DELAYS)
+    if unknown:
+        raise ValueError(f"unknown delay {', '.join(sorted(unknown))}")
+    return {name: float(value) * scale for name, value in dict(DELAYS, **(delays or {})).items()}
+
+
+def timing(delays=None, scale=1.0):
+    """{core: period, f_max and critical path or stage} at one delay corner"""
+    corner = corner_delays(delays, scale)
+    result = {}
+    for core, paths in CORE_PATHS.items():
+        totals = {name: sum(delay for _, delay in parts) for name, parts in paths(corner).items()}
+        critical = max(totals, key=totals.get)
+        result[core] = {'period': totals[critical], 'f_max': 1000 / totals[critical],
+                        'critical': critical}
+    return result
+
+
+class AnalysisServer:
+    """Query dispatcher holding the warm state shared by all connections"""
+
+    def __init__(self, cache_size=TRACE_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.traces = OrderedDict()     # key -> asyncio task building the trace
+        self.counts = {'requests': 0, 'queries': 0, 'errors': 0, 'trace_hits': 0,
+                       'trace_misses': 0}
+
+    async def trace(self, program, iterations=None, max_instructions=None):
+        """Cached trace arrays; concurrent queries for one key share one build"""
+        key = (program, iterations, max_instructions)
+        if key in self.traces:
+            self.counts['trace_hits'] += 1
+            self.traces.move_to_end(key)
+        else:
+            self.counts['trace_misses'] += 1
+            self.traces[key] = asyncio.ensure_future(
+                asyncio.to_thread(_build_trace, program, iterations, max_instructions))
+            while len(self.traces) > self.cache_size:
+                self.traces.popitem(last=False)
+        task = self.traces[key]
+        try:
+            return await asyncio.shield(task)
+        except Exception:
+            if self.traces.get(key) is task:
+                del self.traces[key]
+            raise
+
+    async def cycles(self, workload, iterations=None, max_instructions=1000000,
+                     branch_policy='rtl', bypass='mem+wb', latency=None):
+        """Scalar counters of the cycle model plus clock period and ns per instruction"""
+        if branch_policy not in BRANCH_POLICIES:
+            raise ValueError(f"unknown branch policy {branch_policy}")
+        if bypass not in BYPASS_DELAYS:
+            raise ValueError(f"unknown bypass configuration {bypass}")
+        if set(latency or {}) - set(OP_CLASSES):
+            raise ValueError(f"operation classes are {', '.join(OP_CLASSES)}")
+        trace = await self.trace(workload, iterations, max_instructions)
+        stats = await asyncio.to_thread(pipeline_model.simulate, trace, ex_latency=latency,
+                                        bypass_delay=BYPASS_DELAYS[bypass],
+                                        branch_policy=branch_policy)
+        result = {key: value for key, value in stats.items() if isinstance(value, SCALAR_TYPES)}
+        result['period'] = clock_period(latency, branch_policy)
+        result['ns_per_instruction'] = result['cpi'] * result['period']
+        return result
+
+    async def query(self, query):
+        """Answer one query dict: {'result': ...} or {'error': message}"""
+        self.counts['queries'] += 1
+        try:
+            if not isinstance(query, dict):
+                raise ValueError("query must be a JSON object")
+            op = query.get('op')
+            params = {key: value for key, value in query.items() if key != 'op'}
+            if op == 'timing':
+                return {'result': timing(**params)}
+            if op == 'cycles':
+                return {'result': await self.cycles(**params)}
+            if op == 'stats':
+                return {'result': dict(self.counts, cached_traces=len(self.traces))}
+            if op == 'ping':
+                return {'result': 'pong'}
+            raise ValueError(f"unknown op {op!r} (timing, cycles, stats, ping)")
+        except Exception as error:
+            self.counts['errors'] += 1
+            return {'error': f'{type(error).__name__}: {error}'}
+
+    async def request(self, line):
+        """Answer one request line
+
+        {"id": ..., "op": ...} is a single query; {"id": ..., "queries":
+        [...]} a batch answered as {"id": ..., "results": [...]} in query
+        order, each entry its own result or error.
+        """
+        self.counts['requests'] += 1
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+            if not isinstance(request.get('queries', []), list):
+                raise ValueError("queries must be a list")
+        except ValueError as error:
+            self.counts['errors'] += 1
+            return {'id': None, 'error': f'bad request: {error}'}
+        response = {'id': request.pop('id', None)}
+        if 'queries' in request:
+            response['results'] = await asyncio.gather(*(self.query(query)
+                                                         for query in request['queries']))
+        else:
+            response.update(await self.query(request))
+        return response
+
+    async def serve_lines(self, reader, write):
+        """Read request lines until EOF, answering each in its own task"""
+        pending = set()
+
+        async def answer(line):
+            write((json.dumps(await self.request(line)) + '\n').encode())
+
+        while line := await reader.readline():
+            if line.strip():
+                task = asyncio.create_task(answer(line))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.wait(pending)
+
+
+def _build_trace(program, iterations, max_instructions):
+    if program in workloads.WORKLOADS:
+        words = workloads.load(program, iterations)
+    else:
+        words = read_image(program)
+    return pipeline_model.trace_arrays(FunctionalSimulator(words).trace(max_instructions))
+
+
+class _FileReader:
+    """readline() of a regular file in a worker thread (no pipe transport for files)"""
+
+    def __init__(self, f):
+        self.f = f
+
+    async def readline(self):
+        return await asyncio.to_thread(self.f.readline)
+
+
+async def serve_stdio(server):
+    if stat.S_ISREG(os.fstat(sys.stdin.fileno()).st_mode):
+        reader = _FileReader(sys.stdin.buffer)
+    else:
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=2 ** 24)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+    def write(data):
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+
+    await server.serve_lines(reader, write)
+
+
+async def serve_socket(server, path):
+    async def connection(reader, writer):
+        try:
+            await server.serve_lines(reader, writer.write)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    if os.path.exists(path):
+        os.unlink(path)
+    unix = await asyncio.start_unix_server(connection, path, limit=2 ** 24)
+    print(f"Listening on {path}", file=sys.stderr)
+    async with unix:
+        await unix.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--socket', help='Unix socket path (default: stdin/stdout)')
+    parser.add_argument('--cache-size', type=int, default=TRACE_CACHE_SIZE,
+                        help='functional traces kept in memory')
+    args = parser.parse_args()
+
+    server = AnalysisServer(args.cache_size)
+    try:
+        if args.socket:
+            asyncio.run(serve_socket(server, args.socket))
+        else:
+            asyncio.run(serve_stdio(server))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
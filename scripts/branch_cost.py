@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Branch Cost Model of the Pipelined RISC-V Processor
+Times retire traces under each branch policy of the cycle model (the flush on
+every branch that hazard_detection_unit issues today, the double flush with
+ex_branch connected, and predict-not-taken resolution in ID or EX) and
+reports the cycles lost per branch, the branch share of CPI and the time
+per instruction once an ID-stage comparator is charged against f_max
+"""
+
+import argparse
+
+import numpy as np
+
+import pipeline_model
+import workloads
+from functional_sim import FunctionalSimulator
+from images import read_image
+from pipeline_model import BRANCH_POLICIES, clock_period
+
+# Control-heavy kernels first
+DEFAULT_WORKLOADS = ['branchy', 'array_sum', 'phases', 'memcpy']
+
+
+def branch_costs(trace, policies=BRANCH_POLICIES):
+    """{policy: (CPI, cycles lost per branch, period in ns)} of a trace
+
+    Lost cycles are measured against the same trace with free branches
+    (no flush and no operand delay), so they include the load-use and
+    comparator stalls a policy adds, not only squashed fetch slots.
+    """
+    branches = max(int(trace['branch'].sum()), 1)
+    free = pipeline_model.simulate(trace, branch_penalty=0)['cycles']
+    costs = {}
+    for policy in policies:
+        stats = pipeline_model.simulate(trace, branch_policy=policy)
+        costs[policy] = (stats['cpi'], (stats['cycles'] - free) / branches,
+                         clock_period(branch_policy=policy))
+    return costs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('programs', nargs='*', default=DEFAULT_WORKLOADS,
+                        help='workload names or program images')
+    parser.add_argument('--max-instructions', type=int, default=1000000)
+    args = parser.parse_args()
+
+    print("BRANCH COST MODEL")
+    print(f"\n{'Policy':<14} {'Flushes/branch':>15} {'/taken':>7} {'ID compare':>11} {'Period':>9}")
+    for policy, (every, taken, delay, in_id) in BRANCH_POLICIES.items():
+        print(f"{policy:<14} {every:>15} {taken:>7} {'yes' if in_id else 'no':>11} "
+              f"{clock_period(branch_policy=policy):>6.2f} ns")
+
+    ratios = {policy: [] for policy in BRANCH_POLICIES}
+    for name in args.programs:
+        program = workloads.load(name) if name in workloads.WORKLOADS else read_image(name)
+        sim = FunctionalSimulator(program)
+        trace = pipeline_model.trace_arrays(sim.trace(args.max_instructions))
+        n = len(trace['word'])
+        if not n:
+            continue
+        branches = int(trace['branch'].sum())
+        taken = int((trace['branch'] & trace['taken']).sum())
+        costs = branch_costs(trace)
+
+        print(f"\n{name}: {n} instructions, {branches} branches "
+              f"({100 * taken / max(branches, 1):.0f}% taken)")
+        print(f"{'Policy':<14} {'CPI':>7} {'Lost/branch':>12} {'Branch CPI':>11} "
+              f"{'ns/Instr':>9} {'Speedup':>8}")
+        base = costs['rtl'][0] * costs['rtl'][2]
+        for policy, (cpi, lost, period) in costs.items():
+            ns = cpi * period
+            ratios[policy].append(base / ns)
+            print(f"{policy:<14} {cpi:>7.3f} {lost:>12.2f} {lost * branches / n:>11.3f} "
+                  f"{ns:>9.2f} {base / ns:>7.2f}x")
+
+    if any(ratios.values()):
+        print("\nSpeedup over the RTL policy (geomean)")
+        for policy, values in ratios.items():
+            print(f"  {policy:<14} {float(np.exp(np.mean(np.log(values)))):.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Register-File Port and Bypass Utilization of the Pipelined RISC-V Processor
+Measures from retire traces how often each register-file read port is really
+needed, where every operand comes from (register array, write-through in
+register_file, WB or MEM bypass of forwarding_unit), how long results live
+before they are read, and what dropping bypass paths costs in CPI against
+the narrower forwarding mux it allows on the EX stage
+"""
+
+import argparse
+
+import numpy as np
+
+import pipeline_model
+import workloads
+from functional_sim import FunctionalSimulator
+from images import read_image
+from pipeline_model import BYPASS_DELAYS
+from riscv_isa import OP_BRANCH, OP_RTYPE, OP_STORE
+from superscalar_model import last_writers
+from timing_analysis import DELAYS, pipelined_stages
+
+SOURCES = ('x0', 'regfile', 'write-through', 'wb', 'mem', 'stale in ID')
+
+# Operand mux of each bypass configuration: RF plus the kept bypasses
+FORWARD_MUX = {'mem+wb': DELAYS['mux_4to1'], 'wb': DELAYS['mux_2to1'],
+               'write-through': 0.0, 'none': 0.0}
+
+# Producer-to-consumer distance buckets in cycles (EX of the producer to
+# EX of the consumer): 1 MEM bypass, 2 WB bypass, 3 write-through
+LIFETIME_BUCKETS = [(1, 1), (2, 2), (3, 3), (4, 7), (8, 15), (16, 63), (64, None)]
+
+
+def used_operands(trace):
+    """(reads rs1, reads rs2) masks of instructions that really use the fields"""
+    opcode = trace['opcode']
+    reads_rs2 = (opcode == OP_RTYPE) | (opcode == OP_STORE) | (opcode == OP_BRANCH)
+    return np.ones(len(opcode), dtype=bool), reads_rs2
+
+
+def operand_sources(trace, result):
+    """Source index into SOURCES and producer distance of every rs1/rs2 read
+
+    The producer is the youngest older writer; its result reaches EX of the
+    consumer `gap` cycles after its own EX ended: through the MEM bypass at
+    1, the WB bypass at 2, the register file's write-through at 3, and from
+    the array after that. Branches compare in ID with no bypass, so a branch
+    read at gap 2 or less is reported as 'stale in ID' rather than credited
+    to the write-through. Returns {'rs1'|'rs2': (source, gap, producer)}.
+    """
+    id_end, ex = result['id_end'], result['ex_cycles']
+    done = id_end + ex - 1
+    producers = dict(zip(('rs1', 'rs2'), last_writers(trace)))
+    operands = {}
+    for field, producer in producers.items():
+        has_producer = producer >= 0
+        gap = np.where(has_producer, id_end - done[np.maximum(producer, 0)], -1)
+        source = np.select([trace[field] == 0, ~has_producer | (gap > 3),
+                            gap == 3, gap == 2, gap == 1], [0, 1, 2, 3, 4], 1)
+        source = np.where(trace['branch'] & (source >= 3), 5, source)
+        operands[field] = (source, gap, producer)
+    return operands
+
+
+def lifetimes(trace, operands, used):
+    """(reads per result, never-read share, gap histogram over LIFETIME_BUCKETS)"""
+    writes = trace['reg_write'] & (trace['rd'] != 0)
+    reads = np.zeros(len(writes), dtype=np.int64)
+    gaps = []
+    for field, mask in zip(('rs1', 'rs2'), used):
+        _, gap, producer = operands[field]
+        valid = mask & (producer >= 0) & (trace[field] != 0)
+        reads += np.bincount(producer[valid], minlength=len(writes))
+        gaps.append(gap[valid])
+    gaps = np.concatenate(gaps)
+    histogram = [int(((gaps >= low) & (gaps <= (high or gaps.max(initial=low)))).sum())
+                 for low, high in LIFETIME_BUCKETS]
+    produced = int(writes.sum())
+    never = int((writes & (reads == 0)).sum())
+    return (reads[writes].mean() if produced else 0.0,
+            never / produced if produced else 0.0, histogram)
+
+
+def variants(trace):
+    """(paths, CPI, EX stage delay, clock period, ns per instruction)"""
+    stages = {name: sum(delay for _, delay in components)
+              for name, components in pipelined_stages().items()}
+    rows = []
+    for paths, delay in BYPASS_DELAYS.items():
+        stats = pipeline_model.simulate(trace, bypass_delay=delay)
+        ex = stages['EX (Execute)'] - DELAYS['mux_4to1'] + FORWARD_MUX[paths]
+        period = max(dict(stages, **{'EX (Execute)': ex}).values())
+        rows.append((paths, stats['cpi'], ex, period, stats['cpi'] * period))
+    return rows
+
+
+def _bucket(low, high):
+    if high is None:
+        return f'{low}+'
+    return str(low) if low == high else f'{low}-{high}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('programs', nargs='*', default=list(workloads.WORKLOADS),
+                        help='workload names or program images')
+    parser.add_argument('--max-instructions', type=int, default=200000)
+    args = parser.parse_args()
+
+    print("REGISTER-FILE PORT AND BYPASS UTILIZATION")
+    for name in args.programs:
+        program = workloads.load(name) if name in workloads.WORKLOADS else read_image(name)
+        sim = FunctionalSimulator(program)
+        trace = pipeline_model.trace_arrays(sim.trace(args.max_instructions))
+        n = len(trace['word'])
+        if not n:
+            continue
+        result = pipeline_model.simulate(trace)
+        used = used_operands(trace)
+        operands = operand_sources(trace, result)
+
+        print(f"\n{name}: {n} instructions")
+        print(f"{'Port':<6} {'Needed':>8} " + ''.join(f'{source:>14}' for source in SOURCES))
+        for port, (field, mask) in enumerate(zip(('rs1', 'rs2'), used), 1):
+            counts = np.bincount(operands[field][0][mask], minlength=len(SOURCES))
+            reads = max(int(mask.sum()), 1)
+            print(f"read{port:<2} {100 * mask.mean():>7.1f}% " +
+                  ''.join(f'{100 * count / reads:>13.1f}%' for count in counts))
+        print(f"Both ports needed: {100 * (used[0] & used[1]).mean():.1f}%")
+
+        per_result, never, histogram = lifetimes(trace, operands, used)
+        print(f"\nResults: {per_result:.2f} reads each, {100 * never:.1f}% never read")
+        print("Distance to read (cycles): " + ', '.join(
+            f'{_bucket(low, high)}: {count}' for (low, high), count in zip(LIFETIME_BUCKETS,
+                                                                          histogram)))
+
+        rows = variants(trace)
+        print(f"\n{'Result paths':<14} {'CPI':>7} {'EX stage':>10} {'Period':>9} "
+              f"{'ns/Instr':>9} {'Speedup':>8}")
+        base = rows[0][4]
+        for paths, cpi, ex, period, ns in rows:
+            print(f"{paths:<14} {cpi:>7.3f} {ex:>7.2f} ns {period:>6.2f} ns "
+                  f"{ns:>9.2f} {base / ns:>7.2f}x")
+        best = min(rows, key=lambda row: row[4])
+        if best[0] != 'mem+wb':
+            print(f"Recommendation: keep only {best[0]} ({base / best[4]:.2f}x)")
+        elif all(period == rows[0][3] for _, _, _, period, _ in rows):
+            print("Recommendation: keep both bypasses; EX is not the critical stage, "
+                  "so a narrower forwarding mux does not shorten the clock")
+        else:
+            print("Recommendation: keep both bypasses; the added stalls outweigh "
+                  "the shorter clock")
+
+
+if __name__ == '__main__':
+    main()
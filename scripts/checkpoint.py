@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Architectural Checkpoints for the RISC-V Processor Implementations
+Fast-forwards a program on the functional model and saves PC, register file
+and memory images that the RTL testbenches restore with $readmemh
+"""
+
+import argparse
+import json
+import os
+
+import rtl_sim
+import workloads
+from functional_sim import DMEM_SIZE, FunctionalSimulator
+from images import read_image
+from riscv_isa import read_hex, write_hex
+
+MANIFEST = 'checkpoint.json'
+IMEM_FILE = 'imem.hex'
+REGS_FILE = 'regs.hex'
+DMEM_FILE = 'dmem.hex'
+
+RESTORE_TESTBENCH = 'pipelined_checkpoint_tb.v'
+
+
+def write_registers(path, regs):
+    """Write 32 64-bit registers, one word per line, for $readmemh"""
+    with open(path, 'w') as f:
+        for value in regs:
+            f.write(f'{value:016x}\n')
+
+
+def read_registers(path):
+    """Read a register file image written by write_registers"""
+    with open(path) as f:
+        regs = [int(token, 16) for token in f.read().split()]
+    if len(regs) != 32:
+        raise ValueError(f"{path}: expected 32 registers, found {len(regs)}")
+    return regs
+
+
+def save(sim, directory, **info):
+    """Write the architectural state of a FunctionalSimulator to directory"""
+    os.makedirs(directory, exist_ok=True)
+    write_hex(os.path.join(directory, IMEM_FILE), bytes(sim.imem).rstrip(b'\0'))
+    write_registers(os.path.join(directory, REGS_FILE), sim.regs)
+    write_hex(os.path.join(directory, DMEM_FILE), sim.dmem)
+
+    manifest = dict(info, pc=sim.pc, instret=sim.instret, halted=sim.halted,
+                    imem_size=len(sim.imem), dmem_size=len(sim.dmem))
+    with open(os.path.join(directory, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load(directory):
+    """Recreate a FunctionalSimulator from a checkpoint directory"""
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    program = read_hex(os.path.join(directory, IMEM_FILE))
+    dmem = read_hex(os.path.join(directory, DMEM_FILE), manifest['dmem_size'])
+
+    sim = FunctionalSimulator(program, dmem, manifest['imem_size'], manifest['dmem_size'])
+    sim.regs[:] = read_registers(os.path.join(directory, REGS_FILE))
+    sim.pc = manifest['pc']
+    sim.instret = manifest['instret']
+    sim.halted = manifest['halted']
+    return sim
+
+
+def fast_forward(program, instructions, dmem=None):
+    """Run a program functionally for a number of instructions"""
+    sim = FunctionalSimulator(program, dmem)
+    sim.run(instructions)
+    return sim
+
+
+def plusargs(directory):
+    """Plusargs that make pipelined_checkpoint_tb resume from a checkpoint"""
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    directory = os.path.abspath(directory)
+    return {
+        'IMEM_FILE': os.path.join(directory, IMEM_FILE),
+        'REGS_FILE': os.path.join(directory, REGS_FILE),
+        'DMEM_FILE': os.path.join(directory, DMEM_FILE),
+        'PC': f"{manifest['pc']:x}",
+    }
+
+
+def restore_rtl(directory, cycles, image=None):
+    """Resume pipelined_processor from a checkpoint and return its final state"""
+    image = image or os.path.join(directory, 'pipelined_checkpoint.vvp')
+    if not os.path.exists(image):
+        rtl_sim.build('pipelined_processor', RESTORE_TESTBENCH, image)
+    args = dict(plusargs(directory), CYCLES=cycles)
+    return rtl_sim.parse_state(rtl_sim.run(image, args))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('program', help='program image ($readmemh bytes) or workload name')
+    parser.add_argument('--data', help='initial data memory image')
+    parser.add_argument('--skip', type=int, default=0,
+                        help='instructions to fast-forward before checkpointing')
+    parser.add_argument('--out', required=True, help='checkpoint directory')
+    parser.add_argument('--rtl-cycles', type=int,
+                        help='resume pipelined_processor from the checkpoint for this many cycles')
+    args = parser.parse_args()
+
+    if args.program in workloads.WORKLOADS:
+        program = workloads.load(args.program)
+    else:
+        program = read_image(args.program)
+    dmem = read_image(args.data, DMEM_SIZE, writable=True) if args.data else None
+
+    sim = fast_forward(program, args.skip, dmem)
+    manifest = save(sim, args.out, program=args.program)
+    print(f"Checkpoint written to {args.out}")
+    print(f"  Instructions skipped: {manifest['instret']}")
+    print(f"  Resume PC: 0x{manifest['pc']:x}{' (halted)' if manifest['halted'] else ''}")
+
+    print("\nRTL resume plusargs:")
+    print('  ' + ' '.join(f'+{name}={value}' for name, value in plusargs(args.out).items()))
+
+    if args.rtl_cycles:
+        state = restore_rtl(args.out, args.rtl_cycles)
+        print(f"\nRTL ran {state.get('cycles')} cycles, final PC 0x{state.get('pc', 0):x}")
+        for i, value in enumerate(state['regs']):
+            if value:
+                print(f"  x{i:<2} = {value}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Selective Waveform Dumps of the Pipelined RISC-V Processor
+Builds a pipelined testbench that dumps only the requested scopes/signals,
+runs it with a trigger window (cycle range, PC match, first stall) and
+post-processes the VCD into FST or the compact binary format of vcd.py
+"""
+
+import argparse
+import os
+import tempfile
+
+import rtl_sim
+import vcd
+import workloads
+from images import image_hex
+from riscv_isa import words_to_bytes, write_hex
+
+CORE = 'pipelined_processor'
+TESTBENCHES = {
+    # testbench: root scope name
+    'pipelined_processor_tb.v': 'pipelined_processor_tb',
+    'pipelined_checkpoint_tb.v': 'pipelined_checkpoint_tb',
+}
+
+# Named signal groups, relative to the dut instance
+SIGNAL_GROUPS = {
+    'if': ['pc', 'if_instruction', 'pc_src', 'branch_target'],
+    'id': ['id_pc', 'id_instruction', 'id_rs1', 'id_rs2', 'id_rd', 'stall',
+           'if_id_flush', 'id_ex_flush'],
+    'ex': ['ex_rs1', 'ex_rs2', 'ex_rd', 'ex_alu_input1', 'ex_alu_input2',
+           'ex_alu_result', 'forwardA', 'forwardB'],
+    'mem': ['mem_rd', 'mem_alu_result', 'mem_MemRead', 'mem_MemWrite', 'mem_read_data'],
+    'wb': ['wb_rd', 'wb_RegWrite', 'wb_write_data'],
+    'hazard': ['hazard:1'],
+    'forward': ['forward:1'],
+    'regfile': ['reg_file:1'],
+}
+
+SCOPES_FILE = 'dump_scopes.vh'
+
+
+def scope_lines(root, specs):
+    """$dumpvars calls for signal specs
+
+    A spec is a SIGNAL_GROUPS name or 'path[:depth]', where path is relative
+    to the dut unless it starts with the testbench name; depth applies to
+    module scopes (0 = everything below).
+    """
+    lines = []
+    for spec in specs:
+        for entry in SIGNAL_GROUPS.get(spec, [spec]):
+            path, _, depth = entry.partition(':')
+            if not path.startswith(root + '.'):
+                path = f'{root}.dut.{path}'
+            lines.append(f'            $dumpvars({depth or 1}, {path});')
+    return lines
+
+
+def build(testbench, specs, workdir):
+    """Compile the testbench, with a scope list when signals were requested"""
+    defines = {}
+    if specs:
+        with open(os.path.join(workdir, SCOPES_FILE), 'w') as f:
+            f.write('\n'.join(scope_lines(TESTBENCHES[testbench], specs)) + '\n')
+        defines['DUMP_SCOPES'] = None
+    image = os.path.join(workdir, testbench.replace('.v', '.vvp'))
+    return rtl_sim.build(CORE, testbench, image, defines, (workdir,))
+
+
+def window_plusargs(start=None, end=None, pc=None, on_stall=False, cycles=None):
+    """Plusargs selecting the dump window of dump_control.vh"""
+    args = {}
+    if start is not None:
+        args['DUMP_START'] = start
+    if end is not None:
+        args['DUMP_END'] = end
+    if pc is not None:
+        args['DUMP_PC'] = f'{pc:x}'
+    if on_stall:
+        args['DUMP_STALL'] = None
+    if cycles is not None:
+        args['DUMP_CYCLES'] = cycles
+    return args
+
+
+def convert(vcd_path, output, fmt):
+    """Post-process a VCD into the requested format; returns the Waveform"""
+    wave = vcd.read_vcd(vcd_path)
+    if fmt == 'compact':
+        vcd.write_compact(wave, output)
+    elif fmt == 'fst':
+        vcd.to_fst(vcd_path, output)
+    return wave
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('program', nargs='?',
+                        help='workload name or program image (default: testbench program)')
+    parser.add_argument('--iterations', type=int, help='iteration count for a workload')
+    parser.add_argument('--signals', nargs='*', default=[],
+                        help=f"groups ({', '.join(SIGNAL_GROUPS)}) or dut paths[:depth]")
+    parser.add_argument('--start', type=int, help='first cycle to dump')
+    parser.add_argument('--end', type=int, help='cycle at which dumping stops')
+    parser.add_argument('--pc', type=lambda text: int(text, 0), help='trigger on this fetch PC')
+    parser.add_argument('--on-stall', action='store_true', help='trigger on the first stall')
+    parser.add_argument('--window', type=int, help='cycles dumped after a trigger')
+    parser.add_argument('--max-cycles', type=int, default=100000)
+    parser.add_argument('--format', choices=('vcd', 'compact', 'fst'), default='vcd')
+    parser.add_argument('--output', default='pipelined_processor.vcd')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        plusargs = window_plusargs(args.start, args.end, args.pc, args.on_stall, args.window)
+        if args.program:
+            testbench = 'pipelined_checkpoint_tb.v'
+            program = os.path.join(workdir, 'program.hex')
+            if args.program in workloads.WORKLOADS:
+                write_hex(program, words_to_bytes(workloads.load(args.program, args.iterations)))
+            else:
+                program = image_hex(args.program)
+            plusargs.update(IMEM_FILE=program, CYCLES=args.max_cycles)
+        else:
+            testbench = 'pipelined_processor_tb.v'
+
+        vcd_path = args.output if args.format == 'vcd' else os.path.join(workdir, 'dump.vcd')
+        plusargs['DUMP_FILE'] = os.path.abspath(vcd_path)
+        image = build(testbench, args.signals, workdir)
+        rtl_sim.run(image, plusargs, cwd=workdir)
+
+        vcd_size = os.path.getsize(vcd_path)
+        wave = convert(vcd_path, args.output, args.format)
+
+    print("SELECTIVE WAVEFORM DUMP")
+    print(f"  Signals: {len(wave.signals)}  Value changes: {wave.change_count()}")
+    print(f"  VCD size: {vcd_size} bytes")
+    if args.format != 'vcd':
+        print(f"  {args.format.upper()} size: {os.path.getsize(args.output)} bytes "
+              f"({os.path.getsize(args.output) / vcd_size:.1%} of VCD)")
+    print(f"Generated: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+FSM State-Residency Model of the Multi-Cycle RISC-V Processor
+Replays retire traces through the state paths of fsm_controller, reports the
+cycles spent in each of its nine states and the workload CPI, and times
+alternatives to the fixed slowest-state clock: folding DECODE into FETCH and
+clocking every state for its own critical path
+"""
+
+import argparse
+from collections import Counter
+
+import numpy as np
+
+import vcd
+import workloads
+from ilp_limit import InOrderStream, program_batches, stored_batches
+from images import read_image
+from riscv_isa import OP_BRANCH, OP_ITYPE, OP_LOAD, OP_RTYPE, OP_STORE, words_to_bytes
+from timing_analysis import DELAYS, multi_cycle_stages, performance_comparison
+from trace_store import TraceStore
+
+# State encoding of fsm_controller.v
+STATES = ('FETCH', 'DECODE', 'MEMADR', 'MEMREAD', 'MEMWB',
+          'MEMWRITE', 'EXECUTE', 'ALUWRITEBACK', 'BRANCH')
+
+CLASSES = ('rtype', 'itype', 'load', 'store', 'branch', 'other')
+_OPCODES = (OP_RTYPE, OP_ITYPE, OP_LOAD, OP_STORE, OP_BRANCH)
+
+# States each instruction class walks through, as in the next-state logic.
+# DECODE has no arc for OP-IMM, so fsm_controller returns I-type (and any
+# other opcode) to FETCH without executing it.
+RTL_PATHS = {
+    'rtype': ('FETCH', 'DECODE', 'EXECUTE', 'ALUWRITEBACK'),
+    'itype': ('FETCH', 'DECODE'),
+    'load': ('FETCH', 'DECODE', 'MEMADR', 'MEMREAD', 'MEMWB'),
+    'store': ('FETCH', 'DECODE', 'MEMADR', 'MEMWRITE'),
+    'branch': ('FETCH', 'DECODE', 'BRANCH'),
+    'other': ('FETCH', 'DECODE'),
+}
+
+# Paths of a controller that executes I-type through the R-type states
+PATHS = dict(RTL_PATHS, itype=RTL_PATHS['rtype'])
+
+# Datapath step of multi_cycle_stages() each state exercises
+STATE_STAGES = {
+    'FETCH': 'FETCH',
+    'DECODE': 'DECODE',
+    'MEMADR': 'EXECUTE (ALU)',
+    'EXECUTE': 'EXECUTE (ALU)',
+    'BRANCH': 'EXECUTE (ALU)',
+    'MEMREAD': 'MEMORY',
+    'MEMWRITE': 'MEMORY',
+    'MEMWB': 'WRITEBACK',
+    'ALUWRITEBACK': 'WRITEBACK',
+}
+
+TB_STATE = 'multi_cycle_processor_tb.dut.fsm.state'
+CLOCK_PERIOD = 10              # testbench clk toggles every #5
+
+
+def class_index(trace):
+    """Index into CLASSES of every instruction of a trace batch"""
+    opcode = trace['opcode']
+    return np.select([opcode == op for op in _OPCODES], range(len(_OPCODES)), len(_OPCODES))
+
+
+def class_counts(trace):
+    """Dynamic instruction count of each class in a trace batch"""
+    counts = np.bincount(class_index(trace), minlength=len(CLASSES))
+    return dict(zip(CLASSES, counts.tolist()))
+
+
+def residency(mix, paths=PATHS):
+    """Cycles spent in each state for an instruction class mix"""
+    cycles = Counter()
+    for kind, count in mix.items():
+        for state in paths[kind]:
+            cycles[state] += count
+    return {state: cycles[state] for state in STATES}
+
+
+def state_delays():
+    """Critical path of every state in ns"""
+    stages = {name: sum(delay for _, delay in components)
+              for name, components in multi_cycle_stages().items()}
+    return {state: stages[STATE_STAGES[state]] for state in STATES}
+
+
+def merged_fetch_delay(delays):
+    """FETCH that also reads the register file with the fetched word's rs fields"""
+    return delays['FETCH'] + DELAYS['regfile_read'] + DELAYS['wire_short']
+
+
+def variants(cycles, instructions, delays=None):
+    """(name, CPI, clock in ns or None if per-state, ns per instruction)
+
+    The fixed clock runs every state at the slowest one, as in
+    analyze_multi_cycle(); a per-state clock (or a clock-enable divider
+    with a state-dependent count) pays each state's own critical path.
+    """
+    delays = delays or state_delays()
+    merged = dict(delays, FETCH=merged_fetch_delay(delays), DECODE=0.0)
+    merged_cycles = dict(cycles, DECODE=0)
+    rows = []
+    for name, state_cycles, state_delay in (('', cycles, delays),
+                                            ('DECODE in FETCH, ', merged_cycles, merged)):
+        total = sum(state_cycles.values())
+        period = max(state_delay[state] for state in STATES if state_cycles[state])
+        rows.append((f'{name}slowest-state clock', total / instructions, period,
+                     total * period / instructions))
+        per_state = sum(state_cycles[state] * state_delay[state] for state in STATES)
+        rows.append((f'{name}per-state clock', total / instructions, None,
+                     per_state / instructions))
+    return rows
+
+
+def vcd_residency(path, signal=TB_STATE, period=CLOCK_PERIOD):
+    """Cycles each state held in a multi-cycle testbench dump"""
+    wave = vcd.read_vcd(path)
+    times, values = wave.history(signal)
+    cycles = Counter()
+    for start, end, value in zip(times, times[1:] + [wave.end_time], values):
+        state = vcd.to_int(value)
+        if state is not None and state < len(STATES):
+            cycles[STATES[state]] += (end - start) // period
+    return {state: cycles[state] for state in STATES}
+
+
+def profile(batches):
+    """(class mix, in-order pipelined CPI) of a stream of trace batches"""
+    mix = Counter()
+    in_order = InOrderStream()
+    for trace, _ in batches:
+        mix.update(class_counts(trace))
+        in_order.feed(trace)
+    ipc = in_order.ipc()
+    return {kind: mix[kind] for kind in CLASSES}, 1 / ipc if ipc else 0.0
+
+
+def print_residency(cycles, delays):
+    total = sum(cycles.values())
+    print(f"\n{'State':<14} {'Cycles':>12} {'Share':>8} {'Delay':>9}")
+    for state in STATES:
+        share = 100 * cycles[state] / total if total else 0.0
+        print(f"{state:<14} {cycles[state]:>12} {share:>7.1f}% {delays[state]:>6.2f} ns")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('programs', nargs='*', default=list(workloads.WORKLOADS),
+                        help='workload names, program images, or trace names with --store')
+    parser.add_argument('--store', help='read retire traces from this trace store')
+    parser.add_argument('--vcd', help='also profile the state register of a testbench dump')
+    parser.add_argument('--rtl-paths', action='store_true',
+                        help='follow fsm_controller exactly (I-type returns to FETCH unexecuted)')
+    parser.add_argument('--compare', action='store_true',
+                        help='rerun the implementation comparison with the measured CPIs')
+    parser.add_argument('--max-instructions', type=int, default=200000)
+    args = parser.parse_args()
+
+    paths = RTL_PATHS if args.rtl_paths else PATHS
+    delays = state_delays()
+    store = TraceStore(args.store) if args.store else None
+
+    print("MULTI-CYCLE FSM STATE RESIDENCY")
+    if args.vcd:
+        cycles = vcd_residency(args.vcd)
+        print(f"\n{args.vcd}: {sum(cycles.values())} cycles")
+        print_residency(cycles, delays)
+
+    total_mix = Counter()
+    pipe_cycles = 0.0
+    for name in args.programs:
+        if store:
+            batches = stored_batches(store, name)
+        elif name in workloads.WORKLOADS:
+            batches = program_batches(words_to_bytes(workloads.load(name)), args.max_instructions)
+        else:
+            batches = program_batches(read_image(name), args.max_instructions)
+        mix, pipe_cpi = profile(batches)
+        instructions = sum(mix.values())
+        if not instructions:
+            continue
+        total_mix.update(mix)
+        pipe_cycles += pipe_cpi * instructions
+        cycles = residency(mix, paths)
+
+        shares = ', '.join(f'{kind} {100 * count / instructions:.1f}%'
+                           for kind, count in mix.items() if count)
+        print(f"\n{name}: {instructions} instructions, "
+              f"CPI {sum(cycles.values()) / instructions:.3f} ({shares})")
+        if args.rtl_paths and mix['itype']:
+            print(f"  {mix['itype']} I-type instructions skip execution in fsm_controller")
+        print_residency(cycles, delays)
+        print(f"\n{'Variant':<36} {'CPI':>6} {'Clock':>9} {'ns/Instr':>9} {'Speedup':>8}")
+        rows = variants(cycles, instructions, delays)
+        for variant, cpi, period, ns in rows:
+            clock = f'{period:.2f} ns' if period else 'per-state'
+            print(f"{variant:<36} {cpi:>6.3f} {clock:>9} {ns:>9.2f} {rows[0][3] / ns:>7.2f}x")
+
+    instructions = sum(total_mix.values())
+    if instructions:
+        mc_cpi = sum(residency(total_mix, paths).values()) / instructions
+        print(f"\nAll workloads: multi-cycle CPI {mc_cpi:.3f}, "
+              f"pipelined CPI {pipe_cycles / instructions:.3f}")
+        if args.compare:
+            print()
+            performance_comparison(pipe_cpi=pipe_cycles / instructions, mc_cpi=mc_cpi)
+
+
+if __name__ == '__main__':
+    main()
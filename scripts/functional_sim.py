@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Functional RV64I Simulator for the RISC-V Processor Implementations
+Golden reference for the RTL cores: executes programs at architectural level
+by translating basic blocks into cached, generated Python functions
+"""
+
+import argparse
+import struct
+import time
+from collections import namedtuple
+
+import workloads
+from images import read_image
+from riscv_isa import BRANCHES, decode, disassemble, words_to_bytes
+
+# Memory sizes of the pipelined core (instruction_memory / data_memory)
+IMEM_SIZE = 4096
+DMEM_SIZE = 8192
+
+MASK64 = (1 << 64) - 1
+SIGN64 = 1 << 63
+
+# Most instructions translated into one superblock
+MAX_BLOCK_LENGTH = 64
+
+# Little-endian doubleword access, as data_memory assembles LD/SD bytes
+_DOUBLEWORD = struct.Struct('<Q')
+
+Retired = namedtuple('Retired', 'pc word op rd rs1 rs2 value addr next_pc')
+
+# Expression templates per operation: {a}/{b} are source operands, {i} the immediate
+_ALU_EXPRESSIONS = {
+    'add':   '(r[{a}] + r[{b}]) & 0xFFFFFFFFFFFFFFFF',
+    'sub':   '(r[{a}] - r[{b}]) & 0xFFFFFFFFFFFFFFFF',
+    'and':   'r[{a}] & r[{b}]',
+    'or':    'r[{a}] | r[{b}]',
+    'xor':   'r[{a}] ^ r[{b}]',
+    'sll':   '(r[{a}] << (r[{b}] & 63)) & 0xFFFFFFFFFFFFFFFF',
+    'srl':   'r[{a}] >> (r[{b}] & 63)',
+    'sra':   '(((r[{a}] ^ 0x8000000000000000) - 0x8000000000000000) >> (r[{b}] & 63)) '
+             '& 0xFFFFFFFFFFFFFFFF',
+    'slt':   '1 if r[{a}] ^ 0x8000000000000000 < r[{b}] ^ 0x8000000000000000 else 0',
+    'sltu':  '1 if r[{a}] < r[{b}] else 0',
+    'addi':  '(r[{a}] + {i}) & 0xFFFFFFFFFFFFFFFF',
+    'andi':  'r[{a}] & {i}',
+    'ori':   'r[{a}] | {i}',
+    'xori':  'r[{a}] ^ {i}',
+    'slli':  '(r[{a}] << {i}) & 0xFFFFFFFFFFFFFFFF',
+    'srli':  'r[{a}] >> {i}',
+    'srai':  '(((r[{a}] ^ 0x8000000000000000) - 0x8000000000000000) >> {i}) '
+             '& 0xFFFFFFFFFFFFFFFF',
+    'slti':  '1 if r[{a}] ^ 0x8000000000000000 < {i} else 0',
+    'sltiu': '1 if r[{a}] < {i} else 0',
+}
+
+# Branch conditions; signed compares flip the sign bit to reuse unsigned order
+_BRANCH_CONDITIONS = {
+    'beq':  'r[{a}] == r[{b}]',
+    'bne':  'r[{a}] != r[{b}]',
+    'blt':  'r[{a}] ^ 0x8000000000000000 < r[{b}] ^ 0x8000000000000000',
+    'bge':  'r[{a}] ^ 0x8000000000000000 >= r[{b}] ^ 0x8000000000000000',
+    'bltu': 'r[{a}] < r[{b}]',
+    'bgeu': 'r[{a}] >= r[{b}]',
+}
+
+
+def _immediate(op, imm):
+    """Immediate operand as it appears in generated code"""
+    if op in ('andi', 'ori', 'xori', 'sltiu'):
+        return imm & MASK64
+    if op == 'slti':
+        return (imm & MASK64) ^ SIGN64
+    return imm
+
+
+def _load_wrapped(mem, addr):
+    """Doubleword at addr whose bytes wrap past the end of data memory"""
+    size = len(mem)
+    return int.from_bytes(bytes(mem[(addr + i) % size] for i in range(8)), 'little')
+
+
+def _store_wrapped(mem, addr, value):
+    size = len(mem)
+    for i, byte in enumerate(value.to_bytes(8, 'little')):
+        mem[(addr + i) % size] = byte
+
+
+def _statement(instr, dmem_mask):
+    """Python statement executing one non-branch instruction
+
+    Doubleword accesses within the last 7 bytes of data memory wrap byte by
+    byte through the *_wrapped helpers; all others use struct directly.
+    """
+    op, rd, rs1, rs2, imm = instr
+    address = f"(a := (r[{rs1}] + {imm}) & {dmem_mask}) <= {dmem_mask - 7}"
+    if op == 'sd':
+        return f"store(m, a, r[{rs2}]) if {address} else store_wrapped(m, a, r[{rs2}])"
+    if rd == 0:
+        return None  # x0 is hardwired to zero
+    if op == 'ld':
+        return f"r[{rd}] = load(m, a)[0] if {address} else load_wrapped(m, a)"
+    expression = _ALU_EXPRESSIONS[op].format(a=rs1, b=rs2, i=_immediate(op, imm))
+    return f"r[{rd}] = {expression}"
+
+
+class FunctionalSimulator:
+    """Architectural-level RV64I model of the cores' instruction subset
+
+    Registers are held as unsigned 64-bit Python ints. Instruction and data
+    memories are separate like in the pipelined core; data addresses wrap at
+    the data memory size. Execution halts at an all-zero instruction word or
+    when the PC leaves instruction memory.
+    """
+
+    def __init__(self, program, dmem=None, imem_size=IMEM_SIZE, dmem_size=DMEM_SIZE):
+        if isinstance(program, (list, tuple)):
+            program = words_to_bytes(program)
+        if len(program) > imem_size:
+            raise ValueError(f"program is {len(program)} bytes, instruction memory {imem_size}")
+        if dmem_size & (dmem_size - 1):
+            raise ValueError("data memory size must be a power of two")
+
+        # A full-size image buffer (e.g. a mapped .bin file) is used without a copy
+        if len(program) == imem_size and not isinstance(program, bytearray):
+            self.imem = memoryview(program)
+        else:
+            self.imem = bytes(program) + bytes(imem_size - len(program))
+        self.dmem = memoryview(dmem if dmem is not None else bytearray(dmem_size))
+        if len(self.dmem) != dmem_size or self.dmem.readonly:
+            raise ValueError(f"data memory must be a writable {dmem_size}-byte buffer")
+        self.dmem_mask = dmem_size - 1
+
+        self.regs = [0] * 32
+        self.pc = 0
+        self.instret = 0
+        self.halted = False
+
+        self._blocks = {}
+        self._singles = {}
+
+    def fetch(self, pc):
+        """Return the instruction word at pc, or None where execution halts"""
+        if pc < 0 or pc + 4 > len(self.imem) or pc & 3:
+            return None
+        word = int.from_bytes(self.imem[pc:pc + 4], 'little')
+        return word or None
+
+    def _translate(self, pc, max_length):
+        """Generate the source of a function executing the superblock at pc
+
+        Translation continues past conditional branches (as side exits) and
+        follows branches that are always taken, so a loop whose back edge
+        returns to the block start becomes a single in-place while loop.
+        """
+        start = pc
+        items = []
+        visited = set()
+        count = 0
+        loops = False
+        while count < max_length and pc not in visited:
+            word = self.fetch(pc)
+            if word is None:
+                break
+            visited.add(pc)
+            instr = decode(word)
+            count += 1
+            if instr.op not in BRANCHES:
+                stmt = _statement(instr, self.dmem_mask)
+                if stmt is not None:
+                    items.append(stmt)
+                pc += 4
+                continue
+
+            taken = pc + instr.imm
+            if instr.rs1 == instr.rs2:
+                # Comparing a register with itself: unconditional
+                pc = taken if instr.op in ('beq', 'bge', 'bgeu') else pc + 4
+                if pc == start:
+                    loops = True
+                    break
+                continue
+            condition = _BRANCH_CONDITIONS[instr.op].format(a=instr.rs1, b=instr.rs2)
+            if taken == start:
+                items.append((f'not ({condition})', pc + 4, count))
+                loops = True
+                break
+            items.append((condition, taken, count))
+            pc += 4
+
+        if count == 0:
+            return None, 0
+
+        indent = '        ' if loops else '    '
+        lines = ['def block(r, m, budget):']
+        if loops:
+            lines += ['    n = 0', '    while True:']
+        for item in items:
+            if isinstance(item, str):
+                lines.append(indent + item)
+            else:
+                condition, target, executed = item
+                done = f'n + {executed}' if loops else executed
+                lines += [f'{indent}if {condition}:', f'{indent}    return {target}, {done}']
+        if loops:
+            lines += [f'        n += {count}',
+                      '        if n >= budget:',
+                      f'            return {start}, n']
+        else:
+            lines.append(f'    return {pc}, {count}')
+        return '\n'.join(lines), count
+
+    def _compile(self, pc, max_length, cache):
+        source, _ = self._translate(pc, max_length)
+        if source is None:
+            cache[pc] = None
+            return None
+        namespace = {'load': _DOUBLEWORD.unpack_from, 'store': _DOUBLEWORD.pack_into,
+                     'load_wrapped': _load_wrapped, 'store_wrapped': _store_wrapped}
+        exec(compile(source, f'<block 0x{pc:x}>', 'exec'), namespace)
+        cache[pc] = namespace['block']
+        return cache[pc]
+
+    def run(self, max_instructions=None, profile=None):
+        """Execute until halt or until exactly max_instructions have retired
+
+        Returns the number of instructions retired. Superblocks are used
+        while the remaining budget exceeds one block; the tail of a bounded
+        run is single-stepped so the run stops on the exact instruction.
+        If a profile dict is given, the instructions executed from each block
+        entry PC are accumulated into it (a basic-block vector).
+        """
+        blocks = self._blocks
+        singles = self._singles
+        regs = self.regs
+        mem = self.dmem
+        pc = self.pc
+        limit = float('inf') if max_instructions is None else max_instructions
+        executed = 0
+
+        while executed < limit:
+            remaining = limit - executed
+            if remaining > MAX_BLOCK_LENGTH:
+                block = blocks.get(pc, False)
+                if block is False:
+                    block = self._compile(pc, MAX_BLOCK_LENGTH, blocks)
+                budget = remaining - MAX_BLOCK_LENGTH
+            else:
+                block = singles.get(pc, False)
+                if block is False:
+                    block = self._compile(pc, 1, singles)
+                budget = 1
+            if block is None:
+                self.halted = True
+                break
+            entry = pc
+            pc, n = block(regs, mem, budget)
+            executed += n
+            if profile is not None:
+                profile[entry] = profile.get(entry, 0) + n
+
+        self.pc = pc
+        self.instret += executed
+        return executed
+
+    def step(self):
+        """Execute a single instruction and return its Retired record"""
+        pc = self.pc
+        word = self.fetch(pc)
+        if word is None:
+            self.halted = True
+            return None
+        block = self._singles.get(pc, False)
+        if block is False:
+            block = self._compile(pc, 1, self._singles)
+
+        op, rd, rs1, rs2, imm = decode(word)
+        addr = None
+        if op in ('ld', 'sd'):
+            addr = (self.regs[rs1] + imm) & self.dmem_mask
+        next_pc, _ = block(self.regs, self.dmem, 1)
+        self.pc = next_pc
+        self.instret += 1
+        return Retired(pc, word, op, rd, rs1, rs2, self.regs[rd] if rd else 0, addr, next_pc)
+
+    def trace(self, max_instructions=None):
+        """Yield a Retired record for every instruction executed"""
+        count = 0
+        while max_instructions is None or count < max_instructions:
+            record = self.step()
+            if record is None:
+                return
+            count += 1
+            yield record
+
+
+def format_retired(record):
+    """One-line text form of a Retired record"""
+    addr = '-' if record.addr is None else f'{record.addr:x}'
+    return (f'{record.pc:08x} {record.word:08x} {record.rd:2d} '
+            f'{record.value:016x} {addr:>4} {disassemble(record.word)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('program', help='instruction memory image ($readmemh bytes) '
+                                        'or a workload name from workloads.py')
+    parser.add_argument('--data', help='data memory image ($readmemh bytes)')
+    parser.add_argument('--max-instructions', type=int)
+    parser.add_argument('--trace', action='store_true', help='print every retired instruction')
+    args = parser.parse_args()
+
+    if args.program in workloads.WORKLOADS:
+        program = workloads.load(args.program)
+    else:
+        program = read_image(args.program)
+    dmem = read_image(args.data, DMEM_SIZE, writable=True) if args.data else None
+    sim = FunctionalSimulator(program, dmem)
+
+    start = time.perf_counter()
+    if args.trace:
+        for record in sim.trace(args.max_instructions):
+            print(format_retired(record))
+    else:
+        sim.run(args.max_instructions)
+    elapsed = time.perf_counter() - start
+
+    print("\nRegister Values:")
+    for i in range(0, 32, 4):
+        print('  ' + '  '.join(f'x{j:<2} = {sim.regs[j]:016x}' for j in range(i, i + 4)))
+    print(f"\nInstructions retired: {sim.instret}")
+    print(f"Final PC: 0x{sim.pc:x} ({'halted' if sim.halted else 'budget reached'})")
+    if elapsed > 0:
+        print(f"Simulation rate: {sim.instret / elapsed / 1e6:.2f} MIPS")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,84 +1,168 @@
 #!/usr/bin/env python3
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from matplotlib.patches import FancyBboxPatch
+import argparse
+import os
+
+import numpy as np
+
+import pipeline_model
+import workloads
+from functional_sim import FunctionalSimulator
+from images import read_image
+from riscv_isa import assemble, disassemble
+
+# matplotlib loads on the first drawing call; the cycle-model helpers that
+# other scripts import from here do not need it
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+# Stage colors
+STAGE_COLORS = {
+    'IF': '#90EE90',
+    'ID': '#FFFACD',
+    'EX': '#FFB6C1',
+    'MEM': '#B0E0E6',
+    'WB': '#DDA0DD',
+    'STALL': '#FFFF99',
+    'FLUSH': '#FF9999',
+}
+
+# Windows up to this many cycles get cell text, grid lines and row labels
+DETAIL_CYCLES = 40
+
+# Larger windows are rasterized to at most this many pixel columns and rows
+RASTER_SIZE = (1600, 900)
+
+# Five independent instructions: the ideal, hazard-free pipeline fill
+IDEAL_PROGRAM = """
+    addi x1, x0, 1
+    addi x2, x0, 2
+    addi x3, x0, 3
+    addi x4, x0, 4
+    addi x5, x0, 5
+"""
+
+
+def simulate_program(program, max_instructions=None):
+    """Functional trace plus cycle-model timing of a program"""
+    trace = pipeline_model.trace_arrays(FunctionalSimulator(program).trace(max_instructions))
+    return trace, pipeline_model.simulate(trace)
+
+
+def draw_occupancy(ax, trace, result, start=0, end=None, row_labels=None):
+    """Draw the pipeline diagram of cycles [start, end) on ax
+
+    Every stage is one PolyCollection built from a vertex array, so the cost
+    grows with the number of cells but not with per-patch Python objects.
+    Windows beyond DETAIL_CYCLES are binned into a RASTER_SIZE image
+    instead, so cells narrower than a pixel stay visible; stalls and
+    flushes are painted last so hazards win their pixel.
+    """
+    from matplotlib.collections import PolyCollection
+    from matplotlib.colors import to_rgb
+
+    cells, instructions = pipeline_model.occupancy(result, trace, start, end)
+    if end is None:
+        end = max((int(c.max()) + 1 for c, _ in cells.values() if len(c)), default=start + 1)
+    detail = end - start <= DETAIL_CYCLES
+
+    if not detail:
+        width = min(end - start, RASTER_SIZE[0])
+        height = max(min(len(instructions), RASTER_SIZE[1]), 1)
+        image = np.ones((height, width, 3))
+        for stage in sorted(cells, key=lambda stage: stage in ('STALL', 'FLUSH')):
+            cycles, rows = cells[stage]
+            image[rows * height // max(len(instructions), 1),
+                  (cycles - start) * width // (end - start)] = to_rgb(STAGE_COLORS[stage])
+        ax.imshow(image, extent=(start - 0.5, end - 0.5, -len(instructions) + 0.5, 0.5),
+                  aspect='auto', interpolation='nearest')
+
+    for stage, (cycles, rows) in cells.items():
+        if not len(cycles) or not detail:
+            continue
+        x0, x1 = cycles - 0.4, cycles + 0.4
+        y0, y1 = -rows - 0.3, -rows + 0.3
+        verts = np.stack([np.column_stack([x0, y0]), np.column_stack([x0, y1]),
+                          np.column_stack([x1, y1]), np.column_stack([x1, y0])], axis=1)
+        ax.add_collection(PolyCollection(verts, facecolors=STAGE_COLORS[stage],
+                                         edgecolors='black', linewidths=1.0))
+        for x, y in zip(cycles, rows):
+            ax.text(x, -y, stage, ha='center', va='center', fontsize=8, weight='bold')
+
+    ax.set_xlim(start - 0.6, end - 0.4)
+    ax.set_ylim(-len(instructions) + 0.4, 0.6)
+    ax.set_xlabel('Cycle', fontsize=10, weight='bold')
+    if detail:
+        for i in range(start, end):
+            ax.axvline(x=i - 0.5, color='gray', linewidth=0.5, linestyle=':', alpha=0.5)
+        if row_labels is None:
+            row_labels = ['(flushed)' if index < 0 else disassemble(int(trace['word'][index]))
+                          for index in instructions]
+        ax.set_yticks(-np.arange(len(instructions)))
+        ax.set_yticklabels(row_labels, fontsize=9, family='monospace')
+        ax.set_xticks(range(start, end))
+    else:
+        ax.set_yticks([])
+    for side in ('top', 'right'):
+        ax.spines[side].set_visible(False)
+    return cells
+
+
+def draw_pipeline_timing(program=None, start=0, cycles=None, title=None,
+                         max_instructions=None):
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Patch
+
+    if program is None:
+        program = assemble(IDEAL_PROGRAM)
+        title = title or 'Pipeline Timing Diagram - Ideal Case (No Hazards)'
+    trace, result = simulate_program(program, max_instructions)
+    end = None if cycles is None else start + cycles
 
-def draw_pipeline_timing():
     fig, ax = plt.subplots(figsize=(14, 8))
-    ax.set_xlim(-1, 10)
-    ax.set_ylim(0, 6.5)
-    ax.axis('off')
-    
-    # Title
-    ax.text(4.5, 6.2, 'Pipeline Timing Diagram - Ideal Case (No Hazards)',
-           fontsize=14, weight='bold', ha='center')
-    
-    # Stage colors
-    colors = {
-        'IF': '#90EE90',
-        'ID': '#FFFACD',
-        'EX': '#FFB6C1',
-        'MEM': '#B0E0E6',
-        'WB': '#DDA0DD'
-    }
-    
-    # Time labels (cycles)
-    for i in range(9):
-        ax.text(i, 5.7, f'T{i}', ha='center', fontsize=10, weight='bold')
-        ax.axvline(x=i-0.5, color='gray', linewidth=0.5, linestyle=':', alpha=0.5)
-    
-    # Instructions
-    instructions = ['I1', 'I2', 'I3', 'I4', 'I5']
-    stage_names = ['IF', 'ID', 'EX', 'MEM', 'WB']
-    
-    for instr_idx, instr in enumerate(instructions):
-        y_pos = 5 - instr_idx * 0.8
-        
-        # Instruction label
-        ax.text(-0.7, y_pos, instr, fontsize=11, weight='bold', ha='center')
-        
-        # Draw stages
-        for stage_idx, stage in enumerate(stage_names):
-            x_pos = instr_idx + stage_idx
-            if x_pos < 9:  # Don't draw beyond the timeline
-                box = FancyBboxPatch((x_pos - 0.4, y_pos - 0.3),
-                                    0.8, 0.6,
-                                    boxstyle="round,pad=0.02",
-                                    edgecolor='black',
-                                    facecolor=colors[stage],
-                                    linewidth=1.5)
-                ax.add_patch(box)
-                ax.text(x_pos, y_pos, stage, ha='center', va='center',
-                       fontsize=9, weight='bold')
-    
+    ax.set_title(title or f'Pipeline Occupancy (cycles {start}-{end or result["cycles"]})',
+                 fontsize=14, weight='bold')
+    draw_occupancy(ax, trace, result, start, end)
+
     # Performance metrics box
-    metrics_text = ("Throughput: 1 instruction/cycle (after fill)\n"
-                   "Latency: 5 cycles per instruction\n"
-                   "Pipeline Speedup: ~5x (ideal)")
-    ax.text(7.5, 1.5, metrics_text, fontsize=10,
-           bbox=dict(boxstyle='round,pad=0.8', facecolor='lightyellow',
-                    edgecolor='black', linewidth=2),
-           verticalalignment='top')
-    
+    metrics_text = (f"Instructions: {result['instructions']}\n"
+                    f"Cycles: {result['cycles']} (CPI {result['cpi']:.2f})\n"
+                    f"Load-use stalls: {result['stalls']}\n"
+                    f"Branch flushes: {result['flushes']}\n"
+                    f"Forwarding events: {result['forwards']}")
+    ax.text(1.01, 0.02, metrics_text, transform=ax.transAxes, fontsize=10,
+            bbox=dict(boxstyle='round,pad=0.8', facecolor='lightyellow',
+                      edgecolor='black', linewidth=2),
+            verticalalignment='bottom')
+
     # Stage legend
-    legend_y = 0.5
-    for idx, (stage, color) in enumerate(colors.items()):
-        x_pos = idx * 1.5
-        box = FancyBboxPatch((x_pos - 0.3, legend_y - 0.15),
-                            0.6, 0.3,
-                            boxstyle="round,pad=0.02",
-                            edgecolor='black',
-                            facecolor=color,
-                            linewidth=1.5)
-        ax.add_patch(box)
-        ax.text(x_pos, legend_y, stage, ha='center', va='center',
-               fontsize=9, weight='bold')
-    
+    ax.legend(handles=[Patch(facecolor=color, edgecolor='black', label=stage)
+                       for stage, color in STAGE_COLORS.items()],
+              loc='upper left', bbox_to_anchor=(1.01, 1.0), fontsize=9)
+
     plt.tight_layout()
     return fig
 
+
 if __name__ == '__main__':
-    fig = draw_pipeline_timing()
-    fig.savefig('pipeline_timing.png', dpi=300, bbox_inches='tight')
-    print("Generated: pipeline_timing.png")
-    plt.close()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Pipeline occupancy diagram from a cycle-model trace')
+    parser.add_argument('program', nargs='?',
+                        help='workload name or program image (default: ideal 5-instruction case)')
+    parser.add_argument('--iterations', type=int, help='iteration count for a workload')
+    parser.add_argument('--start', type=int, default=0, help='first cycle of the window')
+    parser.add_argument('--cycles', type=int, help='window length in cycles')
+    parser.add_argument('--max-instructions', type=int)
+    parser.add_argument('--output', default='pipeline_timing.png')
+    args = parser.parse_args()
+
+    program = None
+    title = None
+    if args.program in workloads.WORKLOADS:
+        program = workloads.load(args.program, args.iterations)
+        title = f'Pipeline Occupancy - {args.program}'
+    elif args.program:
+        program = read_image(args.program)
+        title = f'Pipeline Occupancy - {args.program}'
+
+    fig = draw_pipeline_timing(program, args.start, args.cycles, title, args.max_instructions)
+    fig.savefig(args.output, dpi=300 if args.cycles is None or args.cycles <= DETAIL_CYCLES else 150,
+                bbox_inches='tight')
+    print(f"Generated: {args.output}")
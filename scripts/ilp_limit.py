@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Out-of-Order Window Limit Study
+Streams retire traces through dataflow-limited out-of-order machines with
+finite scheduler windows and reorder buffers and reports the achievable IPC
+next to the in-order pipelined_processor, to bound the ILP available in each
+workload
+"""
+
+import argparse
+import heapq
+import itertools
+from collections import deque
+
+import numpy as np
+
+import pipeline_model
+import workloads
+from functional_sim import FunctionalSimulator
+from images import read_image
+from riscv_isa import OP_BRANCH, OP_RTYPE, OP_STORE, words_to_bytes
+from trace_store import TraceStore, _decode_arrays
+
+# Issue-to-result latency of each functional unit class (cycles)
+LATENCIES = {'alu': 1, 'load': 2, 'store': 1, 'branch': 1}
+KINDS = ('alu', 'load', 'store', 'branch')
+
+WINDOWS = [4, 8, 16, 32, 64, 128, None]     # scheduler entries (None: unbounded)
+ROBS = [16, 32, 64, 128, 256, None]         # reorder buffer entries
+DISPATCH_WIDTH = 16                         # wide enough that window and ROB bind
+BATCH = 65536                               # instructions decoded per step
+
+
+def batch_fields(trace, addr=None):
+    """Per-instruction lists the window model consumes
+
+    Unlike the in-order model, only the registers an instruction really
+    reads are dependencies. Without addresses (stored traces) loads do not
+    wait for older stores.
+    """
+    opcode = trace['opcode']
+    kind = np.select([trace['load'], opcode == OP_STORE, trace['branch']], [1, 2, 3], 0)
+    uses_rs2 = (opcode == OP_RTYPE) | (opcode == OP_STORE) | (opcode == OP_BRANCH)
+    dst = np.where(trace['reg_write'], trace['rd'], 0)
+    if addr is None:
+        addr = np.full(len(opcode), -1)
+    return (trace['rs1'].tolist(), np.where(uses_rs2, trace['rs2'], 0).tolist(),
+            dst.tolist(), kind.tolist(), list(addr))
+
+
+class WindowMachine:
+    """Dataflow machine with in-order dispatch and retirement
+
+    Instruction i dispatches no earlier than cycle dispatch[i - width] + 1,
+    once the entry of instruction i - rob has retired and while fewer than
+    `window` older instructions are still waiting to issue (the window-th
+    largest issue time so far, kept in a min-heap). It issues when its
+    register and store-to-load dependencies are ready and retires in order.
+    State is bounded by the window, ROB and width, so traces of any length
+    can be streamed through feed(). A width of None removes the dispatch
+    and retire limits; with no window and ROB either, that machine is the
+    pure dataflow limit.
+    """
+
+    def __init__(self, window=None, rob=None, width=DISPATCH_WIDTH, latencies=LATENCIES):
+        self.window = window
+        self.rob = rob
+        self.width = width
+        self.latency = [latencies[kind] for kind in KINDS]
+        self.reg_ready = [0] * 32
+        self.store_ready = {}
+        self.waiting = []                                   # issue times, min-heap
+        # An unbounded width keeps the oldest dispatch and retire slot at -1
+        self.dispatched = deque([-1] * (width or 1), maxlen=width or None)
+        self.retired = deque([0] * (rob or 1), maxlen=rob or 1)
+        self.retire_widths = deque([-1] * (width or 1), maxlen=width or None)
+        self.last_retire = 0
+        self.instructions = 0
+
+    def feed(self, fields):
+        rs1s, rs2s, dsts, kinds, addrs = fields
+        reg_ready, store_ready, latency = self.reg_ready, self.store_ready, self.latency
+        waiting, window, rob = self.waiting, self.window, self.rob
+        dispatched, retired, retire_widths = self.dispatched, self.retired, self.retire_widths
+        last_retire = self.last_retire
+        maxlen = self.width
+        for rs1, rs2, dst, kind, addr in zip(rs1s, rs2s, dsts, kinds, addrs):
+            dispatch = dispatched[0] + 1
+            if rob and retired[0] > dispatch:
+                dispatch = retired[0]
+            if window and len(waiting) == window and waiting[0] > dispatch:
+                dispatch = waiting[0]
+
+            issue = max(dispatch, reg_ready[rs1], reg_ready[rs2])
+            if kind == 1 and addr in store_ready and store_ready[addr] > issue:
+                issue = store_ready[addr]
+            complete = issue + latency[kind]
+            if dst:
+                reg_ready[dst] = complete
+            if kind == 2 and addr >= 0:
+                store_ready[addr] = complete
+
+            last_retire = max(last_retire, complete, retire_widths[0] + 1)
+            if maxlen:
+                dispatched.append(dispatch)
+                retire_widths.append(last_retire)
+            retired.append(last_retire)
+            if window:
+                if len(waiting) < window:
+                    heapq.heappush(waiting, issue)
+                elif issue > waiting[0]:
+                    heapq.heapreplace(waiting, issue)
+        self.last_retire = last_retire
+        self.instructions += len(rs1s)
+
+    def ipc(self):
+        return self.instructions / self.last_retire if self.last_retire else 0.0
+
+
+class InOrderStream:
+    """pipeline_model.simulate over a stream of trace batches"""
+
+    def __init__(self):
+        self.previous = None
+        self.id_end = 0
+        self.instructions = 0
+
+    def feed(self, trace):
+        if self.previous is not None:
+            trace = {key: np.concatenate((self.previous[key], values))
+                     for key, values in trace.items()}
+        id_end = pipeline_model.simulate(trace)['id_end']
+        self.id_end += int(id_end[-1] - (id_end[0] if self.previous is not None else 0))
+        self.instructions += len(id_end) - (self.previous is not None)
+        self.previous = {key: values[-1:] for key, values in trace.items()}
+
+    def ipc(self):
+        cycles = self.id_end + pipeline_model.PIPELINE_DEPTH - 1
+        return self.instructions / cycles if self.instructions else 0.0
+
+
+def program_batches(program, max_instructions=None):
+    """(trace arrays, store-to-load addresses) batches of a functional run"""
+    records = FunctionalSimulator(program).trace(max_instructions)
+    while True:
+        batch = list(itertools.islice(records, BATCH))
+        if not batch:
+            return
+        addr = [-1 if r.addr is None else r.addr for r in batch]
+        yield pipeline_model.trace_arrays(batch), addr
+
+
+def stored_batches(store, name):
+    """Trace batches of a trace-store artifact (no memory addresses)"""
+    for entry in store.manifest(name)['chunks']:
+        yield _decode_arrays(store.get_chunk(entry['digest'])), None
+
+
+def study(batches, windows=WINDOWS, robs=ROBS, width=DISPATCH_WIDTH, latencies=LATENCIES):
+    """IPC of every (window, rob) machine, the dataflow limit and the in-order core
+
+    Returns ({(window, rob): IPC}, dataflow IPC, in-order IPC) from one
+    pass. The dataflow limit has no window, ROB or width bound.
+    """
+    machines = {(window, rob): WindowMachine(window, rob, width, latencies)
+                for window in windows for rob in robs
+                if rob is None or window is not None and window <= rob}
+    machines['dataflow'] = WindowMachine(None, None, None, latencies)
+    in_order = InOrderStream()
+    for trace, addr in batches:
+        fields = batch_fields(trace, addr)
+        for machine in machines.values():
+            machine.feed(fields)
+        in_order.feed(trace)
+    ipc = {config: machine.ipc() for config, machine in machines.items()}
+    return ipc, ipc.pop('dataflow'), in_order.ipc()
+
+
+def _size(value):
+    return 'inf' if value is None else str(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('programs', nargs='*', default=list(workloads.WORKLOADS),
+                        help='workload names, program images, or trace names with --store')
+    parser.add_argument('--store', help='read retire traces from this trace store')
+    parser.add_argument('--windows', nargs='+', type=int, help='scheduler sizes (0: unbounded)')
+    parser.add_argument('--robs', nargs='+', type=int, help='ROB sizes (0: unbounded)')
+    parser.add_argument('--width', type=int, default=DISPATCH_WIDTH,
+                        help='dispatch and retire width')
+    parser.add_argument('--latency', nargs=2, action='append', default=[],
+                        metavar=('UNIT', 'CYCLES'), help=f"override ({', '.join(KINDS)})")
+    parser.add_argument('--max-instructions', type=int, default=200000)
+    args = parser.parse_args()
+
+    latencies = dict(LATENCIES)
+    for unit, cycles in args.latency:
+        if unit not in latencies:
+            parser.error(f"unknown unit {unit}")
+        latencies[unit] = int(cycles)
+    windows = [size or None for size in args.windows] if args.windows else WINDOWS
+    robs = [size or None for size in args.robs] if args.robs else ROBS
+    store = TraceStore(args.store) if args.store else None
+
+    print("OUT-OF-ORDER WINDOW LIMIT STUDY")
+    print(f"  Dispatch/retire width: {args.width}  Latencies: "
+          + ', '.join(f'{unit} {cycles}' for unit, cycles in latencies.items()))
+    for name in args.programs:
+        if store:
+            batches = stored_batches(store, name)
+        elif name in workloads.WORKLOADS:
+            batches = program_batches(words_to_bytes(workloads.load(name)), args.max_instructions)
+        else:
+            batches = program_batches(read_image(name), args.max_instructions)
+        ipc, dataflow, in_order = study(batches, windows, robs, args.width, latencies)
+
+        print(f"\n{name}: in-order pipelined IPC {in_order:.3f}, "
+              f"width-{args.width} limit {ipc.get((None, None), max(ipc.values())):.3f}, "
+              f"dataflow limit {dataflow:.3f}")
+        print('Window \\ ROB'.rjust(14) + ''.join(f'{_size(rob):>8}' for rob in robs))
+        for window in windows:
+            cells = [f"{ipc[(window, rob)]:>8.3f}" if (window, rob) in ipc else f"{'':>8}"
+                     for rob in robs]
+            print(f"{_size(window):>14}" + ''.join(cells))
+
+
+if __name__ == '__main__':
+    main()
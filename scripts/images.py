@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Binary Program and Data Images
+Keeps program and data images as raw little-endian binary files that the
+Python tools map with mmap instead of parsing $readmemh text, and converts
+them to hex lazily, only for the address range a simulator memory covers
+"""
+
+import argparse
+import hashlib
+import mmap
+import os
+
+from riscv_isa import read_hex, write_hex
+from rtl_sim import ROOT
+
+BINARY_SUFFIX = '.bin'
+HEX_CACHE = os.path.join(ROOT, 'build', 'hex_cache')
+
+
+def is_binary(path):
+    return path.endswith(BINARY_SUFFIX)
+
+
+def map_image(path, writable=False):
+    """memoryview of a binary image file, mapped rather than read
+
+    A writable view is copy-on-write: stores (e.g. SD in the functional
+    model) stay private to the process and never reach the file.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return memoryview(bytearray())
+        access = mmap.ACCESS_COPY if writable else mmap.ACCESS_READ
+        return memoryview(mmap.mmap(f.fileno(), 0, access=access))
+
+
+def read_image(path, size=None, writable=False):
+    """Program or data image from a .bin file (mapped) or a $readmemh file
+
+    A binary image of exactly `size` bytes (or any size when size is None)
+    is returned as the mapped view itself, with no copy; shorter images
+    are copied into a zero-padded buffer.
+    """
+    if not is_binary(path):
+        return read_hex(path, size)
+    view = map_image(path, writable)
+    if size is None or len(view) == size:
+        return view
+    if len(view) > size:
+        raise ValueError(f"{path}: {len(view)} bytes, memory holds {size}")
+    data = bytearray(size)
+    data[:len(view)] = view
+    return data
+
+
+def write_image(path, data):
+    """Write a byte image as a binary file"""
+    with open(path, 'wb') as f:
+        f.write(memoryview(data).cast('B'))
+
+
+def image_hex(path, start=0, end=None, cache=HEX_CACHE):
+    """Path of a $readmemh file for bytes [start, end) of an image
+
+    Hex images are returned unchanged. Binary images are converted on first
+    use into a cache keyed by file identity and range, so only the slice a
+    testbench memory loads is ever formatted.
+    """
+    if not is_binary(path):
+        return os.path.abspath(path)
+    stat = os.stat(path)
+    key = f'{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}:{start}:{end}'
+    target = os.path.join(cache, hashlib.sha256(key.encode()).hexdigest()[:24] + '.hex')
+    if not os.path.exists(target):
+        os.makedirs(cache, exist_ok=True)
+        temporary = f'{target}.{os.getpid()}.tmp'
+        write_hex(temporary, map_image(path), start=start, end=end)
+        os.replace(temporary, target)
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('input', help='image to convert (.bin or $readmemh hex)')
+    parser.add_argument('output', help='.bin or hex file to write')
+    parser.add_argument('--start', type=lambda text: int(text, 0), default=0,
+                        help='first byte address to convert to hex')
+    parser.add_argument('--end', type=lambda text: int(text, 0),
+                        help='end byte address (exclusive) to convert to hex')
+    args = parser.parse_args()
+
+    data = read_image(args.input)
+    if is_binary(args.output):
+        write_image(args.output, data)
+    else:
+        write_hex(args.output, data, start=args.start, end=args.end)
+    print(f"Converted {len(data)} bytes: {args.input} -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Memory-System Model of the Multi-Cycle RISC-V Processor
+Replays the fetch and data address streams of the multi-cycle core against
+variants of unified_memory (the single IorD-muxed port, a dual-port array,
+word-interleaved banks and a fetch line buffer) and reports port and bank
+conflicts, the fetch cycles each variant overlaps with data accesses, and
+the resulting time per instruction next to the pipelined core
+"""
+
+import argparse
+
+import numpy as np
+
+import fsm_model
+import workloads
+from ilp_limit import InOrderStream, program_batches
+from images import read_image
+from riscv_isa import OP_STORE, words_to_bytes
+from timing_analysis import DELAYS, pipelined_stages
+
+DATA_BASE = 4096      # unified_memory loads data_memory.hex at byte 4096
+WORD_BYTES = 8        # width of the memory array's data read
+
+# (name, kind, parameter) of the organizations compared by default
+ORGANIZATIONS = [
+    ('unified', 'unified', None),
+    ('dual-port', 'dual', None),
+    ('2 banks', 'banked', 2),
+    ('4 banks', 'banked', 4),
+    ('8B line buffer', 'line', 8),
+    ('16B line buffer', 'line', 16),
+]
+
+
+def access_stream(trace, addr, data_base=DATA_BASE):
+    """Data accesses of a trace batch and the fetch that could overlap each
+
+    The overlap candidate of a load or store is the fetch of the next
+    sequential instruction, issued into a prefetch register during the
+    MEMREAD or MEMWRITE cycle instead of in the next FETCH state. Returns
+    (data addresses, fetch addresses, own fetch addresses) of the memory
+    instructions.
+    """
+    memory = trace['load'] | (trace['opcode'] == OP_STORE)
+    pc = trace['pc'][memory]
+    data = np.asarray(addr, dtype=np.int64)[memory] + data_base
+    return data, pc + 4, pc
+
+
+def conflicts(kind, parameter, data, fetch, own):
+    """(port conflicts, bank conflicts, overlapped fetches) of one organization
+
+    A port conflict is a fetch that has to wait for the single array port,
+    a bank conflict one whose word lives in the bank the data access uses.
+    The line buffer keeps the line of the last fetch, so the next fetch is
+    served without the port when it falls in the same line.
+    """
+    n = len(data)
+    if kind == 'unified':
+        return n, 0, 0
+    if kind == 'dual':
+        return 0, 0, n
+    if kind == 'banked':
+        same = (fetch // WORD_BYTES) % parameter == (data // WORD_BYTES) % parameter
+        blocked = int(same.sum())
+        return 0, blocked, n - blocked
+    if kind == 'line':
+        hits = int((fetch // parameter == own // parameter).sum())
+        return n - hits, 0, hits
+    raise ValueError(f"unknown memory organization {kind}")
+
+
+def state_delays(kind):
+    """fsm_model state delays with the extra muxing an organization adds"""
+    delays = fsm_model.state_delays()
+    if kind == 'banked':
+        for state in ('FETCH', 'MEMREAD', 'MEMWRITE'):
+            delays[state] += DELAYS['mux_4to1']       # bank select
+    elif kind == 'line':
+        delays['FETCH'] += DELAYS['mux_2to1']         # buffer or array
+    return delays
+
+
+def pipelined_time(cpi):
+    period = max(sum(delay for _, delay in components)
+                 for components in pipelined_stages().values())
+    return cpi * period
+
+
+def study(batches, organizations=ORGANIZATIONS, data_base=DATA_BASE):
+    """Per-organization counters and ns per instruction over a batch stream
+
+    A stream that retires nothing (empty or halting-at-entry image) returns
+    no rows and no pipelined figures.
+    """
+    counts = {name: np.zeros(3, dtype=np.int64) for name, _, _ in organizations}
+    mix = dict.fromkeys(fsm_model.CLASSES, 0)
+    in_order = InOrderStream()
+    accesses = 0
+    for trace, addr in batches:
+        data, fetch, own = access_stream(trace, addr, data_base)
+        accesses += len(data)
+        for name, kind, parameter in organizations:
+            counts[name] += conflicts(kind, parameter, data, fetch, own)
+        for kind, count in fsm_model.class_counts(trace).items():
+            mix[kind] += count
+        in_order.feed(trace)
+
+    instructions = sum(mix.values())
+    if instructions == 0:
+        return 0, accesses, [], (None, None)
+    cycles = fsm_model.residency(mix)
+    rows = []
+    for name, kind, parameter in organizations:
+        port, bank, overlapped = counts[name].tolist()
+        delays = state_delays(kind)
+        period = max(delay for state, delay in delays.items() if cycles[state])
+        total = sum(cycles.values()) - overlapped
+        rows.append((name, port, bank, overlapped, total / instructions,
+                     total * period / instructions))
+    pipe_cpi = 1 / in_order.ipc()
+    return instructions, accesses, rows, (pipe_cpi, pipelined_time(pipe_cpi))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('programs', nargs='*', default=list(workloads.WORKLOADS),
+                        help='workload names or program images')
+    parser.add_argument('--banks', nargs='+', type=int, default=[],
+                        help='also model these bank counts')
+    parser.add_argument('--lines', nargs='+', type=int, default=[],
+                        help='also model line buffers of these sizes in bytes')
+    parser.add_argument('--data-base', type=lambda text: int(text, 0), default=DATA_BASE,
+                        help='byte address of data memory inside the unified array')
+    parser.add_argument('--max-instructions', type=int, default=200000)
+    args = parser.parse_args()
+
+    organizations = (ORGANIZATIONS +
+                     [(f'{banks} banks', 'banked', banks) for banks in args.banks] +
+                     [(f'{size}B line buffer', 'line', size) for size in args.lines])
+
+    print("MULTI-CYCLE MEMORY-SYSTEM MODEL")
+    for name in args.programs:
+        if name in workloads.WORKLOADS:
+            batches = program_batches(words_to_bytes(workloads.load(name)), args.max_instructions)
+        else:
+            batches = program_batches(read_image(name), args.max_instructions)
+        instructions, accesses, rows, (pipe_cpi, pipe_ns) = study(batches, organizations,
+                                                                  args.data_base)
+        if not instructions:
+            continue
+
+        print(f"\n{name}: {instructions} instructions, {accesses} data accesses")
+        print(f"{'Organization':<18} {'Port':>8} {'Bank':>8} {'Overlap':>8} "
+              f"{'CPI':>7} {'ns/Instr':>9} {'Speedup':>8}")
+        base = rows[0][5]
+        for organization, port, bank, overlapped, cpi, ns in rows:
+            print(f"{organization:<18} {port:>8} {bank:>8} {overlapped:>8} "
+                  f"{cpi:>7.3f} {ns:>9.2f} {base / ns:>7.2f}x")
+        print(f"{'pipelined':<18} {'':>8} {'':>8} {'':>8} "
+              f"{pipe_cpi:>7.3f} {pipe_ns:>9.2f} {base / pipe_ns:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
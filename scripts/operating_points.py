@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Operating-Point Sweep of the Three Processor Implementations
+Evaluates the single-cycle, multi-cycle and pipelined cores over a grid of
+clock frequencies, supply voltages (scaling every delay by the alpha-power
+law) and workload mixes in one broadcast NumPy expression, and prints the
+Pareto frontiers of throughput against energy per instruction and area
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import fsm_model
+import pipeline_model
+import workloads
+from functional_sim import FunctionalSimulator
+from images import read_image
+from pipeline_registers import BUFFER_CAP, FLOP_CLOCK_CAP, VDD, register_costs, tree_buffers
+from riscv_isa import OP_STORE
+from timing_analysis import multi_cycle_stages, pipelined_stages, single_cycle_paths
+
+CORES = ('single_cycle', 'multi_cycle', 'pipelined')
+
+VOLTAGES = np.round(np.arange(0.60, 1.101, 0.05), 2)     # V
+FREQUENCIES = np.arange(25, 501, 25)                      # MHz
+
+# Alpha-power delay model, normalized to the DELAYS table at VDD
+VT = 0.35                 # threshold voltage (V)
+ALPHA = 1.3               # velocity saturation index
+
+# Core state beyond the 32 x 64-bit register file (flops); the pipelined
+# core's pipeline registers are read from the RTL by pipeline_registers
+REGFILE_FLOPS = 32 * 64
+STATE_FLOPS = {
+    'single_cycle': 64,                                 # PC
+    'multi_cycle': 64 + 32 + 64 + 64 + 64 + 64 + 4,     # PC, IR, MDR, A, B, ALUOut, state
+}
+
+# Combinational logic area (um^2), memories excluded: ALU, PC and branch
+# adders, decode and control, forwarding and hazard units
+LOGIC_AREA = {
+    'single_cycle': 3000 + 2 * 1500 + 600,
+    'multi_cycle': 3000 + 800 + 400,
+    'pipelined': 3000 + 2 * 1500 + 600 + 900,
+}
+FLOP_AREA = 5.0                 # um^2, as in pipeline_registers
+SWITCHED_CAP_PER_UM2 = 0.01     # fF of logic switched per cycle per um^2 (with activity)
+MEMORY_ACCESS_ENERGY = 2.0      # pJ per instruction or data memory access at VDD
+LEAKAGE_PER_UM2 = 2e-9          # W per um^2 at VDD
+
+
+def core_flops():
+    pipelined = sum(cost['flops'] for _, _, cost in register_costs().values())
+    return {core: REGFILE_FLOPS + STATE_FLOPS.get(core, pipelined) for core in CORES}
+
+
+def core_areas():
+    flops = core_flops()
+    return np.array([flops[core] * FLOP_AREA + LOGIC_AREA[core] for core in CORES])
+
+
+def nominal_periods():
+    """Clock period (ns) of every core at VDD"""
+    tables = (single_cycle_paths(), multi_cycle_stages(), pipelined_stages())
+    return np.array([max(sum(delay for _, delay in parts) for parts in table.values())
+                     for table in tables])
+
+
+def delay_scale(voltages):
+    def delay(v):
+        return v / (v - VT) ** ALPHA
+    return delay(np.asarray(voltages, dtype=float)) / delay(VDD)
+
+
+def switched_cap():
+    """Capacitance (fF) switched every cycle: clock pins and trees plus logic"""
+    flops = core_flops()
+    return np.array([flops[core] * FLOP_CLOCK_CAP + tree_buffers(flops[core]) * BUFFER_CAP +
+                     LOGIC_AREA[core] * SWITCHED_CAP_PER_UM2 for core in CORES])
+
+
+def workload_mix(name, max_instructions=200000):
+    """(CPI of each core, memory accesses per instruction) of a workload or image"""
+    program = workloads.load(name) if name in workloads.WORKLOADS else read_image(name)
+    sim = FunctionalSimulator(program)
+    trace = pipeline_model.trace_arrays(sim.trace(max_instructions))
+    n = len(trace['word'])
+    mix = fsm_model.class_counts(trace)
+    cpi = [1.0, sum(fsm_model.residency(mix).values()) / n,
+           pipeline_model.simulate(trace)['cpi']]
+    data = int((trace['load'] | (trace['opcode'] == OP_STORE)).sum())
+    return np.array(cpi), 1 + data / n
+
+
+def sweep(cpi, accesses, voltages=VOLTAGES, frequencies=FREQUENCIES):
+    """Throughput and energy over the full grid
+
+    cpi is (cores, mixes), accesses (mixes,). Returns MIPS, pJ per
+    instruction and a feasibility mask, each (cores, mixes, voltages,
+    frequencies); a point is feasible when the clock period covers the
+    core's critical path at that voltage.
+    """
+    v = np.asarray(voltages, dtype=float)[None, None, :, None]
+    f = np.asarray(frequencies, dtype=float)[None, None, None, :]
+    cpi = np.asarray(cpi, dtype=float)[:, :, None, None]
+    accesses = np.asarray(accesses, dtype=float)[None, :, None, None]
+    period = nominal_periods()[:, None, None, None] * delay_scale(v)
+    shape = np.broadcast_shapes(period.shape, cpi.shape, f.shape)
+    feasible = np.broadcast_to(1000 / f >= period - 1e-9, shape)
+
+    mips = np.broadcast_to(f / cpi, shape)
+    dynamic = cpi * switched_cap()[:, None, None, None] * v ** 2 / 1000
+    memory = accesses * MEMORY_ACCESS_ENERGY * (v / VDD) ** 2
+    leakage = LEAKAGE_PER_UM2 * core_areas()[:, None, None, None] * v / VDD * cpi / f * 1e6
+    energy = dynamic + memory + leakage
+    return mips, np.broadcast_to(energy, shape), feasible
+
+
+def pareto(throughput, cost):
+    """Indices of points no other point beats on both higher throughput and lower cost"""
+    order = np.lexsort((cost, -throughput))
+    best = np.minimum.accumulate(cost[order])
+    keep = np.concatenate(([True], cost[order][1:] < best[:-1]))
+    return order[keep]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('programs', nargs='*', default=list(workloads.WORKLOADS),
+                        help='workload names or program images')
+    parser.add_argument('--voltages', nargs='+', type=float, help='supply voltages (V)')
+    parser.add_argument('--frequencies', nargs='+', type=float, help='clock frequencies (MHz)')
+    parser.add_argument('--max-instructions', type=int, default=200000)
+    args = parser.parse_args()
+    voltages = np.array(args.voltages) if args.voltages else VOLTAGES
+    frequencies = np.array(args.frequencies) if args.frequencies else FREQUENCIES
+
+    mixes = [workload_mix(name, args.max_instructions) for name in args.programs]
+    cpi = np.stack([mix[0] for mix in mixes], axis=1)
+    accesses = np.array([mix[1] for mix in mixes])
+
+    start = time.perf_counter()
+    mips, energy, feasible = sweep(cpi, accesses, voltages, frequencies)
+    elapsed = time.perf_counter() - start
+    areas = core_areas()
+
+    print("OPERATING-POINT SWEEP")
+    print(f"  {feasible.size} points ({len(CORES)} cores x {len(mixes)} mixes x "
+          f"{len(voltages)} voltages x {len(frequencies)} frequencies) in {elapsed * 1e3:.2f} ms")
+    print(f"\n{'Core':<14} {'Period @VDD':>12} {'Area':>11}")
+    for core, period, area in zip(CORES, nominal_periods(), areas):
+        print(f"{core:<14} {period:>9.2f} ns {area:>7.0f} um2")
+
+    cores, volts, freqs = np.meshgrid(np.arange(len(CORES)), voltages, frequencies, indexing='ij')
+    for m, name in enumerate(args.programs):
+        ok = feasible[:, m]
+        throughput, cost = mips[:, m][ok], energy[:, m][ok]
+        print(f"\n{name}: CPI " + ', '.join(f'{core} {cpi[c, m]:.2f}'
+                                            for c, core in enumerate(CORES)))
+        print(f"{'MIPS':>8} {'pJ/Instr':>9} {'Core':<14} {'V':>5} {'MHz':>6}")
+        for i in pareto(throughput, cost):
+            print(f"{throughput[i]:>8.1f} {cost[i]:>9.2f} {CORES[cores[ok][i]]:<14} "
+                  f"{volts[ok][i]:>5.2f} {freqs[ok][i]:>6.0f}")
+
+        peak = np.where(ok, mips[:, m], 0).reshape(len(CORES), -1).max(axis=1)
+        frontier = pareto(peak, areas)
+        print(f"{'Peak MIPS':>9} {'Area':>11} {'Core':<14} Frontier")
+        for c, core in enumerate(CORES):
+            print(f"{peak[c]:>9.1f} {areas[c]:>7.0f} um2 {core:<14} "
+                  f"{'yes' if c in frontier else 'no'}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Hardware Performance Counter Collector for the Pipelined RISC-V Processor
+Reads the perf_counters block of pipelined_processor from a vvp run (PERF
+lines printed by the testbench) or a Verilator model and checks the counts
+against the cycle model
+"""
+
+import argparse
+import os
+import re
+import tempfile
+
+import numpy as np
+
+import pipeline_model
+import rtl_sim
+import workloads
+from functional_sim import FunctionalSimulator
+from images import read_image
+from riscv_isa import OP_LOAD, OP_STORE, words_to_bytes, write_hex
+
+# Port order of rtl/perf_counters.v
+COUNTERS = (
+    'cycles', 'instret', 'load_use_stalls', 'branch_flushes',
+    'forwardA_mem', 'forwardA_wb', 'forwardB_mem', 'forwardB_wb',
+    'mem_reads', 'mem_writes',
+)
+
+TESTBENCH = 'pipelined_checkpoint_tb.v'
+
+_PERF_LINE = re.compile(r'^PERF (\w+) (\d+)$')
+
+
+def parse(output):
+    """Counter values from the PERF lines of a testbench run"""
+    counters = {}
+    for line in output.splitlines():
+        match = _PERF_LINE.match(line.strip())
+        if match:
+            counters[match.group(1)] = int(match.group(2))
+    return counters
+
+
+def from_verilator(core):
+    """Counter values of a VerilatedCore running pipelined_processor"""
+    return dict(zip(COUNTERS, core.read_counters()))
+
+
+def derived(counters):
+    """CPI, forwarding total and memory access rate from raw counts"""
+    instret = counters.get('instret') or 0
+    forwards = sum(counters.get(name, 0) for name in COUNTERS[4:8])
+    return {
+        'cpi': counters['cycles'] / instret if instret else 0.0,
+        'forwards': forwards,
+        'mem_per_instr': (counters.get('mem_reads', 0) + counters.get('mem_writes', 0)) /
+                         instret if instret else 0.0,
+    }
+
+
+def model_counters(program, max_instructions=None, dmem=None):
+    """Counts the cycle model predicts for the same program
+
+    'cycles' is the model's completion time, while the RTL keeps counting
+    until the testbench sees the pipeline drain, so the two can differ by a
+    few cycles.
+    """
+    sim = FunctionalSimulator(program, dmem)
+    trace = pipeline_model.trace_arrays(sim.trace(max_instructions))
+    result = pipeline_model.simulate(trace)
+    opcode = trace['opcode']
+    counters = {name: result[name] for name in COUNTERS[4:8]}
+    counters.update(
+        cycles=result['cycles'],
+        instret=result['instructions'],
+        load_use_stalls=result['stalls'],
+        branch_flushes=result['flushes'],
+        mem_reads=int(np.sum(opcode == OP_LOAD)),
+        mem_writes=int(np.sum(opcode == OP_STORE)),
+    )
+    return counters
+
+
+def run_vvp(program_hex, max_cycles, workdir):
+    """Run a program image on the checkpoint testbench and collect its counters"""
+    image = rtl_sim.build('pipelined_processor', TESTBENCH,
+                          os.path.join(workdir, 'perf.vvp'))
+    return parse(rtl_sim.run(image, {'IMEM_FILE': program_hex, 'CYCLES': max_cycles}))
+
+
+def run_verilator(program, max_cycles):
+    """Run a program on the Verilator model and collect its counters"""
+    import verilator_sim
+
+    library = verilator_sim.build('pipelined_processor')
+    with verilator_sim.VerilatedCore('pipelined_processor', library) as core:
+        core.load_program(program)
+        core.reset()
+        core.run(max_cycles)
+        return from_verilator(core)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('program', nargs='?', default='tb_program',
+                        help='workload name or program image')
+    parser.add_argument('--iterations', type=int, help='iteration count for a workload')
+    parser.add_argument('--backend', choices=('vvp', 'verilator'), default='vvp')
+    parser.add_argument('--max-cycles', type=int, default=1000000)
+    args = parser.parse_args()
+
+    if args.program in workloads.WORKLOADS:
+        program = words_to_bytes(workloads.load(args.program, args.iterations))
+    else:
+        program = read_image(args.program)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.backend == 'vvp':
+            program_hex = os.path.join(workdir, 'program.hex')
+            write_hex(program_hex, program)
+            counters = run_vvp(program_hex, args.max_cycles, workdir)
+        else:
+            counters = run_verilator(program, args.max_cycles)
+    if not counters:
+        raise SystemExit("no PERF counters in the simulation output")
+    expected = model_counters(program)
+
+    print(f"PERFORMANCE COUNTERS ({args.backend})")
+    print(f"\n{'Counter':<18} {'RTL':>12} {'Model':>12}")
+    for name in COUNTERS:
+        rtl = counters.get(name)
+        flag = '' if name == 'cycles' or rtl == expected[name] else '  <-- differs'
+        print(f"{name:<18} {rtl if rtl is not None else '-':>12} {expected[name]:>12}{flag}")
+
+    stats = derived(counters)
+    print(f"\nCPI: {stats['cpi']:.3f}  Forwards: {stats['forwards']}  "
+          f"Memory accesses/instr: {stats['mem_per_instr']:.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Cycle Model of the Pipelined RISC-V Processor
+Trace-driven timing of pipelined_processor: reproduces the load-use stalls of
+hazard_detection_unit, the branch flushes in ID and the MEM/WB bypasses of
+forwarding_unit for a retire trace from the functional simulator
+"""
+
+import argparse
+
+import numpy as np
+
+import workloads
+from functional_sim import FunctionalSimulator
+from riscv_isa import OP_BRANCH, OP_ITYPE, OP_LOAD, OP_RTYPE
+from timing_analysis import DELAYS, pipelined_stages
+
+PIPELINE_DEPTH = 5
+STAGES = ('IF', 'ID', 'EX', 'MEM', 'WB')
+
+# Bubbles inserted by hazard_detection_unit
+LOAD_USE_PENALTY = 1   # stall + id_ex_flush while the load is in EX
+BRANCH_PENALTY = 1     # if_id_flush whenever a branch is in ID
+
+# Extra cycles a dependent instruction waits in ID when only some of the
+# result paths exist: the MEM and WB bypasses of forwarding_unit, the
+# write-through of register_file, or none of them
+BYPASS_DELAYS = {'mem+wb': 0, 'wb': 1, 'write-through': 2, 'none': 3}
+
+# Branch handling: (flushes after every branch, flushes after a taken
+# branch, extra cycles a branch waits for its operands, comparator in ID).
+# Each flush squashes branch_penalty fetch slots. 'rtl' is
+# hazard_detection_unit as instantiated (ex_branch tied low); with
+# ex_branch connected the branch flushes again from EX. The resolve
+# policies predict not taken: in ID a comparator reads forwarded operands
+# one cycle earlier than EX would, in EX the ALU zero flag decides and two
+# wrong-path slots are squashed.
+BRANCH_POLICIES = {
+    'rtl': (1, 0, 0, False),
+    'double-flush': (2, 0, 0, False),
+    'resolve-id': (0, 1, 1, True),
+    'resolve-ex': (0, 2, 0, False),
+}
+
+# EX-stage operation classes by funct3 (loads and stores use the adder for
+# their address) and the DELAYS entry of each unit; alu.v does all of them
+# in one cycle. Shifts are costed like the adder (log-depth barrel shifter).
+OP_CLASSES = ('add', 'logic', 'shift', 'compare')
+_CLASS_BY_FUNCT3 = np.array([0, 2, 3, 3, 1, 2, 1, 1])
+UNIT_DELAYS = {'add': 'alu_add', 'logic': 'alu_logic', 'shift': 'alu_add',
+               'compare': 'alu_compare'}
+
+
+def trace_arrays(records):
+    """Convert Retired records into the arrays the cycle model works on"""
+    records = list(records)
+    pc = np.fromiter((r.pc for r in records), dtype=np.int64, count=len(records))
+    word = np.fromiter((r.word for r in records), dtype=np.int64, count=len(records))
+    next_pc = np.fromiter((r.next_pc for r in records), dtype=np.int64, count=len(records))
+    return decode_fields(pc, word, next_pc)
+
+
+def decode_fields(pc, word, next_pc):
+    """Derive the raw instruction fields hazard_detection_unit looks at
+
+    The hazard and forwarding units compare the rs1/rs2/rd bit fields of the
+    instruction word whether or not the instruction uses them, so the model
+    does the same.
+    """
+    opcode = word & 0x7F
+    return {
+        'pc': pc,
+        'word': word,
+        'opcode': opcode,
+        'rd': (word >> 7) & 0x1F,
+        'rs1': (word >> 15) & 0x1F,
+        'rs2': (word >> 20) & 0x1F,
+        'load': opcode == OP_LOAD,
+        'branch': opcode == OP_BRANCH,
+        'reg_write': (opcode == OP_RTYPE) | (opcode == OP_ITYPE) | (opcode == OP_LOAD),
+        'taken': next_pc != pc + 4,
+    }
+
+
+def op_classes(trace):
+    """Index into OP_CLASSES of the EX unit each instruction uses"""
+    funct3 = (trace['word'] >> 12) & 0x7
+    alu = (trace['opcode'] == OP_RTYPE) | (trace['opcode'] == OP_ITYPE)
+    return np.where(alu, _CLASS_BY_FUNCT3[funct3], 0)
+
+
+def ex_cycles(trace, ex_latency):
+    """EX-stage cycles of every instruction for {class: cycles} latencies"""
+    latency = np.array([ex_latency.get(name, 1) for name in OP_CLASSES])
+    # Branches resolve in ID and never occupy EX
+    return np.where(trace['branch'], 1, latency[op_classes(trace)])
+
+
+def clock_period(ex_latency=None, branch_policy='rtl'):
+    """Pipelined clock period (ns) with EX units split over several cycles
+
+    The ALU slot of the EX stage becomes the slowest per-cycle slice of any
+    unit; a branch policy that compares in ID adds a comparator after the
+    register file read. The other stages are unchanged.
+    """
+    ex_latency = ex_latency or {}
+    alu = max(DELAYS[UNIT_DELAYS[name]] / ex_latency.get(name, 1) for name in OP_CLASSES)
+    stages = pipelined_stages()
+    stages['EX (Execute)'] = [(component, alu if component == 'ALU Operation' else delay)
+                              for component, delay in stages['EX (Execute)']]
+    if BRANCH_POLICIES[branch_policy][3]:
+        read = [component for component, _ in stages['ID (Instruction Decode)']].index(
+            'Register File Read')
+        stages['ID (Instruction Decode)'].insert(read + 1,
+                                                 ('Branch Comparator', DELAYS['alu_compare']))
+    return max(sum(delay for _, delay in components) for components in stages.values())
+
+
+def _interlock(trace, ex, load_use_penalty, flushed, bypass_delay=0, branch_delay=0):
+    """ID-exit cycles when some EX units take more than one cycle
+
+    Extends hazard_detection_unit: an instruction waits in ID until every
+    older writer of its raw rs1/rs2 fields can forward (ex cycles after
+    issue, plus the load-use penalty for loads or the bypass delay if that
+    is longer, plus branch_delay for a branch), and until it cannot finish
+    EX before the previous instruction in EX (single write port, in-order
+    writeback). flushed is the number of fetch slots squashed after each
+    instruction. Returns (id_end, stall cycles).
+    """
+    n = len(ex)
+    rd, rs1, rs2 = trace['rd'].tolist(), trace['rs1'].tolist(), trace['rs2'].tolist()
+    writes = (trace['reg_write'] & (trace['rd'] != 0)).tolist()
+    ready = (ex + np.maximum(trace['load'] * load_use_penalty, bypass_delay)).tolist()
+    branch = trace['branch'].tolist()
+    flushed = flushed.tolist()
+    ex = ex.tolist()
+
+    id_end = [0] * n
+    stall = [0] * n
+    writer = [-1] * 32
+    previous = 0
+    last_ex = -1                      # latest instruction that went through EX
+    for i in range(n):
+        earliest = previous + 1 + (flushed[i - 1] if i else 0)
+        t = earliest
+        extra = branch_delay if branch[i] else 0
+        for j in (writer[rs1[i]], writer[rs2[i]]):
+            if j >= 0 and id_end[j] + ready[j] + extra > t:
+                t = id_end[j] + ready[j] + extra
+        if not branch[i] and last_ex >= 0 and id_end[last_ex] + ex[last_ex] - ex[i] + 1 > t:
+            t = id_end[last_ex] + ex[last_ex] - ex[i] + 1
+        id_end[i] = previous = t
+        stall[i] = t - earliest
+        if writes[i]:
+            writer[rd[i]] = i
+        if not branch[i]:
+            last_ex = i
+    return np.array(id_end, dtype=np.int64), np.array(stall, dtype=np.int64)
+
+
+def _shift(values, distance, fill):
+    """values delayed by `distance` instructions (the older instruction's value)"""
+    shifted = np.full_like(values, fill)
+    if distance < len(values):
+        shifted[distance:] = values[:len(values) - distance]
+    return shifted
+
+
+def simulate(trace, load_use_penalty=LOAD_USE_PENALTY, branch_penalty=BRANCH_PENALTY,
+             ex_latency=None, bypass_delay=0, branch_policy='rtl'):
+    """Compute the pipeline timing of a trace
+
+    With single-cycle EX units every penalty depends only on an instruction
+    and its predecessor, so the cycle in which each instruction leaves ID is
+    a prefix sum over 1 + penalty. ex_latency ({OP_CLASSES name: cycles})
+    makes units multi-cycle (pipelined) and bypass_delay removes bypass
+    paths (see BYPASS_DELAYS); both, like a branch policy with an operand
+    delay (see BRANCH_POLICIES), switch to the sequential interlock model
+    of _interlock. Returns a dict of counters plus the per-instruction
+    'if_start', 'id_start' and 'id_end' cycles, 'ex_cycles' (MEM/WB follow
+    EX), 'stall' flags, 'flushed' wrong-path slots and 'forwardA'/'forwardB'
+    selects.
+    """
+    n = len(trace['word'])
+    rd, rs1, rs2 = trace['rd'], trace['rs1'], trace['rs2']
+
+    prev_rd = _shift(rd, 1, 0)
+    every, taken, branch_delay, _ = BRANCH_POLICIES[branch_policy]
+    flushed = trace['branch'] * (every + taken * trace['taken']) * branch_penalty
+    penalty = _shift(flushed, 1, 0)
+    ex = ex_cycles(trace, ex_latency or {})
+    if bypass_delay or branch_delay or ex_latency and ex.max(initial=1) > 1:
+        id_end, stall_cycles = _interlock(trace, ex, load_use_penalty, flushed,
+                                          bypass_delay, branch_delay)
+    else:
+        prev_load = _shift(trace['load'], 1, False)
+        stall = prev_load & (prev_rd != 0) & ((prev_rd == rs1) | (prev_rd == rs2))
+        stall_cycles = stall * load_use_penalty
+        id_end = np.cumsum(1 + stall_cycles + penalty)
+    stall = stall_cycles > 0
+    id_start = id_end - stall_cycles
+    if_start = np.where(penalty > 0, _shift(id_end, 1, 0) + penalty,
+                        _shift(id_start, 1, -1))
+    if_start[0] = 0
+    if_start = np.minimum(if_start, id_start - 1)
+
+    # forwarding_unit: producer in MEM (EX distance 1) wins over WB (distance 2);
+    # a multi-cycle producer reaches EX/MEM ex_cycles - 1 cycles later
+    gap1 = id_end - _shift(id_end + ex - 1, 1, -10)
+    gap2 = id_end - _shift(id_end + ex - 1, 2, -10)
+    write1 = _shift(trace['reg_write'], 1, False) & (prev_rd != 0)
+    rd2 = _shift(rd, 2, 0)
+    write2 = _shift(trace['reg_write'], 2, False) & (rd2 != 0)
+
+    def sources(rs):
+        from_mem = write1 & (prev_rd == rs) & (gap1 == 1)
+        from_wb = ~from_mem & ((write1 & (prev_rd == rs) & (gap1 == 2)) |
+                               (write2 & (rd2 == rs) & (gap2 == 2)))
+        return from_mem, from_wb
+
+    # Branches and stall bubbles leave ID/EX flushed, so they never forward
+    live = ~trace['branch']
+    a_mem, a_wb = sources(rs1)
+    b_mem, b_wb = sources(rs2)
+    a_mem, a_wb, b_mem, b_wb = (x & live for x in (a_mem, a_wb, b_mem, b_wb))
+
+    cycles = int(id_end[-1] + ex[-1]) + PIPELINE_DEPTH - 2 if n else 0
+    return {
+        'instructions': n,
+        'branch_penalty': branch_penalty,
+        'branch_policy': branch_policy,
+        'cycles': cycles,
+        'cpi': cycles / n if n else 0.0,
+        'stalls': int(stall.sum()),
+        'stall_cycles': int(stall_cycles.sum()),
+        'flushes': int((flushed > 0).sum()),
+        'flush_cycles': int(flushed.sum()),
+        'forwards': int((a_mem | a_wb | b_mem | b_wb).sum()),
+        'forwardA_mem': int(a_mem.sum()),
+        'forwardA_wb': int(a_wb.sum()),
+        'forwardB_mem': int(b_mem.sum()),
+        'forwardB_wb': int(b_wb.sum()),
+        'if_start': if_start,
+        'id_start': id_start,
+        'id_end': id_end,
+        'ex_cycles': ex,
+        'stall': stall,
+        'flushed': flushed,
+        'forwardA': a_mem * 1 + a_wb * 2,   # forwarding_unit encoding: 01 MEM, 10 WB
+        'forwardB': b_mem * 1 + b_wb * 2,
+    }
+
+
+def _spans(starts, lengths, rows):
+    """Expand per-row [start, start + length) cycle ranges into cells"""
+    lengths = np.maximum(lengths, 0)
+    total = int(lengths.sum())
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + offsets, np.repeat(rows, lengths)
+
+
+def occupancy(result, trace, start=0, end=None):
+    """Pipeline diagram cells for the cycle window [start, end)
+
+    Returns (cells, instructions): cells maps each of STAGES plus 'STALL'
+    (instruction held in ID by a load-use hazard) and 'FLUSH' (wrong-path
+    fetch squashed by if_id_flush) to (cycles, rows) arrays; instructions
+    is the trace index of every row, -1 for flushed fetches. Only the
+    instructions overlapping the window are expanded.
+    """
+    if_start, id_start, id_end = result['if_start'], result['id_start'], result['id_end']
+    end = int(id_end[-1]) + PIPELINE_DEPTH if end is None else end
+    first = int(np.searchsorted(id_end + 3, start))
+    last = int(np.searchsorted(if_start, end))
+    index = np.arange(first, last)
+
+    branch = trace['branch'][first:last]
+    if 'flushed' in result:
+        wrong_path = result['flushed'][first:last]
+    else:
+        wrong_path = branch * result.get('branch_penalty', BRANCH_PENALTY)
+    rows = index - first + np.concatenate(([0], np.cumsum(wrong_path)[:-1]))
+
+    cells = {}
+    cells['IF'] = _spans(if_start[first:last], id_start[first:last] - if_start[first:last], rows)
+    cells['STALL'] = _spans(id_start[first:last], id_end[first:last] - id_start[first:last], rows)
+    cells['ID'] = (id_end[first:last], rows)
+    # Branches are removed by id_ex_flush and never reach EX
+    live = ~branch
+    ex_end = id_end[first:last][live]
+    if 'ex_cycles' in result:
+        ex = result['ex_cycles'][first:last][live]
+        cells['EX'] = _spans(ex_end + 1, ex, rows[live])
+        ex_end = ex_end + ex - 1
+    else:
+        cells['EX'] = (ex_end + 1, rows[live])
+    for offset, stage in enumerate(('MEM', 'WB'), start=2):
+        cells[stage] = (ex_end + offset, rows[live])
+    flush_cycles, _ = _spans(id_end[first:last], wrong_path, rows)
+    flush_rows, _ = _spans(rows + 1, wrong_path, rows)
+    cells['FLUSH'] = (flush_cycles, flush_rows)
+
+    for name, (cycles, cell_rows) in cells.items():
+        keep = (cycles >= start) & (cycles < end)
+        cells[name] = (cycles[keep], cell_rows[keep])
+
+    instructions = np.full(int(rows[-1]) + 1 if len(rows) else 0, -1)
+    instructions[rows] = index
+    return cells, instructions
+
+
+def steady_state_cpi(result, warmup):
+    """CPI of the instructions after the first `warmup` ones (no fill cost)"""
+    id_end = result['id_end']
+    measured = len(id_end) - warmup
+    if measured <= 0:
+        raise ValueError("no instructions after warm-up")
+    start = id_end[warmup - 1] if warmup else 0
+    return float(id_end[-1] - start) / measured
+
+
+def run_program(program, max_instructions=None, dmem=None, **options):
+    """Run a program functionally and time its retire trace"""
+    sim = FunctionalSimulator(program, dmem)
+    return simulate(trace_arrays(sim.trace(max_instructions)), **options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('workloads', nargs='*', default=list(workloads.WORKLOADS))
+    parser.add_argument('--max-instructions', type=int, default=1000000)
+    parser.add_argument('--latency', nargs=2, action='append', default=[],
+                        metavar=('CLASS', 'CYCLES'),
+                        help=f"EX cycles of an operation class ({', '.join(OP_CLASSES)})")
+    parser.add_argument('--branch-policy', choices=sorted(BRANCH_POLICIES), default='rtl')
+    args = parser.parse_args()
+
+    ex_latency = {}
+    for name, cycles in args.latency:
+        if name not in OP_CLASSES:
+            parser.error(f"unknown operation class {name}")
+        ex_latency[name] = int(cycles)
+    period = clock_period(ex_latency, args.branch_policy)
+
+    print("PIPELINED PROCESSOR CYCLE MODEL")
+    if ex_latency:
+        print("  EX latencies: " + ', '.join(f'{name} {cycles}'
+                                             for name, cycles in ex_latency.items()))
+    if args.branch_policy != 'rtl':
+        print(f"  Branch policy: {args.branch_policy}")
+    print(f"  Clock period: {period:.2f} ns ({1000 / period:.1f} MHz)")
+    print(f"\n{'Workload':<20} {'Instr':>10} {'Cycles':>10} {'CPI':>6} "
+          f"{'Stalls':>8} {'Flushes':>8} {'Forwards':>9} {'ns/Instr':>9}")
+    for name in args.workloads:
+        stats = run_program(workloads.load(name), args.max_instructions,
+                            ex_latency=ex_latency, branch_policy=args.branch_policy)
+        print(f"{name:<20} {stats['instructions']:>10} {stats['cycles']:>10} "
+              f"{stats['cpi']:>6.2f} {stats['stall_cycles']:>8} {stats['flushes']:>8} "
+              f"{stats['forwards']:>9} {stats['cpi'] * period:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
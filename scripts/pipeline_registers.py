@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Width-Aware Timing of the Pipeline Registers
+Reads the payload of each pipeline register module from the RTL and costs
+it by width instead of a fixed clk-to-q plus setup: hold and clear gating
+in front of the flops, clock and enable tree depth, flop count, area and
+clock-tree power. Uses the result to price splitting a stage in two
+"""
+
+import argparse
+import math
+import os
+import re
+
+from rtl_sim import RTL
+from timing_analysis import DELAYS, pipelined_stages
+
+# Pipeline register instances of pipelined_processor, in pipeline order.
+# The PC register is inline in pipelined_processor.v (64 bits, held on stall).
+REGISTERS = {
+    'PC': None,
+    'IF/ID': 'if_id_register.v',
+    'ID/EX': 'id_ex_register.v',
+    'EX/MEM': 'ex_mem_register.v',
+    'MEM/WB': 'mem_wb_register.v',
+}
+PC_REGISTER = ([('PC', 64)], ('stall',))
+
+# Register launching and register capturing each stage of pipelined_stages()
+STAGE_REGISTERS = {
+    'IF (Instruction Fetch)': ('PC', 'IF/ID'),
+    'ID (Instruction Decode)': ('IF/ID', 'ID/EX'),
+    'EX (Execute)': ('ID/EX', 'EX/MEM'),
+    'MEM (Memory Access)': ('EX/MEM', 'MEM/WB'),
+    'WB (Write Back)': ('MEM/WB', None),
+}
+
+# Width-dependent costs, same process assumptions as DELAYS
+FANOUT = 4               # buffers per level of the clock and enable trees
+SKEW_PER_LEVEL = 0.02    # ns of skew added per tree level
+FLOP_AREA = 5.0          # um^2 per flop
+FLOP_CLOCK_CAP = 1.2     # fF clock pin load per flop
+BUFFER_CAP = 3.0         # fF per tree buffer (input plus wire)
+VDD = 0.9                # V
+
+_OUTPUT = re.compile(r'output\s+reg\s*(?:\[(\d+):(\d+)\])?\s*(\w+)')
+_CONTROL = re.compile(r'input\s+wire\s+(stall|flush)\b')
+
+
+def payload(name):
+    """([(field, bits)], synchronous controls) of a pipeline register"""
+    if REGISTERS[name] is None:
+        return PC_REGISTER
+    with open(os.path.join(RTL, REGISTERS[name])) as f:
+        text = f.read()
+    fields = [(field, int(high) - int(low) + 1 if high else 1)
+              for high, low, field in _OUTPUT.findall(text)]
+    return fields, tuple(_CONTROL.findall(text))
+
+
+def tree_levels(width):
+    return max(1, math.ceil(math.log(width, FANOUT)))
+
+
+def tree_buffers(width):
+    """Buffers of a fanout-FANOUT tree driving `width` flops"""
+    count, level = 0, width
+    while level > 1:
+        level = math.ceil(level / FANOUT)
+        count += level
+    return count
+
+
+def register_cost(width, controls=()):
+    """Timing, area and clock load of a register of `width` flops
+
+    Every synchronous control (stall hold, flush clear) puts a 2:1 mux in
+    front of each flop and adds a setup-side delay; the skew of the clock
+    tree grows with its depth.
+    """
+    gating = len(controls) * DELAYS['mux_2to1']
+    skew = tree_levels(width) * SKEW_PER_LEVEL
+    return {
+        'flops': width,
+        'levels': tree_levels(width),
+        'clk_to_q': DELAYS['reg_clk_to_q'],
+        'setup': DELAYS['reg_setup'] + gating + skew,
+        'area': width * FLOP_AREA,
+        'clock_cap': width * FLOP_CLOCK_CAP + tree_buffers(width) * BUFFER_CAP,
+    }
+
+
+def clock_power(clock_cap, frequency_mhz):
+    """Clock-tree switching power in mW (clock nets toggle every cycle)"""
+    return clock_cap * 1e-15 * VDD ** 2 * frequency_mhz * 1e6 * 1e3
+
+
+def register_costs():
+    """{instance: (fields, controls, register_cost)}"""
+    costs = {}
+    for name in REGISTERS:
+        fields, controls = payload(name)
+        costs[name] = (fields, controls, register_cost(sum(bits for _, bits in fields), controls))
+    return costs
+
+
+def register_stages(costs=None):
+    """pipelined_stages() with width-aware clk-to-q and setup entries"""
+    costs = costs or register_costs()
+    stages = pipelined_stages()
+    for stage, (launch, capture) in STAGE_REGISTERS.items():
+        replaced = []
+        for component, delay in stages[stage]:
+            if component == f'{launch} Clk-to-Q':
+                delay = costs[launch][2]['clk_to_q']
+            elif capture and component == f'{capture} Setup':
+                delay = costs[capture][2]['setup']
+            replaced.append((component, delay))
+        stages[stage] = replaced
+    return stages
+
+
+def split_stage(stages, stage, costs):
+    """(period, added register cost) with `stage` cut in half
+
+    The new register carries the payload of the register that captures the
+    stage (the values live across the cut) and has the same controls.
+    """
+    launch, capture = STAGE_REGISTERS[stage]
+    fields, controls, _ = costs[capture or launch]
+    added = register_cost(sum(bits for _, bits in fields), controls)
+    launch_delay = sum(delay for component, delay in stages[stage]
+                       if component.endswith('Clk-to-Q'))
+    capture_delay = sum(delay for component, delay in stages[stage]
+                        if component.endswith('Setup'))
+    logic = sum(delay for _, delay in stages[stage]) - launch_delay - capture_delay
+    delays = {name: sum(delay for _, delay in parts) for name, parts in stages.items()}
+    delays[stage] = max(launch_delay + logic / 2 + added['setup'],
+                        added['clk_to_q'] + logic / 2 + capture_delay)
+    return max(delays.values()), added
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.parse_args()
+
+    costs = register_costs()
+    stages = register_stages(costs)
+    delays = {name: sum(delay for _, delay in parts) for name, parts in stages.items()}
+    period = max(delays.values())
+    fixed = max(sum(delay for _, delay in parts) for parts in pipelined_stages().values())
+    f_max = 1000 / period
+
+    print("PIPELINE REGISTER TIMING")
+    print(f"\n{'Register':<8} {'Flops':>6} {'Controls':<12} {'Levels':>7} {'Setup':>9} "
+          f"{'Area':>10} {'Clock power':>12}")
+    total_flops = total_area = total_power = 0
+    for name, (fields, controls, cost) in costs.items():
+        power = clock_power(cost['clock_cap'], f_max)
+        total_flops += cost['flops']
+        total_area += cost['area']
+        total_power += power
+        print(f"{name:<8} {cost['flops']:>6} {', '.join(controls) or '-':<12} "
+              f"{cost['levels']:>7} {cost['setup']:>6.2f} ns {cost['area']:>7.0f} um2 "
+              f"{power:>9.3f} mW")
+        print(f"{'':<8} " + ', '.join(f'{field} {bits}' for field, bits in fields))
+    print(f"{'Total':<8} {total_flops:>6} {'':<12} {'':>7} {'':>9} "
+          f"{total_area:>7.0f} um2 {total_power:>9.3f} mW")
+
+    print(f"\n{'Stage':<26} {'Fixed':>9} {'By width':>9}")
+    for name, parts in pipelined_stages().items():
+        print(f"{name:<26} {sum(delay for _, delay in parts):>6.2f} ns {delays[name]:>6.2f} ns")
+    print(f"Clock period: {fixed:.2f} ns fixed overhead, {period:.2f} ns width-aware "
+          f"({f_max:.1f} MHz)")
+
+    print(f"\n{'Split stage':<26} {'Period':>9} {'f_max':>11} {'+Flops':>7} {'+Clock power':>13}")
+    for stage in STAGE_REGISTERS:
+        new_period, added = split_stage(stages, stage, costs)
+        # Existing registers clock faster, plus the new register's tree
+        power = (total_power * period / new_period +
+                 clock_power(added['clock_cap'], 1000 / new_period))
+        print(f"{stage:<26} {new_period:>6.2f} ns {1000 / new_period:>7.1f} MHz "
+              f"{added['flops']:>7} {power - total_power:>+10.3f} mW")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Coverage-Guided Random Programs for the Pipelined RISC-V Processor
+Generates constrained-random programs aimed at hazard_detection_unit and
+forwarding_unit conditions, measures functional hazard coverage on the cycle
+model and steers further generation toward the bins not hit yet
+"""
+
+import argparse
+import os
+import random
+
+import numpy as np
+
+import pipeline_model
+from functional_sim import FunctionalSimulator
+from riscv_isa import (OP_BRANCH, OP_ITYPE, OP_LOAD, OP_RTYPE, OP_STORE, assemble,
+                       words_to_bytes, write_hex)
+
+PROGRAM_LENGTH = 64       # generated instructions per program (before branches)
+MAX_PROGRAMS = 2000
+DISTANCES = (1, 2, 3)
+
+# Register use: x1-x27 hold data, x28-x31 hold doubleword-aligned addresses.
+# Blind generation draws every register operand from all 32 registers and
+# only keeps load and store bases in POINTER_REGS (the functional model
+# wraps any address into data memory).
+DATA_REGS = list(range(1, 28))
+POINTER_REGS = [28, 29, 30, 31]
+ALL_REGS = list(range(32))
+R_OPS = ('add', 'sub', 'and', 'or', 'slt')
+I_OPS = ('addi', 'andi', 'ori')
+
+
+def _bins():
+    names = []
+    for kind in ('alu', 'load'):
+        for slot in ('rs1', 'rs2'):
+            names += [f'{kind}_{slot}_d{d}' for d in DISTANCES]
+    names += [f'x0_{slot}_d{d}' for slot in ('rs1', 'rs2') for d in (1, 2)]
+    names += ['fwdA_mem', 'fwdA_wb', 'fwdB_mem', 'fwdB_wb', 'fwd_both', 'fwd_mem_over_wb',
+              'load_load', 'load_load_addr', 'load_store_data',
+              'branch_taken', 'branch_not_taken', 'branch_dep_alu', 'branch_dep_load',
+              'branch_after_branch']
+    return names
+
+
+# Functional coverage bins over the dynamic instruction stream
+BINS = _bins()
+
+
+def coverage(trace, result):
+    """Hit count of every bin for one timed trace"""
+    shift = pipeline_model._shift
+    opcode, rd, rs1, rs2 = trace['opcode'], trace['rd'], trace['rs1'], trace['rs2']
+    load, branch = trace['load'], trace['branch']
+    uses_rs1 = np.isin(opcode, (OP_RTYPE, OP_ITYPE, OP_LOAD, OP_STORE, OP_BRANCH))
+    uses_rs2 = np.isin(opcode, (OP_RTYPE, OP_STORE, OP_BRANCH))
+    store = opcode == OP_STORE
+
+    hits = {}
+    for d in DISTANCES:
+        producer_rd = shift(rd, d, 0)
+        writes = shift(trace['reg_write'], d, False)
+        producer_load = shift(load, d, False)
+        for slot, rs, uses in (('rs1', rs1, uses_rs1), ('rs2', rs2, uses_rs2)):
+            dependent = uses & writes & (producer_rd != 0) & (producer_rd == rs)
+            hits[f'alu_{slot}_d{d}'] = dependent & ~producer_load
+            hits[f'load_{slot}_d{d}'] = dependent & producer_load
+            if d <= 2:
+                hits[f'x0_{slot}_d{d}'] = uses & writes & (producer_rd == 0) & (rs == 0)
+
+    forward_a, forward_b = result['forwardA'], result['forwardB']
+    hits['fwdA_mem'] = forward_a == 1
+    hits['fwdA_wb'] = forward_a == 2
+    hits['fwdB_mem'] = forward_b == 1
+    hits['fwdB_wb'] = forward_b == 2
+    hits['fwd_both'] = (forward_a != 0) & (forward_b != 0)
+    # Both older instructions write the operand: the MEM copy must win
+    rd1, rd2 = shift(rd, 1, 0), shift(rd, 2, 0)
+    write1 = shift(trace['reg_write'], 1, False)
+    write2 = shift(trace['reg_write'], 2, False)
+    hits['fwd_mem_over_wb'] = write1 & write2 & (rd1 != 0) & (rd1 == rd2) & \
+        (((rd1 == rs1) & uses_rs1) | ((rd1 == rs2) & uses_rs2))
+
+    prev_load = shift(load, 1, False)
+    hits['load_load'] = load & prev_load
+    hits['load_load_addr'] = load & prev_load & (rd1 != 0) & (rd1 == rs1)
+    hits['load_store_data'] = store & prev_load & (rd1 != 0) & (rd1 == rs2)
+    hits['branch_taken'] = branch & trace['taken']
+    hits['branch_not_taken'] = branch & ~trace['taken']
+    branch_dep = branch & write1 & (rd1 != 0) & ((rd1 == rs1) | (rd1 == rs2))
+    hits['branch_dep_alu'] = branch_dep & ~prev_load
+    hits['branch_dep_load'] = branch_dep & prev_load
+    hits['branch_after_branch'] = branch & shift(branch, 1, False)
+    return {name: int(hits[name].sum()) for name in BINS}
+
+
+class ProgramGenerator:
+    """Constrained-random instruction sequences
+
+    Blind generation draws independent random instructions. Guided
+    generation emits a sequence built to hit a chosen bin, with random
+    registers, operands and filler everywhere the bin does not constrain.
+    Unconstrained registers come from `registers` (DATA_REGS keeps the
+    address registers intact; blind runs use ALL_REGS).
+    """
+
+    def __init__(self, seed=0, registers=DATA_REGS):
+        self.rng = random.Random(seed)
+        self.registers = registers
+        self.labels = 0
+
+    def _data(self, exclude=()):
+        return self.rng.choice([r for r in self.registers if r not in exclude])
+
+    def _offset(self):
+        return 8 * self.rng.randrange(0, 64)
+
+    def prologue(self):
+        """Point every address register at its own 512-byte region"""
+        return [f'addi x{reg}, x0, {512 * i}' for i, reg in enumerate(POINTER_REGS)]
+
+    def alu(self, rd=None, rs1=None, rs2=None, avoid=()):
+        rd = self._data(avoid) if rd is None else rd
+        rs1 = self._data(avoid) if rs1 is None else rs1
+        if rs2 is not None or self.rng.random() < 0.5:
+            rs2 = self._data(avoid) if rs2 is None else rs2
+            return f'{self.rng.choice(R_OPS)} x{rd}, x{rs1}, x{rs2}'
+        return f'{self.rng.choice(I_OPS)} x{rd}, x{rs1}, {self.rng.randint(-2048, 2047)}'
+
+    def load(self, rd=None, base=None, avoid=()):
+        rd = self._data(avoid) if rd is None else rd
+        base = self.rng.choice(POINTER_REGS) if base is None else base
+        return f'ld x{rd}, {self._offset()}(x{base})'
+
+    def store(self, rs2=None, base=None, avoid=()):
+        rs2 = self._data(avoid) if rs2 is None else rs2
+        base = self.rng.choice(POINTER_REGS) if base is None else base
+        return f'sd x{rs2}, {self._offset()}(x{base})'
+
+    def branch(self, rs1=None, rs2=None, skip=None, avoid=()):
+        """Forward BEQ over `skip` filler instructions (always terminates)"""
+        rs1 = self._data(avoid) if rs1 is None else rs1
+        rs2 = self.rng.choice([rs1, self._data(avoid)]) if rs2 is None else rs2
+        skip = self.rng.randint(0, 2) if skip is None else skip
+        self.labels += 1
+        label = f'skip{self.labels}'
+        return [f'beq x{rs1}, x{rs2}, {label}'] + \
+            [self.alu(avoid=avoid) for _ in range(skip)] + [f'{label}:']
+
+    def random_instruction(self, avoid=()):
+        kind = self.rng.choices(('alu', 'load', 'store', 'branch'), (6, 2, 1, 1))[0]
+        if kind == 'alu':
+            return [self.alu(avoid=avoid)]
+        if kind == 'load':
+            return [self.load(avoid=avoid)]
+        if kind == 'store':
+            return [self.store(avoid=avoid)]
+        return self.branch(avoid=avoid)
+
+    def blind(self, length):
+        lines = self.prologue()
+        while len(lines) < length:
+            lines += self.random_instruction()
+        return lines
+
+    def target(self, name):
+        """A short sequence that hits bin `name` when executed in order"""
+        rng = self.rng
+        reg = self._data()
+        if name.startswith(('alu_', 'load_r')):
+            kind, slot, distance = name.split('_')
+            distance = int(distance[1:])
+            producer = self.alu(rd=reg) if kind == 'alu' else self.load(rd=reg)
+            filler = [self.alu(avoid=(reg,)) for _ in range(distance - 1)]
+            if slot == 'rs1':
+                consumer = [self.alu(rs1=reg)]
+            else:
+                consumer = rng.choice([[self.alu(rs2=reg)], [self.store(rs2=reg)],
+                                       self.branch(rs1=self._data(), rs2=reg)])
+            return [producer] + filler + consumer
+        if name.startswith('x0_'):
+            _, slot, distance = name.split('_')
+            filler = [self.alu(avoid=(0,)) for _ in range(int(distance[1:]) - 1)]
+            consumer = self.alu(rs1=0) if slot == 'rs1' else self.alu(rs2=0)
+            return [self.alu(rd=0)] + filler + [consumer]
+        if name in ('fwdA_mem', 'fwdB_mem', 'fwdA_wb', 'fwdB_wb'):
+            filler = [self.alu(avoid=(reg,))] if name.endswith('wb') else []
+            consumer = self.alu(rs1=reg) if name.startswith('fwdA') else self.alu(rs2=reg)
+            return [self.alu(rd=reg)] + filler + [consumer]
+        if name == 'fwd_both':
+            other = self._data((reg,))
+            return [self.alu(rd=reg), self.alu(rd=other, avoid=(reg,)),
+                    self.alu(rs1=rng.choice([reg, other]), rs2=rng.choice([reg, other]))]
+        if name == 'fwd_mem_over_wb':
+            return [self.alu(rd=reg), self.alu(rd=reg), self.alu(rs1=reg)]
+        if name == 'load_load':
+            return [self.load(), self.load()]
+        if name == 'load_load_addr':
+            # Reload an address register from memory, then load through it
+            base, pointer, spill = rng.sample(POINTER_REGS, 3)
+            return [f'sd x{base}, 0(x{spill})', f'ld x{pointer}, 0(x{spill})',
+                    self.load(base=pointer)]
+        if name == 'load_store_data':
+            return [self.load(rd=reg), self.store(rs2=reg)]
+        if name == 'branch_taken':
+            return self.branch(rs1=reg, rs2=reg)
+        if name == 'branch_not_taken':
+            return [f'addi x{reg}, x0, 1'] + self.branch(rs1=reg, rs2=0)
+        if name == 'branch_dep_alu':
+            return [self.alu(rd=reg)] + self.branch(rs1=reg)
+        if name == 'branch_dep_load':
+            return [self.load(rd=reg)] + self.branch(rs1=reg)
+        if name == 'branch_after_branch':
+            return self.branch(skip=0) + self.branch()
+        raise KeyError(name)
+
+    def guided(self, length, unhit):
+        """Program biased toward unhit bins, padded with random instructions"""
+        lines = self.prologue()
+        unhit = list(unhit)
+        while len(lines) < length:
+            if unhit and self.rng.random() < 0.75:
+                lines += self.target(self.rng.choice(unhit))
+            else:
+                lines += self.random_instruction()
+        return lines
+
+
+def simulate(lines):
+    """Assemble, run and time a program; returns (program, trace, result)"""
+    program = assemble('\n'.join(lines))
+    trace = pipeline_model.trace_arrays(FunctionalSimulator(program).trace())
+    return program, trace, pipeline_model.simulate(trace)
+
+
+def close_coverage(guided=True, seed=0, length=PROGRAM_LENGTH, max_programs=MAX_PROGRAMS,
+                   emit=None):
+    """Generate programs until every bin is hit or the budget runs out
+
+    Returns (hit counts, programs, simulated cycles, bins first hit by each
+    program).
+    """
+    generator = ProgramGenerator(seed, DATA_REGS if guided else ALL_REGS)
+    totals = dict.fromkeys(BINS, 0)
+    cycles = 0
+    history = []
+    for index in range(max_programs):
+        unhit = [name for name in BINS if not totals[name]]
+        if not unhit:
+            break
+        lines = generator.guided(length, unhit) if guided else generator.blind(length)
+        program, trace, result = simulate(lines)
+        cycles += result['cycles']
+        counts = coverage(trace, result)
+        new = [name for name in unhit if counts[name]]
+        for name, count in counts.items():
+            totals[name] += count
+        history.append(new)
+        if emit and new:
+            os.makedirs(emit, exist_ok=True)
+            write_hex(os.path.join(emit, f'prog{index:04d}.hex'), words_to_bytes(program))
+    return totals, len(history), cycles, history
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--length', type=int, default=PROGRAM_LENGTH)
+    parser.add_argument('--max-programs', type=int, default=MAX_PROGRAMS)
+    parser.add_argument('--blind', action='store_true', help='also run blind random for comparison')
+    parser.add_argument('--emit', help='write every program that hit a new bin as a hex image')
+    args = parser.parse_args()
+
+    print("COVERAGE-GUIDED HAZARD PROGRAMS")
+    runs = [('guided', True)] + ([('blind', False)] if args.blind else [])
+    summary = []
+    for label, guided in runs:
+        totals, programs, cycles, _ = close_coverage(
+            guided, args.seed, args.length, args.max_programs,
+            args.emit if guided else None)
+        hit = sum(1 for count in totals.values() if count)
+        summary.append((label, hit, programs, cycles))
+        if guided:
+            print(f"\n{'Bin':<22} {'Hits':>8}")
+            for name in BINS:
+                print(f"{name:<22} {totals[name]:>8}")
+
+    print(f"\n{'Mode':<8} {'Bins hit':>10} {'Programs':>9} {'Cycles':>10}")
+    for label, hit, programs, cycles in summary:
+        print(f"{label:<8} {f'{hit}/{len(BINS)}':>10} {programs:>9} {cycles:>10}")
+
+
+if __name__ == '__main__':
+    main()
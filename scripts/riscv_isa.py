@@ -0,0 +1,306 @@
+"""
+RV64I Instruction Encoding for the RISC-V Processor Implementations
+Decodes, encodes and assembles the instruction classes the cores execute
+(R-type, I-type ALU, LD, SD and branches) and reads/writes $readmemh images
+"""
+
+from collections import namedtuple
+
+# Opcodes (same encoding as the localparams in pipeline_control.v)
+OP_RTYPE = 0b0110011
+OP_ITYPE = 0b0010011
+OP_LOAD = 0b0000011
+OP_STORE = 0b0100011
+OP_BRANCH = 0b1100011
+
+# (funct3, funct7) for R-type operations
+R_TYPE = {
+    'add':  (0b000, 0b0000000),
+    'sub':  (0b000, 0b0100000),
+    'sll':  (0b001, 0b0000000),
+    'slt':  (0b010, 0b0000000),
+    'sltu': (0b011, 0b0000000),
+    'xor':  (0b100, 0b0000000),
+    'srl':  (0b101, 0b0000000),
+    'sra':  (0b101, 0b0100000),
+    'or':   (0b110, 0b0000000),
+    'and':  (0b111, 0b0000000),
+}
+
+# funct3 for I-type ALU operations (shifts also carry imm[11:6])
+I_TYPE = {
+    'addi':  0b000,
+    'slli':  0b001,
+    'slti':  0b010,
+    'sltiu': 0b011,
+    'xori':  0b100,
+    'srli':  0b101,
+    'srai':  0b101,
+    'ori':   0b110,
+    'andi':  0b111,
+}
+
+# funct3 for branches (the cores compare with SUB/zero, i.e. BEQ)
+BRANCHES = {
+    'beq':  0b000,
+    'bne':  0b001,
+    'blt':  0b100,
+    'bge':  0b101,
+    'bltu': 0b110,
+    'bgeu': 0b111,
+}
+
+FUNCT3_LD = 0b011
+FUNCT3_SD = 0b011
+
+NOP = 0x00000013  # addi x0, x0, 0
+
+Instruction = namedtuple('Instruction', 'op rd rs1 rs2 imm')
+
+_R_BY_FUNCT = {funct: op for op, funct in R_TYPE.items()}
+_I_BY_FUNCT3 = {f3: op for op, f3 in I_TYPE.items() if op not in ('srli', 'srai')}
+_B_BY_FUNCT3 = {f3: op for op, f3 in BRANCHES.items()}
+
+
+def sign_extend(value, bits):
+    """Interpret the low `bits` bits of value as a two's complement number"""
+    sign = 1 << (bits - 1)
+    return (value & ((1 << bits) - 1) ^ sign) - sign
+
+
+def decode(word):
+    """Decode a 32-bit instruction word into an Instruction
+
+    Registers an instruction does not use are reported as x0. Raises
+    ValueError for encodings outside the supported subset.
+    """
+    opcode = word & 0x7F
+    rd = (word >> 7) & 0x1F
+    funct3 = (word >> 12) & 0x7
+    rs1 = (word >> 15) & 0x1F
+    rs2 = (word >> 20) & 0x1F
+    funct7 = (word >> 25) & 0x7F
+
+    if opcode == OP_RTYPE:
+        op = _R_BY_FUNCT.get((funct3, funct7))
+        if op is not None:
+            return Instruction(op, rd, rs1, rs2, 0)
+
+    elif opcode == OP_ITYPE:
+        imm = sign_extend(word >> 20, 12)
+        if funct3 == 0b001 and funct7 >> 1 == 0:
+            return Instruction('slli', rd, rs1, 0, imm & 0x3F)
+        if funct3 == 0b101 and funct7 >> 1 == 0:
+            return Instruction('srli', rd, rs1, 0, imm & 0x3F)
+        if funct3 == 0b101 and funct7 >> 1 == 0b010000:
+            return Instruction('srai', rd, rs1, 0, imm & 0x3F)
+        op = _I_BY_FUNCT3.get(funct3)
+        if op is not None and op != 'slli':
+            return Instruction(op, rd, rs1, 0, imm)
+
+    elif opcode == OP_LOAD and funct3 == FUNCT3_LD:
+        return Instruction('ld', rd, rs1, 0, sign_extend(word >> 20, 12))
+
+    elif opcode == OP_STORE and funct3 == FUNCT3_SD:
+        imm = sign_extend((funct7 << 5) | rd, 12)
+        return Instruction('sd', 0, rs1, rs2, imm)
+
+    elif opcode == OP_BRANCH:
+        op = _B_BY_FUNCT3.get(funct3)
+        if op is not None:
+            imm = (((word >> 31) & 0x1) << 12 |
+                   ((word >> 7) & 0x1) << 11 |
+                   ((word >> 25) & 0x3F) << 5 |
+                   ((word >> 8) & 0xF) << 1)
+            return Instruction(op, 0, rs1, rs2, sign_extend(imm, 13))
+
+    raise ValueError(f"unsupported instruction 0x{word:08x}")
+
+
+def encode(instr):
+    """Encode an Instruction into a 32-bit instruction word"""
+    op, rd, rs1, rs2, imm = instr
+
+    if op in R_TYPE:
+        funct3, funct7 = R_TYPE[op]
+        return funct7 << 25 | rs2 << 20 | rs1 << 15 | funct3 << 12 | rd << 7 | OP_RTYPE
+
+    if op in I_TYPE:
+        if op in ('slli', 'srli', 'srai'):
+            if not 0 <= imm < 64:
+                raise ValueError(f"{op} shift amount out of range: {imm}")
+            imm |= 0b010000 << 6 if op == 'srai' else 0
+        elif not -2048 <= imm < 2048:
+            raise ValueError(f"{op} immediate out of range: {imm}")
+        return (imm & 0xFFF) << 20 | rs1 << 15 | I_TYPE[op] << 12 | rd << 7 | OP_ITYPE
+
+    if op == 'ld':
+        if not -2048 <= imm < 2048:
+            raise ValueError(f"ld offset out of range: {imm}")
+        return (imm & 0xFFF) << 20 | rs1 << 15 | FUNCT3_LD << 12 | rd << 7 | OP_LOAD
+
+    if op == 'sd':
+        if not -2048 <= imm < 2048:
+            raise ValueError(f"sd offset out of range: {imm}")
+        imm &= 0xFFF
+        return ((imm >> 5) << 25 | rs2 << 20 | rs1 << 15 | FUNCT3_SD << 12 |
+                (imm & 0x1F) << 7 | OP_STORE)
+
+    if op in BRANCHES:
+        if imm & 1 or not -4096 <= imm < 4096:
+            raise ValueError(f"{op} offset out of range: {imm}")
+        imm &= 0x1FFF
+        return (((imm >> 12) & 0x1) << 31 | ((imm >> 5) & 0x3F) << 25 |
+                rs2 << 20 | rs1 << 15 | BRANCHES[op] << 12 |
+                ((imm >> 1) & 0xF) << 8 | ((imm >> 11) & 0x1) << 7 | OP_BRANCH)
+
+    raise ValueError(f"unsupported instruction: {op}")
+
+
+def disassemble(word):
+    """Render a 32-bit instruction word as assembly text"""
+    if word == 0:
+        return 'halt'
+    try:
+        op, rd, rs1, rs2, imm = decode(word)
+    except ValueError:
+        return f'.word 0x{word:08x}'
+    if op in R_TYPE:
+        return f'{op} x{rd}, x{rs1}, x{rs2}'
+    if op in I_TYPE:
+        return f'{op} x{rd}, x{rs1}, {imm}'
+    if op == 'ld':
+        return f'ld x{rd}, {imm}(x{rs1})'
+    if op == 'sd':
+        return f'sd x{rs2}, {imm}(x{rs1})'
+    return f'{op} x{rs1}, x{rs2}, {imm}'
+
+
+def _register(token):
+    token = token.strip()
+    if not token.startswith('x') or not token[1:].isdigit() or int(token[1:]) > 31:
+        raise ValueError(f"bad register: {token!r}")
+    return int(token[1:])
+
+
+def _memory_operand(token):
+    offset, _, base = token.strip().partition('(')
+    if not base.endswith(')'):
+        raise ValueError(f"bad memory operand: {token!r}")
+    return int(offset or '0', 0), _register(base[:-1])
+
+
+def assemble(source):
+    """Assemble program text into a list of 32-bit instruction words
+
+    One instruction per line, '#' starts a comment and 'name:' defines a
+    label usable as a branch target. '.word <value>' emits a raw word.
+    """
+    lines = []
+    labels = {}
+    for line in source.splitlines():
+        line = line.split('#', 1)[0].strip()
+        while ':' in line:
+            label, line = line.split(':', 1)
+            labels[label.strip()] = len(lines) * 4
+            line = line.strip()
+        if line:
+            lines.append(line)
+
+    words = []
+    for index, line in enumerate(lines):
+        mnemonic, _, rest = line.partition(' ')
+        mnemonic = mnemonic.lower()
+        args = [arg.strip() for arg in rest.split(',')] if rest.strip() else []
+
+        if mnemonic == '.word':
+            words.append(int(args[0], 0) & 0xFFFFFFFF)
+            continue
+        if mnemonic == 'nop':
+            words.append(NOP)
+            continue
+
+        if mnemonic in R_TYPE:
+            instr = Instruction(mnemonic, _register(args[0]), _register(args[1]),
+                                _register(args[2]), 0)
+        elif mnemonic in I_TYPE:
+            instr = Instruction(mnemonic, _register(args[0]), _register(args[1]),
+                                0, int(args[2], 0))
+        elif mnemonic == 'ld':
+            offset, base = _memory_operand(args[1])
+            instr = Instruction('ld', _register(args[0]), base, 0, offset)
+        elif mnemonic == 'sd':
+            offset, base = _memory_operand(args[1])
+            instr = Instruction('sd', 0, base, _register(args[0]), offset)
+        elif mnemonic in BRANCHES:
+            target = args[2]
+            offset = labels[target] - index * 4 if target in labels else int(target, 0)
+            instr = Instruction(mnemonic, 0, _register(args[0]), _register(args[1]), offset)
+        else:
+            raise ValueError(f"line {index}: unknown mnemonic {mnemonic!r}")
+
+        words.append(encode(instr))
+    return words
+
+
+def words_to_bytes(words):
+    """Pack instruction words little-endian, as the cores' memories store them"""
+    return b''.join(word.to_bytes(4, 'little') for word in words)
+
+
+def bytes_to_words(data):
+    """Split a little-endian byte image into 32-bit instruction words"""
+    return [int.from_bytes(data[i:i + 4], 'little') for i in range(0, len(data) - 3, 4)]
+
+
+def read_hex(path, size=None):
+    """Read a byte-wide $readmemh image (supports @address directives)"""
+    with open(path) as f:
+        text = f.read()
+    if '@' not in text and '/' not in text:
+        # Plain two-digit tokens: let bytes.fromhex do the parsing
+        tokens = text.split()
+        if not tokens or len(max(tokens, key=len)) == 2 == len(min(tokens, key=len)):
+            data = bytearray.fromhex(''.join(tokens))
+            if size is not None:
+                if len(data) > size:
+                    raise ValueError(f"{path}: address 0x{size:x} beyond {size} bytes")
+                data.extend(bytes(size - len(data)))
+            return data
+
+    data = bytearray(size or 0)
+    address = 0
+    for line in text.splitlines():
+        for token in line.split('//', 1)[0].split():
+            if token.startswith('@'):
+                address = int(token[1:], 16)
+                continue
+            if address >= len(data):
+                if size is not None:
+                    raise ValueError(f"{path}: address 0x{address:x} beyond {size} bytes")
+                data.extend(bytes(address + 1 - len(data)))
+            data[address] = int(token, 16)
+            address += 1
+    return data
+
+
+def write_hex(path, data, bytes_per_line=16, start=0, end=None):
+    """Write a byte image in the byte-wide format read by $readmemh
+
+    Only bytes [start, end) are written, preceded by an @start directive
+    when start is not 0, so a slice of a large image can be converted
+    without copying the rest.
+    """
+    view = memoryview(data).cast('B')
+    end = len(view) if end is None else min(end, len(view))
+    with open(path, 'w') as f:
+        if start:
+            f.write(f'@{start:x}\n')
+        lines = []
+        for offset in range(start, end, bytes_per_line):
+            lines.append(view[offset:min(offset + bytes_per_line, end)].hex(' '))
+            if len(lines) == 4096:
+                f.write('\n'.join(lines) + '\n')
+                lines = []
+        if lines:
+            f.write('\n'.join(lines) + '\n')
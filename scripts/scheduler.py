@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Load-Use List Scheduler for RISC-V Programs
+Reorders independent instructions inside the basic blocks of a program image
+so that no instruction reads the destination of the load right before it,
+the one case hazard_detection_unit stalls for (everything else is bypassed
+by forwarding_unit), and reports the stall cycles removed per program
+"""
+
+import argparse
+import heapq
+
+import pipeline_model
+import workloads
+from functional_sim import FunctionalSimulator
+from images import is_binary, read_image, write_image
+from riscv_isa import (BRANCHES, OP_LOAD, bytes_to_words, decode, disassemble, words_to_bytes,
+                       write_hex)
+
+LOAD_USE_LATENCY = 2      # a load's value reaches EX one cycle late
+LOOKAHEAD = 8             # ready instructions tried before accepting a stall
+
+
+def _raw_sources(word):
+    """rs fields hazard_detection_unit compares, used or not"""
+    return (word >> 15) & 0x1F, (word >> 20) & 0x1F
+
+
+def _stalls(previous, word):
+    """True if `word` right after `previous` triggers a load-use stall"""
+    if previous is None or previous & 0x7F != OP_LOAD:
+        return False
+    rd = (previous >> 7) & 0x1F
+    return rd != 0 and rd in _raw_sources(word)
+
+
+def basic_blocks(words):
+    """(start, end, schedulable) index ranges covering the program
+
+    Leaders are the entry, branch targets and instructions after branches.
+    Words outside the supported subset (halt, data) form unschedulable
+    blocks of their own and stay in place.
+    """
+    decoded = []
+    leaders = {0, len(words)}
+    for index, word in enumerate(words):
+        try:
+            instr = decode(word)
+        except ValueError:
+            instr = None
+            leaders.update((index, index + 1))
+        decoded.append(instr)
+        if instr is not None and instr.op in BRANCHES:
+            leaders.add(index + 1)
+            target = index + instr.imm // 4
+            if 0 <= target < len(words):
+                leaders.add(target)
+    bounds = sorted(leaders)
+    return decoded, [(start, end, decoded[start] is not None)
+                     for start, end in zip(bounds, bounds[1:])]
+
+
+def dependencies(block):
+    """Predecessor lists (index, latency) of the instructions of a block
+
+    Register RAW, WAR and WAW order plus memory order: loads stay behind
+    the previous store, stores behind the previous store and every load
+    since. Each read and write adds O(1) edges, so a block of n
+    instructions has O(n) edges.
+    """
+    preds = [[] for _ in block]
+    writer = [None] * 32
+    readers = [[] for _ in range(32)]
+    last_store = None
+    loads = []
+    for i, instr in enumerate(block):
+        sources = {reg for reg in (instr.rs1, instr.rs2) if reg}
+        for reg in sources:
+            if writer[reg] is not None:
+                j = writer[reg]
+                preds[i].append((j, LOAD_USE_LATENCY if block[j].op == 'ld' else 1))
+            readers[reg].append(i)
+        if instr.rd:
+            preds[i].extend((j, 0) for j in readers[instr.rd] if j != i)
+            if writer[instr.rd] is not None:
+                preds[i].append((writer[instr.rd], 1))
+            writer[instr.rd] = i
+            readers[instr.rd] = []
+        if instr.op == 'ld':
+            if last_store is not None:
+                preds[i].append((last_store, 1))
+            loads.append(i)
+        elif instr.op == 'sd':
+            preds[i].extend((j, 1) for j in loads)
+            if last_store is not None:
+                preds[i].append((last_store, 1))
+            last_store = i
+            loads = []
+    return preds
+
+
+def schedule_block(words, block, previous=None):
+    """Order of a block's instructions with as few load-use stalls as possible
+
+    A branch terminating the block stays last, and the instruction before
+    it stays right before it: pipelined_processor takes a BEQ when the
+    zero flag of the instruction in EX (pc_src = id_Branch && ex_zero) is
+    set, so the schedule must keep that pairing. Ready instructions are
+    taken by critical-path height (ties in program order) from a heap;
+    one that would stall after the previous instruction is passed over
+    for up to LOOKAHEAD others. O(n log n) for n instructions.
+    """
+    n = len(block)
+    pinned = list(range(max(n - 2, 0), n)) if block[-1].op in BRANCHES else []
+    preds = dependencies(block)
+    succs = [[] for _ in range(n)]
+    for i, edges in enumerate(preds):
+        for j, latency in edges:
+            succs[j].append((i, latency))
+
+    height = [0] * n
+    for i in range(n - 1, -1, -1):
+        height[i] = max((height[k] + latency for k, latency in succs[i]), default=0)
+
+    waiting = [len({j for j, _ in edges}) for edges in preds]
+    ready = [(-height[i], i) for i in range(n) if not waiting[i] and i not in pinned]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        passed = []
+        choice = heapq.heappop(ready)
+        while _stalls(previous, words[choice[1]]) and ready and len(passed) < LOOKAHEAD:
+            passed.append(choice)
+            choice = heapq.heappop(ready)
+        if _stalls(previous, words[choice[1]]) and passed:
+            passed.append(choice)
+            choice = min(passed)
+            passed.remove(choice)
+        for item in passed:
+            heapq.heappush(ready, item)
+
+        i = choice[1]
+        order.append(i)
+        previous = words[i]
+        for k in {k for k, _ in succs[i]}:
+            waiting[k] -= 1
+            if not waiting[k] and k not in pinned:
+                heapq.heappush(ready, (-height[k], k))
+    return order + pinned
+
+
+def schedule(words):
+    """Scheduled copy of a program's instruction words
+
+    Blocks keep their addresses and length and branches stay at the end of
+    their block behind the same instruction, so branch offsets and the
+    zero flag each branch is decided by remain valid.
+    """
+    words = list(words)
+    decoded, blocks = basic_blocks(words)
+    result = list(words)
+    previous = None
+    for start, end, schedulable in blocks:
+        if schedulable and end - start > 1:
+            order = schedule_block(words[start:end], decoded[start:end], previous)
+            result[start:end] = [words[start + i] for i in order]
+        # Only a fall-through block can stall on the load that ends its predecessor
+        previous = result[end - 1] if decoded[end - 1] is not None and \
+            decoded[end - 1].op not in BRANCHES else None
+    return result
+
+
+def static_stalls(words):
+    """Adjacent load-use pairs in program order"""
+    return sum(_stalls(a, b) for a, b in zip(words, words[1:]))
+
+
+def compare(original, scheduled, max_instructions=None):
+    """(stall cycles before, after, CPI before, after, same final state)"""
+    results = []
+    for words in (original, scheduled):
+        sim = FunctionalSimulator(words)
+        trace = pipeline_model.trace_arrays(sim.trace(max_instructions))
+        results.append((pipeline_model.simulate(trace), sim))
+    (before, sim_a), (after, sim_b) = results
+    same = sim_a.regs == sim_b.regs and bytes(sim_a.dmem) == bytes(sim_b.dmem)
+    return before['stall_cycles'], after['stall_cycles'], before['cpi'], after['cpi'], same
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('programs', nargs='*', default=list(workloads.WORKLOADS),
+                        help='workload names or program images')
+    parser.add_argument('-o', '--output', help='write the scheduled program (one input only)')
+    parser.add_argument('--listing', action='store_true', help='print the scheduled program')
+    parser.add_argument('--max-instructions', type=int, default=1000000)
+    args = parser.parse_args()
+    if args.output and len(args.programs) != 1:
+        parser.error("--output needs exactly one program")
+
+    print("LOAD-USE LIST SCHEDULER")
+    print(f"\n{'Program':<20} {'Static':>13} {'Stall cycles':>15} {'CPI':>15} {'State':>7}")
+    for name in args.programs:
+        if name in workloads.WORKLOADS:
+            words = workloads.load(name)
+        else:
+            words = bytes_to_words(read_image(name))
+        scheduled = schedule(words)
+        stalls_a, stalls_b, cpi_a, cpi_b, same = compare(words, scheduled, args.max_instructions)
+        print(f"{name:<20} {static_stalls(words):>5} -> {static_stalls(scheduled):<5} "
+              f"{stalls_a:>6} -> {stalls_b:<6} {cpi_a:>6.3f} -> {cpi_b:<6.3f} "
+              f"{'same' if same else 'DIFFERS':>7}")
+        if args.listing:
+            for pc, word in enumerate(scheduled):
+                marker = '*' if word != words[pc] else ' '
+                print(f"  {pc * 4:04x} {marker} {disassemble(word)}")
+
+    if args.output:
+        data = words_to_bytes(scheduled)
+        if is_binary(args.output):
+            write_image(args.output, data)
+        else:
+            write_hex(args.output, data)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
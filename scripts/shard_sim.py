@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Sharded Simulation of Independent Workloads
+Spreads a workload list over CPU cores (Python cycle model or vvp runs of
+pipelined_processor), balances uneven program lengths by work stealing and
+merges per-shard statistics with associative reducers
+"""
+
+import argparse
+import multiprocessing
+import os
+import queue
+import tempfile
+import time
+from functools import lru_cache, reduce
+
+import numpy as np
+
+import pipeline_model
+import rtl_sim
+import workloads
+from functional_sim import FunctionalSimulator
+from images import image_hex, read_image
+from riscv_isa import words_to_bytes, write_hex
+
+# CPI histogram over windows of HISTOGRAM_WINDOW instructions
+HISTOGRAM_WINDOW = 1000
+CPI_BINS = np.round(np.arange(1.0, 4.01, 0.1), 2)  # last bin collects CPI >= 4.0
+
+VVP_TESTBENCH = 'pipelined_checkpoint_tb.v'
+VVP_MAX_CYCLES = 1000000   # vvp runs are bounded by cycles, not instructions
+
+COST_PROBE = 200000        # instructions run per job to rank it (a few ms each)
+RESULT_POLL = 1.0          # seconds between checks for dead workers
+
+
+def _add(a, b):
+    return a + b
+
+
+def _add_histograms(a, b):
+    return [x + y for x, y in zip(a, b)]
+
+
+# Every statistic merges with an associative, commutative reducer, so shards
+# can be combined in any grouping and order
+REDUCERS = {
+    'jobs': _add,
+    'instructions': _add,
+    'cycles': _add,
+    'stalls': _add,
+    'flushes': _add,
+    'forwards': _add,
+    'busy_time': _add,
+    'min_cpi': min,
+    'max_cpi': max,
+    'cpi_histogram': _add_histograms,
+}
+
+
+def merge(a, b):
+    """Combine two statistics dicts; keys missing on one side pass through"""
+    merged = dict(a)
+    for key, value in b.items():
+        merged[key] = REDUCERS[key](merged[key], value) if key in merged else value
+    return merged
+
+
+def merge_all(stats):
+    """Reduce any number of statistics dicts into one"""
+    return reduce(merge, stats, {})
+
+
+def cpi_histogram(id_end, window=HISTOGRAM_WINDOW):
+    """Histogram of per-window CPI from the cycle model's ID exit cycles"""
+    boundaries = id_end[window - 1::window]
+    cpis = np.diff(np.concatenate(([0], boundaries))) / window
+    indices = np.clip(np.searchsorted(CPI_BINS, cpis, side='right') - 1, 0, len(CPI_BINS) - 1)
+    return np.bincount(indices, minlength=len(CPI_BINS)).tolist()
+
+
+def run_model(job):
+    """Time one workload on the Python cycle model"""
+    program = workloads.load(job['program'], job.get('iterations')) \
+        if job['program'] in workloads.WORKLOADS else read_image(job['program'])
+    result = pipeline_model.run_program(program, job.get('max_instructions'))
+    return {
+        'jobs': 1,
+        'instructions': result['instructions'],
+        'cycles': result['cycles'],
+        'stalls': result['stalls'],
+        'flushes': result['flushes'],
+        'forwards': result['forwards'],
+        'min_cpi': result['cpi'],
+        'max_cpi': result['cpi'],
+        'cpi_histogram': cpi_histogram(result['id_end']),
+    }
+
+
+def run_vvp(job):
+    """Run one program image on the compiled pipelined_processor testbench"""
+    output = rtl_sim.run(job['image'], {'IMEM_FILE': job['hex'],
+                                        'CYCLES': job.get('max_cycles', VVP_MAX_CYCLES)})
+    state = rtl_sim.parse_state(output)
+    return {'jobs': 1, 'cycles': state['cycles']}
+
+
+RUNNERS = {'model': run_model, 'vvp': run_vvp}
+
+
+def _worker(index, queues, remaining, lock, results):
+    """Drain the own queue, then steal from the other shards until no work is left"""
+    own = queues[index]
+    victims = queues[index + 1:] + queues[:index]
+    while True:
+        with lock:
+            if remaining.value == 0:
+                return
+        job, stolen = None, False
+        try:
+            job = own.get(timeout=0.05)
+        except queue.Empty:
+            for victim in victims:
+                try:
+                    job = victim.get_nowait()
+                    stolen = True
+                    break
+                except queue.Empty:
+                    continue
+        if job is None:
+            continue
+        with lock:
+            remaining.value -= 1
+
+        start = time.perf_counter()
+        try:
+            stats = RUNNERS[job['kind']](job)
+        except Exception as error:
+            results.put((index, job['id'], stolen, f'{type(error).__name__}: {error}'))
+            continue
+        stats['busy_time'] = time.perf_counter() - start
+        results.put((index, job['id'], stolen, stats))
+
+
+@lru_cache(maxsize=None)
+def dynamic_instructions(program, iterations=None, limit=COST_PROBE):
+    """Instructions a program retires within `limit`, from a functional run"""
+    words = workloads.load(program, iterations) if program in workloads.WORKLOADS \
+        else read_image(program)
+    return FunctionalSimulator(words).run(limit)
+
+
+def estimate_cost(job):
+    """Relative run length used to deal jobs out longest-first
+
+    The dynamic instruction count, so a short loop with a long body ranks
+    above a long loop with a short one. The probe run is capped at
+    COST_PROBE instructions: longer jobs tie, and a program that never
+    halts cannot hang the parent.
+    """
+    limit = min(job.get('max_instructions') or COST_PROBE, COST_PROBE)
+    return dynamic_instructions(job['program'], job.get('iterations'), limit)
+
+
+def run_sharded(jobs, shards=None):
+    """Run jobs over `shards` worker processes
+
+    Jobs are dealt longest-first round-robin into one queue per shard; idle
+    workers steal queued jobs from the other shards. Returns (per-job stats
+    in job order, per-shard merged stats, steals per shard). Raises
+    RuntimeError listing the failures if any job raised, or as soon as a
+    worker process dies (e.g. killed for memory) with jobs outstanding.
+    """
+    shards = max(1, min(shards or os.cpu_count() or 1, len(jobs)))
+    ctx = multiprocessing.get_context()
+    queues = [ctx.Queue() for _ in range(shards)]
+    results = ctx.Queue()
+    remaining = ctx.Value('i', len(jobs), lock=False)
+    lock = ctx.Lock()
+
+    order = sorted(range(len(jobs)), key=lambda i: estimate_cost(jobs[i]), reverse=True)
+    for position, job_id in enumerate(order):
+        queues[position % shards].put(dict(jobs[job_id], id=job_id))
+
+    workers = [ctx.Process(target=_worker, args=(i, queues, remaining, lock, results))
+               for i in range(shards)]
+    for worker in workers:
+        worker.start()
+
+    per_job = [None] * len(jobs)
+    per_shard = [{} for _ in range(shards)]
+    steals = [0] * shards
+    errors = []
+    for _ in jobs:
+        while True:
+            try:
+                shard, job_id, stolen, stats = results.get(timeout=RESULT_POLL)
+                break
+            except queue.Empty:
+                dead = [(i, worker.exitcode) for i, worker in enumerate(workers)
+                        if worker.exitcode not in (None, 0)]
+                if dead:
+                    for worker in workers:
+                        worker.terminate()
+                    raise RuntimeError('\n'.join(f"shard {i} died (exit code {code})"
+                                                 for i, code in dead))
+        if isinstance(stats, str):
+            errors.append(f"job {job_id} ({jobs[job_id]['program']}): {stats}")
+            continue
+        per_job[job_id] = stats
+        per_shard[shard] = merge(per_shard[shard], stats)
+        steals[shard] += stolen
+    for worker in workers:
+        worker.join()
+    if errors:
+        raise RuntimeError('\n'.join(errors))
+    return per_job, per_shard, steals
+
+
+def parse_job(spec, kind, max_instructions):
+    """Job from 'workload[:iterations]' or a program image path"""
+    name, _, iterations = spec.partition(':')
+    job = {'kind': kind, 'program': name, 'max_instructions': max_instructions}
+    if iterations:
+        job['iterations'] = int(iterations)
+    return job
+
+
+def prepare_vvp(jobs, workdir):
+    """Build the testbench once and write workload programs as hex images"""
+    image = rtl_sim.build('pipelined_processor', VVP_TESTBENCH,
+                          os.path.join(workdir, 'pipelined_checkpoint.vvp'))
+    for i, job in enumerate(jobs):
+        job['image'] = image
+        if job['program'] in workloads.WORKLOADS:
+            job['hex'] = os.path.join(workdir, f'job{i}.hex')
+            write_hex(job['hex'], words_to_bytes(
+                workloads.load(job['program'], job.get('iterations'))))
+        else:
+            job['hex'] = image_hex(job['program'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('programs', nargs='*',
+                        help="workload[:iterations] or program images (default: all workloads)")
+    parser.add_argument('--list', help='file with one program spec per line')
+    parser.add_argument('--backend', choices=sorted(RUNNERS), default='model')
+    parser.add_argument('--shards', type=int, help='worker processes (default: all cores)')
+    parser.add_argument('--max-instructions', type=int)
+    args = parser.parse_args()
+    if args.backend == 'vvp' and args.max_instructions:
+        parser.error("--max-instructions is not supported by the vvp backend "
+                     f"(the testbench stops after {VVP_MAX_CYCLES} cycles)")
+
+    specs = list(args.programs)
+    if args.list:
+        with open(args.list) as f:
+            specs += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    specs = specs or list(workloads.WORKLOADS)
+    jobs = [parse_job(spec, args.backend, args.max_instructions) for spec in specs]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.backend == 'vvp':
+            prepare_vvp(jobs, workdir)
+        start = time.perf_counter()
+        per_job, per_shard, steals = run_sharded(jobs, args.shards)
+        elapsed = time.perf_counter() - start
+
+    print("SHARDED SIMULATION")
+    print(f"\n{'Program':<24} {'Instr':>10} {'Cycles':>10} {'CPI':>6}")
+    for spec, stats in zip(specs, per_job):
+        instructions = stats.get('instructions')
+        cpi = f"{stats['cycles'] / instructions:>6.2f}" if instructions else f"{'-':>6}"
+        print(f"{spec:<24} {instructions or '-':>10} {stats['cycles']:>10} {cpi}")
+
+    print(f"\n{'Shard':<8} {'Jobs':>6} {'Stolen':>7} {'Busy (s)':>9}")
+    for i, stats in enumerate(per_shard):
+        print(f"{i:<8} {stats.get('jobs', 0):>6} {steals[i]:>7} {stats.get('busy_time', 0):>9.2f}")
+
+    total = merge_all(per_shard)
+    print(f"\nTotal: {total['jobs']} jobs, {total['cycles']} cycles in {elapsed:.2f} s wall")
+    if total.get('instructions'):
+        print(f"Aggregate CPI: {total['cycles'] / total['instructions']:.3f} "
+              f"(per-program range {total['min_cpi']:.2f} - {total['max_cpi']:.2f})")
+        print(f"Stalls: {total['stalls']}  Flushes: {total['flushes']}  "
+              f"Forwards: {total['forwards']}")
+        print(f"\nCPI histogram ({HISTOGRAM_WINDOW}-instruction windows):")
+        for low, count in zip(CPI_BINS, total['cpi_histogram']):
+            if count:
+                print(f"  {low:>4.1f}{'+' if low == CPI_BINS[-1] else ' '} {count:>8}")
+        print(f"\nUtilization: {total['busy_time'] / (elapsed * len(per_shard)):.1%} "
+              f"of {len(per_shard)} shards")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+SimPoint-Style Sampled Simulation for the Pipelined RISC-V Processor
+Clusters basic-block vectors of fixed-length intervals from a functional run,
+times only a few intervals per cluster on the cycle model and combines them
+into a weighted whole-program CPI with a confidence bound
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+import checkpoint
+import pipeline_model
+import workloads
+from functional_sim import DMEM_SIZE, FunctionalSimulator
+from images import read_image
+from timing_analysis import performance_comparison
+
+INTERVAL = 10000          # instructions per interval
+PROJECTED_DIMENSIONS = 15  # random projection of the BBVs, as in SimPoint
+MAX_CLUSTERS = 10
+BIC_THRESHOLD = 0.9       # smallest k reaching 90% of the BIC range
+SAMPLES_PER_CLUSTER = 3   # representative plus random members, for the bound
+WARMUP = 16               # instructions replayed before an interval
+Z_95 = 1.96
+
+
+def collect_bbvs(program, interval=INTERVAL, max_instructions=None, dmem=None):
+    """Run a program functionally and record one basic-block vector per interval
+
+    Returns (bbvs, lengths): an intervals x blocks matrix of instruction
+    counts per block entry and the number of instructions in each interval.
+    """
+    sim = FunctionalSimulator(program, dmem)
+    profiles = []
+    lengths = []
+    while not sim.halted:
+        budget = interval
+        if max_instructions is not None:
+            budget = min(budget, max_instructions - sim.instret)
+            if budget <= 0:
+                break
+        profile = {}
+        executed = sim.run(budget, profile)
+        if executed == 0:
+            break
+        profiles.append(profile)
+        lengths.append(executed)
+
+    blocks = sorted(set().union(*profiles)) if profiles else []
+    column = {pc: i for i, pc in enumerate(blocks)}
+    bbvs = np.zeros((len(profiles), len(blocks)))
+    for row, profile in enumerate(profiles):
+        for pc, count in profile.items():
+            bbvs[row, column[pc]] = count
+    return bbvs, np.array(lengths)
+
+
+def project(bbvs, dimensions=PROJECTED_DIMENSIONS, seed=0):
+    """Normalize BBVs to frequencies and randomly project them to fewer dimensions"""
+    totals = bbvs.sum(axis=1, keepdims=True)
+    frequencies = bbvs / np.maximum(totals, 1)
+    if bbvs.shape[1] <= dimensions:
+        return frequencies
+    rng = np.random.default_rng(seed)
+    return frequencies @ rng.uniform(-1.0, 1.0, size=(bbvs.shape[1], dimensions))
+
+
+def kmeans(points, k, seed=0, iterations=100):
+    """Vectorized k-means with k-means++ seeding
+
+    Returns (labels, centroids, inertia).
+    """
+    rng = np.random.default_rng(seed)
+    centroids = np.empty((k, points.shape[1]))
+    centroids[0] = points[rng.integers(len(points))]
+    distances = ((points - centroids[0]) ** 2).sum(axis=1)
+    for i in range(1, k):
+        total = distances.sum()
+        choice = rng.choice(len(points), p=distances / total) if total > 0 \
+            else rng.integers(len(points))
+        centroids[i] = points[choice]
+        distances = np.minimum(distances, ((points - centroids[i]) ** 2).sum(axis=1))
+
+    labels = np.full(len(points), -1)
+    for _ in range(iterations):
+        # All point-to-centroid distances at once: (points, clusters)
+        distances = ((points[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+        new_labels = distances.argmin(axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, points)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            # Re-seed empty clusters with the points farthest from their centroid
+            farthest = np.argsort(distances[np.arange(len(points)), labels])[::-1]
+            centroids[empty] = points[farthest[:empty.sum()]]
+
+    inertia = float(((points - centroids[labels]) ** 2).sum())
+    return labels, centroids, inertia
+
+
+def bic(points, labels, centroids, inertia):
+    """Bayesian information criterion of a clustering (x-means formulation)"""
+    count, dims = points.shape
+    k = len(centroids)
+    if count <= k:
+        return -np.inf
+    variance = max(inertia / (dims * (count - k)), 1e-12)
+    sizes = np.bincount(labels, minlength=k)
+    sizes = sizes[sizes > 0]
+    likelihood = float(np.sum(
+        sizes * np.log(sizes) - sizes * np.log(count)
+        - sizes * np.log(2 * np.pi * variance) * dims / 2
+        - (sizes - 1) * dims / 2))
+    parameters = (k - 1) + dims * k + 1
+    return likelihood - parameters / 2 * np.log(count)
+
+
+def choose_clustering(points, max_clusters=MAX_CLUSTERS, seed=0):
+    """Pick the smallest k whose BIC reaches BIC_THRESHOLD of the observed range
+
+    Too few intervals for any finite BIC (fewer than two) give one cluster.
+    """
+    single = np.zeros(len(points), dtype=int), points.mean(axis=0, keepdims=True)
+    if len(points) < 2:
+        return single
+    candidates = []
+    for k in range(1, min(max_clusters, len(points)) + 1):
+        labels, centroids, inertia = kmeans(points, k, seed)
+        candidates.append((bic(points, labels, centroids, inertia), labels, centroids))
+    scores = np.array([score for score, _, _ in candidates])
+    finite = scores[np.isfinite(scores)]
+    if not len(finite):
+        return single
+    low, high = finite.min(), finite.max()
+    for score, labels, centroids in candidates:
+        if high == low or score >= low + BIC_THRESHOLD * (high - low):
+            return labels, centroids
+    return candidates[-1][1], candidates[-1][2]
+
+
+def select_samples(points, labels, centroids, samples=SAMPLES_PER_CLUSTER, seed=0):
+    """Representative (closest to centroid) plus random members of every cluster"""
+    rng = np.random.default_rng(seed)
+    chosen = {}
+    for cluster in range(len(centroids)):
+        members = np.flatnonzero(labels == cluster)
+        if not len(members):
+            continue
+        distances = ((points[members] - centroids[cluster]) ** 2).sum(axis=1)
+        representative = members[distances.argmin()]
+        others = rng.permutation(members[members != representative])
+        chosen[cluster] = [int(representative)] + [int(i) for i in others[:samples - 1]]
+    return chosen
+
+
+def time_intervals(program, intervals, interval=INTERVAL, dmem=None, checkpoint_dir=None):
+    """Steady-state CPI of selected intervals on the pipelined cycle model
+
+    The functional model fast-forwards to each interval in a single pass and
+    traces WARMUP instructions before it, so hazards across the interval
+    boundary are charged. The warmup shrinks when the previous timed
+    interval already ran past its start (adjacent intervals), so every
+    interval is measured from its own first instruction. Optionally saves an
+    RTL checkpoint per interval.
+    """
+    sim = FunctionalSimulator(program, dmem)
+    cpis = {}
+    for index in sorted(intervals):
+        start = index * interval
+        warmup = min(WARMUP, start - sim.instret)
+        sim.run(start - warmup - sim.instret)
+        if checkpoint_dir:
+            checkpoint.save(sim, os.path.join(checkpoint_dir, f'interval_{index}'),
+                            interval=index, warmup=warmup, length=interval)
+        trace = pipeline_model.trace_arrays(sim.trace(warmup + interval))
+        result = pipeline_model.simulate(trace)
+        cpis[index] = pipeline_model.steady_state_cpi(result, warmup)
+    return cpis
+
+
+def estimate_cpi(labels, lengths, chosen, cpis):
+    """Stratified CPI estimate and its 95% confidence half-width
+
+    Clusters are weighted by their share of instructions. The variance uses
+    the sample variance within each cluster; clusters with a single timed
+    interval borrow the pooled within-cluster variance.
+    """
+    total = lengths.sum()
+    pooled = [np.var([cpis[i] for i in members], ddof=1)
+              for members in chosen.values() if len(members) > 1]
+    pooled_variance = float(np.mean(pooled)) if pooled else 0.0
+
+    estimate = 0.0
+    representative_estimate = 0.0
+    variance = 0.0
+    for cluster, members in chosen.items():
+        weight = lengths[labels == cluster].sum() / total
+        size = int((labels == cluster).sum())
+        values = np.array([cpis[i] for i in members])
+        estimate += weight * values.mean()
+        representative_estimate += weight * values[0]
+        spread = values.var(ddof=1) if len(values) > 1 else pooled_variance
+        variance += weight ** 2 * spread / len(values) * (1 - len(values) / size)
+
+    return {
+        'cpi': estimate,
+        'representative_cpi': representative_estimate,
+        'bound': Z_95 * np.sqrt(variance),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('program', help='program image ($readmemh bytes) or workload name')
+    parser.add_argument('--iterations', type=int, help='iteration count for a workload')
+    parser.add_argument('--data', help='initial data memory image')
+    parser.add_argument('--interval', type=int, default=INTERVAL)
+    parser.add_argument('--max-instructions', type=int)
+    parser.add_argument('--max-clusters', type=int, default=MAX_CLUSTERS)
+    parser.add_argument('--samples', type=int, default=SAMPLES_PER_CLUSTER)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--checkpoints', help='write an RTL checkpoint for every timed interval')
+    parser.add_argument('--full', action='store_true',
+                        help='also time the whole program to check the estimate')
+    args = parser.parse_args()
+
+    if args.program in workloads.WORKLOADS:
+        program = workloads.load(args.program, args.iterations)
+    else:
+        program = read_image(args.program)
+    dmem = read_image(args.data, DMEM_SIZE, writable=True) if args.data else None
+
+    print("SIMPOINT SAMPLED SIMULATION")
+    bbvs, lengths = collect_bbvs(program, args.interval, args.max_instructions, dmem)
+    if not len(lengths):
+        raise SystemExit("program retired no instructions")
+    points = project(bbvs, seed=args.seed)
+    labels, centroids = choose_clustering(points, args.max_clusters, args.seed)
+    chosen = select_samples(points, labels, centroids, args.samples, args.seed)
+
+    timed = sorted({i for members in chosen.values() for i in members})
+    cpis = time_intervals(program, timed, args.interval,
+                          bytearray(dmem) if dmem else None, args.checkpoints)
+    result = estimate_cpi(labels, lengths, chosen, cpis)
+
+    total = int(lengths.sum())
+    print(f"\nInstructions: {total} in {len(lengths)} intervals of {args.interval}")
+    print(f"Basic blocks: {bbvs.shape[1]}, clusters: {len(chosen)}, "
+          f"intervals timed: {len(timed)} ({len(timed) / len(lengths):.1%})")
+    print(f"\n{'Cluster':<10} {'Weight':>8} {'Rep':>6} {'Rep CPI':>8} {'Samples':>8}")
+    for cluster, members in chosen.items():
+        weight = lengths[labels == cluster].sum() / total
+        print(f"{cluster:<10} {weight:>8.3f} {members[0]:>6} {cpis[members[0]]:>8.3f} "
+              f"{len(members):>8}")
+
+    print(f"\nRepresentative CPI: {result['representative_cpi']:.4f}")
+    print(f"Sampled CPI: {result['cpi']:.4f} +/- {result['bound']:.4f} (95%)")
+
+    if args.full:
+        full = pipeline_model.run_program(program, args.max_instructions,
+                                          bytearray(dmem) if dmem else None)
+        error = (result['cpi'] - full['cpi']) / full['cpi']
+        print(f"Full-run CPI: {full['cpi']:.4f} (sampling error {error:+.2%})")
+
+    print()
+    performance_comparison(pipe_cpi=result['cpi'], num_instructions=total)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Store Buffer and Write-Combining What-If Model
+Replays the loads and stores of retire traces through a store buffer in
+front of data_memory / unified_memory, with configurable depth, combining
+line size and drain policy and with load forwarding from the buffer, and
+reports the memory-port cycles and multi-cycle MEMWRITE states it removes
+"""
+
+import argparse
+
+import numpy as np
+
+import fsm_model
+import workloads
+from ilp_limit import program_batches
+from images import read_image
+from riscv_isa import OP_STORE, words_to_bytes
+
+ACCESS_BYTES = 8                  # LD and SD move a doubleword
+DEPTHS = [1, 2, 4, 8]
+LINES = [8, 32]                   # 8: no combining across doublewords
+POLICIES = ('eager', 'combine', 'watermark', 'lazy')
+
+# Cycles per instruction class in which the unified memory port is idle
+# (every state except FETCH and the data access). A buffered store writes
+# the buffer at the end of MEMADR and skips MEMWRITE.
+IDLE_PORT_CYCLES = {kind: sum(state not in ('FETCH', 'MEMREAD', 'MEMWRITE') for state in path)
+                    for kind, path in fsm_model.PATHS.items()}
+
+
+class StoreBuffer:
+    """FIFO of line-sized entries with per-byte valid masks
+
+    A store into a line already buffered merges into its entry; otherwise
+    it allocates one, waiting for the oldest entry to drain when the buffer
+    is full. Entries drain one per idle port cycle: always ('eager'), all
+    but the youngest, which stays open for combining ('combine'), only above
+    half occupancy ('watermark'), or only when forced ('lazy').
+    A load fully covered by one entry is forwarded; one that partially
+    overlaps an entry waits for that entry to drain. A store that crosses a
+    line drains the entries it overlaps and is written through unbuffered.
+    """
+
+    def __init__(self, depth, line=ACCESS_BYTES, policy='eager'):
+        if line < ACCESS_BYTES or line & (line - 1):
+            raise ValueError(f"line size must be a power of two >= {ACCESS_BYTES}")
+        if policy not in POLICIES:
+            raise ValueError(f"unknown drain policy {policy}")
+        self.depth = depth
+        self.line = line
+        self.policy = policy
+        self.entries = {}           # line address -> byte mask, oldest first
+        self.stores = self.combined = self.full_stalls = 0
+        self.loads = self.forwarded = self.conflict_drains = 0
+        self.drains = self.written_through = 0
+
+    def _span(self, addr):
+        """(line address, byte mask) of an access, None if it crosses a line"""
+        base = addr & ~(self.line - 1)
+        offset = addr - base
+        if offset + ACCESS_BYTES > self.line:
+            return None
+        return base, ((1 << ACCESS_BYTES) - 1) << offset
+
+    def _drain(self, line=None):
+        if line is None:
+            line = next(iter(self.entries))
+        del self.entries[line]
+        self.drains += 1
+
+    def idle(self, cycles):
+        """Drain entries during idle port cycles"""
+        limit = {'eager': 0, 'combine': 1, 'watermark': self.depth // 2,
+                 'lazy': self.depth}[self.policy]
+        while cycles and len(self.entries) > limit:
+            self._drain()
+            cycles -= 1
+
+    def store(self, addr):
+        """Buffer a store; returns True if it had to wait for a drain"""
+        self.stores += 1
+        span = self._span(addr)
+        if span is None:
+            for line in {addr & ~(self.line - 1), (addr + ACCESS_BYTES - 1) & ~(self.line - 1)}:
+                if line in self.entries:
+                    self._drain(line)   # older bytes must reach memory first
+            self.written_through += 1
+            self.drains += 1        # written through like an unbuffered store
+            return True
+        line, mask = span
+        if line in self.entries:
+            self.entries[line] |= mask
+            self.combined += 1
+            return False
+        stalled = len(self.entries) == self.depth
+        if stalled:
+            self._drain()
+            self.full_stalls += 1
+        self.entries[line] = mask
+        return stalled
+
+    def load(self, addr):
+        """Look a load up; returns 'forward', 'conflict' or 'memory'"""
+        self.loads += 1
+        span = self._span(addr)
+        lines = [span] if span else [self._span(addr - addr % ACCESS_BYTES),
+                                     self._span(addr - addr % ACCESS_BYTES + ACCESS_BYTES)]
+        if span and span[0] in self.entries and \
+                self.entries[span[0]] & span[1] == span[1]:
+            self.forwarded += 1
+            return 'forward'
+        conflict = False
+        for line, _ in filter(None, lines):
+            if line in self.entries:
+                self._drain(line)
+                conflict = True
+        if conflict:
+            self.conflict_drains += 1
+            return 'conflict'
+        return 'memory'
+
+    def flush(self):
+        while self.entries:
+            self._drain()
+
+
+def replay(batches, buffers):
+    """Feed every buffer the loads, stores and idle port cycles of a trace
+
+    Returns the class mix of the trace for the multi-cycle cycle count.
+    """
+    mix = dict.fromkeys(fsm_model.CLASSES, 0)
+    idle_by_class = [IDLE_PORT_CYCLES[kind] for kind in fsm_model.CLASSES]
+    for trace, addr in batches:
+        for kind, count in fsm_model.class_counts(trace).items():
+            mix[kind] += count
+        opcode = trace['opcode']
+        idle = np.array(idle_by_class)[fsm_model.class_index(trace)]
+        memory = np.flatnonzero(trace['load'] | (opcode == OP_STORE))
+        # Idle cycles of the instructions since the previous memory access,
+        # including that access's own idle states
+        before = np.diff(np.concatenate(([0], np.cumsum(idle)[memory]))) - idle[memory]
+        own = idle[memory]
+        is_store = (opcode[memory] == OP_STORE).tolist()
+        addrs = [addr[i] for i in memory.tolist()]
+        for buffer in buffers:
+            carry = 0
+            for gap, stay, store, address in zip(before.tolist(), own.tolist(), is_store, addrs):
+                buffer.idle(carry + gap)
+                if store:
+                    buffer.store(address)
+                else:
+                    buffer.load(address)
+                carry = stay
+            buffer.idle(carry)
+    for buffer in buffers:
+        buffer.flush()
+    return mix
+
+
+def report(buffer, mix):
+    """Port cycles and multi-cycle states removed by a buffer"""
+    instructions = sum(mix.values())
+    base = sum(fsm_model.residency(mix).values())
+    memwrite_removed = buffer.stores - buffer.full_stalls - buffer.written_through
+    cycles = base - memwrite_removed + buffer.conflict_drains
+    return {
+        'port_writes': buffer.drains,
+        'port_saved': buffer.stores - buffer.drains + buffer.forwarded,
+        'memwrite_removed': memwrite_removed,
+        'written_through': buffer.written_through,
+        'cpi': cycles / instructions if instructions else 0.0,
+        'base_cpi': base / instructions if instructions else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('programs', nargs='*', default=['memcpy', 'array_init', 'phases'],
+                        help='workload names or program images')
+    parser.add_argument('--depths', nargs='+', type=int, default=DEPTHS)
+    parser.add_argument('--lines', nargs='+', type=int, default=LINES,
+                        help='combining line sizes in bytes')
+    parser.add_argument('--policy', choices=POLICIES, default='combine', help='drain policy')
+    parser.add_argument('--max-instructions', type=int, default=200000)
+    args = parser.parse_args()
+
+    print(f"STORE BUFFER MODEL ({args.policy} drain)")
+    for name in args.programs:
+        if name in workloads.WORKLOADS:
+            batches = program_batches(words_to_bytes(workloads.load(name)), args.max_instructions)
+        else:
+            batches = program_batches(read_image(name), args.max_instructions)
+        configs = [(depth, line) for line in args.lines for depth in args.depths]
+        buffers = [StoreBuffer(depth, line, args.policy) for depth, line in configs]
+        mix = replay(batches, buffers)
+        stores, loads = buffers[0].stores, buffers[0].loads
+        print(f"\n{name}: {sum(mix.values())} instructions, {stores} stores, {loads} loads, "
+              f"multi-cycle CPI {report(buffers[0], mix)['base_cpi']:.3f} without a buffer")
+        print(f"{'Depth':>5} {'Line':>5} {'Combined':>9} {'Forwarded':>10} {'Full':>7} "
+              f"{'Thru':>6} {'Port writes':>12} {'Port saved':>11} {'MEMWRITE cut':>13} {'CPI':>7}")
+        for (depth, line), buffer in zip(configs, buffers):
+            stats = report(buffer, mix)
+            print(f"{depth:>5} {line:>5} {buffer.combined:>9} {buffer.forwarded:>10} "
+                  f"{buffer.full_stalls:>7} {buffer.written_through:>6} "
+                  f"{stats['port_writes']:>12} {stats['port_saved']:>11} "
+                  f"{stats['memwrite_removed']:>13} {stats['cpi']:>7.3f}")
+
+
+if __name__ == '__main__':
+    main()
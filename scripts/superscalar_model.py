@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Superscalar What-If Model of the Pipelined RISC-V Processor
+Times retire traces on an N-wide in-order variant of pipelined_processor with
+a configurable number of ALUs and data-memory ports, and scales f_max by the
+wider forwarding muxes the extra bypass sources need
+"""
+
+import argparse
+import math
+
+import numpy as np
+
+import pipeline_model
+import workloads
+from functional_sim import FunctionalSimulator
+from pipeline_model import BRANCH_PENALTY
+from riscv_isa import OP_STORE
+from timing_analysis import DELAYS, pipelined_stages
+
+# (issue width, ALUs, memory ports) compared by default
+CONFIGS = [(1, 1, 1), (2, 1, 1), (2, 2, 1), (2, 2, 2), (4, 2, 1), (4, 4, 2)]
+
+# Issue-to-issue distance from a producer to a dependent instruction with
+# full forwarding: ALU results are bypassed from MEM, loads from WB
+ALU_LATENCY = 1
+LOAD_LATENCY = 2
+
+
+def last_writers(trace):
+    """Index of the most recent older writer of rs1 and rs2 (-1 if none)
+
+    Like hazard_detection_unit, the raw rs fields are compared whether or
+    not the instruction reads them. Vectorized per architectural register.
+    """
+    n = len(trace['word'])
+    writes = trace['reg_write'] & (trace['rd'] != 0)
+    producers = {}
+    for field in ('rs1', 'rs2'):
+        source = trace[field]
+        producer = np.full(n, -1)
+        for reg in range(1, 32):
+            positions = np.flatnonzero(writes & (trace['rd'] == reg))
+            readers = np.flatnonzero(source == reg)
+            if len(positions) and len(readers):
+                found = np.searchsorted(positions, readers) - 1
+                valid = found >= 0
+                producer[readers[valid]] = positions[found[valid]]
+        producers[field] = producer
+    return producers['rs1'], producers['rs2']
+
+
+def simulate(trace, width=1, alus=1, mem_ports=1, branch_penalty=BRANCH_PENALTY):
+    """Issue cycle of every instruction on a width-wide in-order core
+
+    An instruction issues (leaves ID) once its producers' results can be
+    forwarded, no earlier than its predecessor, and in a cycle that still
+    has an issue slot and a free ALU or memory port. Branches resolve in ID
+    like the scalar core: they end the issue group and, as if_id_flush
+    fires on every branch, the next instruction issues branch_penalty
+    cycles later. Width 1 reproduces pipeline_model.simulate exactly.
+    """
+    n = len(trace['word'])
+    producer1, producer2 = last_writers(trace)
+    latency = np.where(trace['load'], LOAD_LATENCY, ALU_LATENCY)
+    memory = (trace['load'] | (trace['opcode'] == OP_STORE)).tolist()
+    branch = trace['branch'].tolist()
+    producer1, producer2, latency = producer1.tolist(), producer2.tolist(), latency.tolist()
+
+    issue = [0] * n
+    cycle = 0                 # current issue group
+    used = alu_used = mem_used = 0
+    barrier = 1               # earliest cycle after the last branch
+    for i in range(n):
+        ready = max(cycle, barrier)
+        p = producer1[i]
+        if p >= 0 and issue[p] + latency[p] > ready:
+            ready = issue[p] + latency[p]
+        p = producer2[i]
+        if p >= 0 and issue[p] + latency[p] > ready:
+            ready = issue[p] + latency[p]
+        if ready == cycle and (used == width or (memory[i] and mem_used == mem_ports) or
+                               (not memory[i] and not branch[i] and alu_used == alus)):
+            ready += 1
+        if ready != cycle:
+            cycle = ready
+            used = alu_used = mem_used = 0
+        issue[i] = cycle
+        used += 1
+        if branch[i]:
+            barrier = cycle + 1 + branch_penalty
+        elif memory[i]:
+            mem_used += 1
+        else:
+            alu_used += 1
+
+    id_end = np.array(issue, dtype=np.int64)
+    cycles = int(id_end[-1]) + pipeline_model.PIPELINE_DEPTH - 1 if n else 0
+    return {
+        'instructions': n,
+        'cycles': cycles,
+        'ipc': n / cycles if cycles else 0.0,
+        'id_end': id_end,
+    }
+
+
+def forwarding_sources(width):
+    """Inputs of each ALU operand mux: register file plus MEM and WB of every lane"""
+    return 1 + 2 * width
+
+
+def timing(width):
+    """(f_max in MHz, period in ns, critical stage) of a width-wide variant
+
+    The scalar EX stage has one 4:1 forwarding mux level; wider bypass
+    networks are modelled as a tree of 4:1 muxes.
+    """
+    levels = max(1, math.ceil(math.log(forwarding_sources(width), 4)))
+    stages = pipelined_stages()
+    stages['EX (Execute)'] = [
+        (component, levels * DELAYS['mux_4to1'] if component == 'Forwarding Mux' else delay)
+        for component, delay in stages['EX (Execute)']]
+    delays = {name: sum(delay for _, delay in components)
+              for name, components in stages.items()}
+    critical = max(delays, key=delays.get)
+    return 1000 / delays[critical], delays[critical], critical
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('workloads', nargs='*', default=list(workloads.WORKLOADS))
+    parser.add_argument('--config', nargs=3, type=int, action='append',
+                        metavar=('WIDTH', 'ALUS', 'PORTS'),
+                        help='configurations to compare (default: a preset sweep)')
+    parser.add_argument('--max-instructions', type=int, default=200000)
+    args = parser.parse_args()
+    configs = args.config or CONFIGS
+
+    print("SUPERSCALAR WHAT-IF MODEL")
+    print(f"\n{'Config':<14} {'f_max':>10} {'Period':>9}  Critical stage")
+    for width, alus, ports in configs:
+        f_max, period, critical = timing(width)
+        print(f"{width}w {alus}alu {ports}mem  {f_max:>6.1f} MHz {period:>6.2f} ns  {critical}")
+
+    base_freq = timing(1)[0]
+    speedups = {config: [] for config in configs}
+    header = ''.join(f"{f'{w}w{a}a{p}m':>10}" for w, a, p in configs)
+    print(f"\nIPC\n{'Workload':<18}{header}")
+    for name in args.workloads:
+        sim = FunctionalSimulator(workloads.load(name))
+        trace = pipeline_model.trace_arrays(sim.trace(args.max_instructions))
+        base = simulate(trace)
+        row = ''
+        for config in configs:
+            stats = simulate(trace, *config)
+            speedups[config].append(base['cycles'] / stats['cycles'] *
+                                    timing(config[0])[0] / base_freq)
+            row += f"{stats['ipc']:>10.3f}"
+        print(f"{name:<18}{row}")
+
+    print("\nSpeedup over the scalar core (geomean, including f_max)")
+    print(f"{'':<18}" + ''.join(
+        f"{float(np.exp(np.mean(np.log(values)))):>9.2f}x" for values in speedups.values()))
+
+
+if __name__ == '__main__':
+    main()
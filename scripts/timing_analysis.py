@@ -43,50 +43,54 @@ DELAYS = {
     'wire_long': 0.3,        # Long wire delay
 }
 
-def analyze_single_cycle():
-    """Analyze critical path for single-cycle processor"""
-    
-    print("SINGLE-CYCLE PROCESSOR TIMING ANALYSIS")
-    
-    
-    # Critical path: Memory -> RegFile -> ALU -> Memory -> RegFile
-    paths = {
+def single_cycle_paths(delays=DELAYS):
+    """Component delays of each single-cycle processor instruction path"""
+    return {
         'R-type (ADD)': [
-            ('Instruction Memory Read', DELAYS['memory_read']),
-            ('Wire to Control', DELAYS['wire_short']),
-            ('Instruction Decode', DELAYS['decoder']),
-            ('Control Signal Gen', DELAYS['control']),
-            ('Wire to RegFile', DELAYS['wire_medium']),
-            ('Register File Read', DELAYS['regfile_read']),
-            ('Wire to ALU', DELAYS['wire_medium']),
-            ('ALU Operation (ADD)', DELAYS['alu_add']),
-            ('Wire to RegFile', DELAYS['wire_medium']),
-            ('Register Write Setup', DELAYS['reg_setup']),
+            ('Instruction Memory Read', delays['memory_read']),
+            ('Wire to Control', delays['wire_short']),
+            ('Instruction Decode', delays['decoder']),
+            ('Control Signal Gen', delays['control']),
+            ('Wire to RegFile', delays['wire_medium']),
+            ('Register File Read', delays['regfile_read']),
+            ('Wire to ALU', delays['wire_medium']),
+            ('ALU Operation (ADD)', delays['alu_add']),
+            ('Wire to RegFile', delays['wire_medium']),
+            ('Register Write Setup', delays['reg_setup']),
         ],
         
         'Load (LD)': [
-            ('Instruction Memory Read', DELAYS['memory_read']),
-            ('Instruction Decode', DELAYS['decoder']),
-            ('Control Signal Gen', DELAYS['control']),
-            ('Register File Read', DELAYS['regfile_read']),
-            ('Wire to ALU', DELAYS['wire_medium']),
-            ('ALU Add (Address Calc)', DELAYS['alu_add']),
-            ('Wire to Data Memory', DELAYS['wire_long']),
-            ('Data Memory Read', DELAYS['memory_read']),
-            ('Wire to RegFile', DELAYS['wire_long']),
-            ('Register Write Setup', DELAYS['reg_setup']),
+            ('Instruction Memory Read', delays['memory_read']),
+            ('Instruction Decode', delays['decoder']),
+            ('Control Signal Gen', delays['control']),
+            ('Register File Read', delays['regfile_read']),
+            ('Wire to ALU', delays['wire_medium']),
+            ('ALU Add (Address Calc)', delays['alu_add']),
+            ('Wire to Data Memory', delays['wire_long']),
+            ('Data Memory Read', delays['memory_read']),
+            ('Wire to RegFile', delays['wire_long']),
+            ('Register Write Setup', delays['reg_setup']),
         ],
         
         'Store (SD)': [
-            ('Instruction Memory Read', DELAYS['memory_read']),
-            ('Instruction Decode', DELAYS['decoder']),
-            ('Control Signal Gen', DELAYS['control']),
-            ('Register File Read', DELAYS['regfile_read']),
-            ('ALU Add (Address Calc)', DELAYS['alu_add']),
-            ('Wire to Data Memory', DELAYS['wire_long']),
-            ('Data Memory Write', DELAYS['memory_write']),
+            ('Instruction Memory Read', delays['memory_read']),
+            ('Instruction Decode', delays['decoder']),
+            ('Control Signal Gen', delays['control']),
+            ('Register File Read', delays['regfile_read']),
+            ('ALU Add (Address Calc)', delays['alu_add']),
+            ('Wire to Data Memory', delays['wire_long']),
+            ('Data Memory Write', delays['memory_write']),
         ],
     }
+
+def analyze_single_cycle():
+    """Analyze critical path for single-cycle processor"""
+    
+    print("SINGLE-CYCLE PROCESSOR TIMING ANALYSIS")
+    
+    
+    # Critical path: Memory -> RegFile -> ALU -> Memory -> RegFile
+    paths = single_cycle_paths()
     
     max_delay = 0
     critical_path_name = ""
@@ -115,49 +119,53 @@ def analyze_single_cycle():
     
     return f_max, period
 
-def analyze_multi_cycle():
-    """Analyze critical path for multi-cycle processor"""
-    
-    print("MULTI-CYCLE PROCESSOR TIMING ANALYSIS")
-    
-    
-    # Critical path: Longest single stage
-    stages = {
+def multi_cycle_stages(delays=DELAYS):
+    """Component delays of each multi-cycle processor step"""
+    return {
         'FETCH': [
-            ('Memory Read', DELAYS['memory_read']),
-            ('Wire to IR', DELAYS['wire_medium']),
-            ('IR Setup', DELAYS['reg_setup']),
+            ('Memory Read', delays['memory_read']),
+            ('Wire to IR', delays['wire_medium']),
+            ('IR Setup', delays['reg_setup']),
         ],
         
         'DECODE': [
-            ('Register File Read', DELAYS['regfile_read']),
-            ('Wire to A/B', DELAYS['wire_short']),
-            ('A/B Setup', DELAYS['reg_setup']),
+            ('Register File Read', delays['regfile_read']),
+            ('Wire to A/B', delays['wire_short']),
+            ('A/B Setup', delays['reg_setup']),
         ],
         
         'EXECUTE (ALU)': [
-            ('Reg Clk-to-Q (A)', DELAYS['reg_clk_to_q']),
-            ('Mux Select', DELAYS['mux_4to1']),
-            ('ALU Operation', DELAYS['alu_add']),
-            ('Wire to ALUOut', DELAYS['wire_medium']),
-            ('ALUOut Setup', DELAYS['reg_setup']),
+            ('Reg Clk-to-Q (A)', delays['reg_clk_to_q']),
+            ('Mux Select', delays['mux_4to1']),
+            ('ALU Operation', delays['alu_add']),
+            ('Wire to ALUOut', delays['wire_medium']),
+            ('ALUOut Setup', delays['reg_setup']),
         ],
         
         'MEMORY': [
-            ('Reg Clk-to-Q (ALUOut)', DELAYS['reg_clk_to_q']),
-            ('Address Mux', DELAYS['mux_2to1']),
-            ('Memory Access', DELAYS['memory_read']),
-            ('Wire to MDR', DELAYS['wire_medium']),
-            ('MDR Setup', DELAYS['reg_setup']),
+            ('Reg Clk-to-Q (ALUOut)', delays['reg_clk_to_q']),
+            ('Address Mux', delays['mux_2to1']),
+            ('Memory Access', delays['memory_read']),
+            ('Wire to MDR', delays['wire_medium']),
+            ('MDR Setup', delays['reg_setup']),
         ],
         
         'WRITEBACK': [
-            ('Reg Clk-to-Q (ALUOut/MDR)', DELAYS['reg_clk_to_q']),
-            ('Result Mux', DELAYS['mux_2to1']),
-            ('Wire to RegFile', DELAYS['wire_medium']),
-            ('Register Write Setup', DELAYS['reg_setup']),
+            ('Reg Clk-to-Q (ALUOut/MDR)', delays['reg_clk_to_q']),
+            ('Result Mux', delays['mux_2to1']),
+            ('Wire to RegFile', delays['wire_medium']),
+            ('Register Write Setup', delays['reg_setup']),
         ],
     }
+
+def analyze_multi_cycle():
+    """Analyze critical path for multi-cycle processor"""
+    
+    print("MULTI-CYCLE PROCESSOR TIMING ANALYSIS")
+    
+    
+    # Critical path: Longest single stage
+    stages = multi_cycle_stages()
     
     max_delay = 0
     critical_stage = ""
@@ -186,56 +194,60 @@ def analyze_multi_cycle():
     
     return f_max, period
 
-def analyze_pipelined():
-    """Analyze critical path for pipelined processor"""
-    
-    print("PIPELINED PROCESSOR TIMING ANALYSIS")
-    
-    
-    # Critical path: Longest pipeline stage
-    stages = {
+def pipelined_stages(delays=DELAYS):
+    """Component delays of each pipelined processor stage"""
+    return {
         'IF (Instruction Fetch)': [
-            ('PC Clk-to-Q', DELAYS['reg_clk_to_q']),
-            ('Wire to Memory', DELAYS['wire_short']),
-            ('Instruction Memory', DELAYS['memory_read']),
-            ('Wire to IF/ID', DELAYS['wire_medium']),
-            ('IF/ID Setup', DELAYS['reg_setup']),
+            ('PC Clk-to-Q', delays['reg_clk_to_q']),
+            ('Wire to Memory', delays['wire_short']),
+            ('Instruction Memory', delays['memory_read']),
+            ('Wire to IF/ID', delays['wire_medium']),
+            ('IF/ID Setup', delays['reg_setup']),
         ],
         
         'ID (Instruction Decode)': [
-            ('IF/ID Clk-to-Q', DELAYS['reg_clk_to_q']),
-            ('Decode Logic', DELAYS['decoder']),
-            ('Control Unit', DELAYS['control']),
-            ('Register File Read', DELAYS['regfile_read']),
-            ('Sign Extend', DELAYS['sign_extend']),
-            ('Wire to ID/EX', DELAYS['wire_medium']),
-            ('ID/EX Setup', DELAYS['reg_setup']),
+            ('IF/ID Clk-to-Q', delays['reg_clk_to_q']),
+            ('Decode Logic', delays['decoder']),
+            ('Control Unit', delays['control']),
+            ('Register File Read', delays['regfile_read']),
+            ('Sign Extend', delays['sign_extend']),
+            ('Wire to ID/EX', delays['wire_medium']),
+            ('ID/EX Setup', delays['reg_setup']),
         ],
         
         'EX (Execute)': [
-            ('ID/EX Clk-to-Q', DELAYS['reg_clk_to_q']),
-            ('Forwarding Mux', DELAYS['mux_4to1']),
-            ('ALU Control', DELAYS['alu_control']),
-            ('ALU Operation', DELAYS['alu_add']),
-            ('Wire to EX/MEM', DELAYS['wire_medium']),
-            ('EX/MEM Setup', DELAYS['reg_setup']),
+            ('ID/EX Clk-to-Q', delays['reg_clk_to_q']),
+            ('Forwarding Mux', delays['mux_4to1']),
+            ('ALU Control', delays['alu_control']),
+            ('ALU Operation', delays['alu_add']),
+            ('Wire to EX/MEM', delays['wire_medium']),
+            ('EX/MEM Setup', delays['reg_setup']),
         ],
         
         'MEM (Memory Access)': [
-            ('EX/MEM Clk-to-Q', DELAYS['reg_clk_to_q']),
-            ('Wire to Memory', DELAYS['wire_short']),
-            ('Data Memory Read', DELAYS['memory_read']),
-            ('Wire to MEM/WB', DELAYS['wire_medium']),
-            ('MEM/WB Setup', DELAYS['reg_setup']),
+            ('EX/MEM Clk-to-Q', delays['reg_clk_to_q']),
+            ('Wire to Memory', delays['wire_short']),
+            ('Data Memory Read', delays['memory_read']),
+            ('Wire to MEM/WB', delays['wire_medium']),
+            ('MEM/WB Setup', delays['reg_setup']),
         ],
         
         'WB (Write Back)': [
-            ('MEM/WB Clk-to-Q', DELAYS['reg_clk_to_q']),
-            ('Writeback Mux', DELAYS['mux_2to1']),
-            ('Wire to RegFile', DELAYS['wire_medium']),
-            ('Register Write Setup', DELAYS['reg_setup']),
+            ('MEM/WB Clk-to-Q', delays['reg_clk_to_q']),
+            ('Writeback Mux', delays['mux_2to1']),
+            ('Wire to RegFile', delays['wire_medium']),
+            ('Register Write Setup', delays['reg_setup']),
         ],
     }
+
+def analyze_pipelined():
+    """Analyze critical path for pipelined processor"""
+    
+    print("PIPELINED PROCESSOR TIMING ANALYSIS")
+    
+    
+    # Critical path: Longest pipeline stage
+    stages = pipelined_stages()
     
     max_delay = 0
     critical_stage = ""
@@ -264,8 +276,13 @@ def analyze_pipelined():
     
     return f_max, period
 
-def performance_comparison():
-    """Compare performance across implementations"""
+def performance_comparison(pipe_cpi=None, num_instructions=10, mc_cpi=None):
+    """Compare performance across implementations
+
+    pipe_cpi overrides the pipelined CPI of the test program, e.g. with a
+    sampled workload estimate from simpoint.py; mc_cpi does the same for the
+    multi-cycle core, e.g. with the state-path CPI from fsm_model.py
+    """
     
     print("PERFORMANCE COMPARISON")
     
@@ -275,13 +292,12 @@ def performance_comparison():
     mc_freq, mc_period = analyze_multi_cycle()
     pipe_freq, pipe_period = analyze_pipelined()
     
-    # Test program characteristics
-    num_instructions = 10
-    
     # CPI values
     sc_cpi = 1.0        # Single-cycle: 1 instruction per cycle
-    mc_cpi = 4.25       # Multi-cycle: average from test
-    pipe_cpi = 3.0      # Pipelined: from test results
+    if mc_cpi is None:
+        mc_cpi = 4.25   # Multi-cycle: average from test
+    if pipe_cpi is None:
+        pipe_cpi = 3.0  # Pipelined: from test results
     
     # Calculate execution times (in nanoseconds)
     sc_time = num_instructions * sc_cpi * sc_period
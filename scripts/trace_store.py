@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Store for Simulation Artifacts
+Splits VCDs, logs and retire traces into chunks named by their SHA-256,
+stores each distinct chunk once (zlib-compressed) and keeps a per-artifact
+chunk index so any time, cycle or instruction range can be read back without
+decompressing the whole artifact
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import zlib
+
+import numpy as np
+
+import pipeline_model
+import workloads
+from functional_sim import FunctionalSimulator
+from images import read_image
+from riscv_isa import words_to_bytes
+from rtl_sim import ROOT
+
+CHUNK_MIN = 16 * 1024          # text chunk size bounds (bytes)
+CHUNK_MAX = 256 * 1024
+BOUNDARY_MASK = 0x3F           # 1 in 64 candidate lines ends a chunk
+TRACE_CHUNK = 4096             # instructions per retire-trace chunk
+COMPRESSION_LEVEL = 1          # zlib: favour speed, chunks dedupe first
+
+OBJECTS = 'objects'
+MANIFESTS = 'manifests'
+
+
+def text_chunks(lines, boundary=None):
+    """Content-defined chunking of a line sequence
+
+    A chunk ends after a candidate line (all lines, or those for which
+    `boundary` is true) whose CRC matches BOUNDARY_MASK once the chunk holds
+    CHUNK_MIN bytes, or at CHUNK_MAX. Boundaries depend only on nearby
+    content, so identical prefixes and repeated sections produce identical
+    chunks. Yields lists of lines.
+    """
+    chunk = []
+    size = 0
+    for line in lines:
+        # Cut before a candidate line so it opens the next chunk
+        if size >= CHUNK_MIN and (boundary is None or boundary(line)) and \
+                (size >= CHUNK_MAX or zlib.crc32(line) & BOUNDARY_MASK == 0):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(line)
+        size += len(line)
+    if chunk:
+        yield chunk
+
+
+def _encode_arrays(arrays):
+    """Serialize named 1-D numpy arrays: JSON header line plus raw data"""
+    header = [(name, str(values.dtype), len(values)) for name, values in sorted(arrays.items())]
+    return json.dumps(header).encode() + b'\n' + \
+        b''.join(np.ascontiguousarray(arrays[name]).tobytes() for name, _, _ in header)
+
+
+def _decode_arrays(data):
+    newline = data.index(b'\n')
+    arrays = {}
+    offset = newline + 1
+    for name, dtype, count in json.loads(data[:newline]):
+        values = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        arrays[name] = values
+        offset += values.nbytes
+    return arrays
+
+
+class TraceStore:
+    """Chunk objects under objects/<2 hex>/<digest>, indexes under manifests/"""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(os.path.join(root, OBJECTS), exist_ok=True)
+        os.makedirs(os.path.join(root, MANIFESTS), exist_ok=True)
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, OBJECTS, digest[:2], digest[2:])
+
+    def _manifest_path(self, name):
+        return os.path.join(self.root, MANIFESTS, name.replace('/', '__') + '.json')
+
+    def put_chunk(self, data):
+        """Store a chunk unless an identical one exists; returns (digest, new)"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            return digest, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(zlib.compress(data, COMPRESSION_LEVEL))
+        os.replace(temporary, path)
+        return digest, True
+
+    def get_chunk(self, digest):
+        with open(self._object_path(digest), 'rb') as f:
+            return zlib.decompress(f.read())
+
+    def _write_manifest(self, name, manifest):
+        with open(self._manifest_path(name), 'w') as f:
+            json.dump(manifest, f, indent=1)
+        return manifest
+
+    def manifest(self, name):
+        with open(self._manifest_path(name)) as f:
+            return json.load(f)
+
+    def names(self):
+        return sorted(entry[:-5].replace('__', '/')
+                      for entry in os.listdir(os.path.join(self.root, MANIFESTS)))
+
+    def _put_chunks(self, name, kind, chunks, **info):
+        """Store (data, index fields) chunks and write the manifest"""
+        entries = []
+        new_bytes = 0
+        for data, fields in chunks:
+            digest, new = self.put_chunk(data)
+            new_bytes += len(data) if new else 0
+            entries.append(dict(fields, digest=digest, size=len(data)))
+        manifest = dict(info, kind=kind, chunks=entries,
+                        size=sum(entry['size'] for entry in entries), new_bytes=new_bytes)
+        return self._write_manifest(name, manifest)
+
+    def put_file(self, name, path):
+        """Store a VCD (chunked at timestamps) or any other text/log file
+
+        The file is streamed line by line, so memory stays at one chunk.
+        """
+        with open(path, 'rb') as f:
+            if not path.endswith('.vcd'):
+                return self._put_chunks(name, 'text', ((b''.join(chunk), {})
+                                                       for chunk in text_chunks(f)))
+
+            # The definitions section is one chunk; the body is cut before
+            # '#time' lines and every chunk records the first timestamp it
+            # contains. No $enddefinitions: everything is body.
+            body = 0
+            for line in f:
+                if line.lstrip().startswith(b'$enddefinitions'):
+                    body = f.tell()
+                    break
+            f.seek(0)
+            header = f.read(body)
+
+            def chunks():
+                yield header, {'start': None}
+                time = 0
+                for chunk in text_chunks(f, lambda line: line.startswith(b'#')):
+                    if chunk[0].startswith(b'#'):
+                        time = int(chunk[0][1:])
+                    yield b''.join(chunk), {'start': time}
+
+            return self._put_chunks(name, 'vcd', chunks())
+
+    def put_trace(self, name, trace, result=None, chunk=TRACE_CHUNK):
+        """Store cycle-model trace arrays (plus per-instruction timing if given)
+
+        Chunks hold a fixed number of instructions and are indexed by first
+        instruction and by the ID-exit cycle range, so traces that share a
+        prefix share chunks.
+        """
+        arrays = {key: np.asarray(values) for key, values in trace.items()}
+        if result is not None:
+            arrays.update((key, result[key]) for key in ('if_start', 'id_start', 'id_end'))
+        count = len(arrays['word'])
+
+        def chunks():
+            for first in range(0, count, chunk):
+                part = {key: values[first:first + chunk] for key, values in arrays.items()}
+                fields = {'first': first, 'count': len(part['word'])}
+                if result is not None:
+                    fields.update(start=int(part['id_end'][0]), end=int(part['id_end'][-1]))
+                yield _encode_arrays(part), fields
+
+        return self._put_chunks(name, 'trace', chunks(), instructions=count)
+
+    def read(self, name):
+        """Reassemble a stored file artifact"""
+        manifest = self.manifest(name)
+        if manifest['kind'] == 'trace':
+            return self.read_range(name)
+        return b''.join(self.get_chunk(entry['digest']) for entry in manifest['chunks'])
+
+    def _select(self, entries, start, end):
+        """Chunks whose [start, next start) range overlaps [start, end]"""
+        starts = [entry['start'] for entry in entries]
+        first = 0 if start is None else max(0, np.searchsorted(starts, start, side='right') - 1)
+        last = len(entries) if end is None else np.searchsorted(starts, end, side='right')
+        return entries[first:last]
+
+    def read_range(self, name, start=None, end=None, by='cycle'):
+        """Read only the chunks covering a range
+
+        VCDs: time range, returned as the definitions section followed by the
+        overlapping body chunks. Traces: cycle range (by='cycle', using the
+        ID-exit cycles) or instruction range (by='instruction'), returned as
+        arrays trimmed to the range.
+        """
+        manifest = self.manifest(name)
+        entries = manifest['chunks']
+        if manifest['kind'] == 'vcd':
+            header, body = entries[0], entries[1:]
+            return self.get_chunk(header['digest']) + b''.join(
+                self.get_chunk(entry['digest']) for entry in self._select(body, start, end))
+        if manifest['kind'] != 'trace':
+            raise ValueError(f"{name}: range reads need a VCD or trace artifact")
+
+        if by == 'instruction':
+            keyed = [dict(entry, start=entry['first']) for entry in entries]
+        else:
+            keyed = entries
+        selected = self._select(keyed, start, end)
+        parts = [_decode_arrays(self.get_chunk(entry['digest'])) for entry in selected]
+        if not parts:
+            return {}
+        arrays = {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+        if by == 'instruction':
+            index = np.arange(selected[0]['first'], selected[0]['first'] + len(arrays['word']))
+        else:
+            index = arrays['id_end']
+        keep = np.ones(len(index), dtype=bool)
+        if start is not None:
+            keep &= index >= start
+        if end is not None:
+            keep &= index <= end
+        return {key: values[keep] for key, values in arrays.items()}
+
+    def stats(self):
+        """Logical size of all artifacts vs unique chunk bytes stored"""
+        logical = sum(self.manifest(name)['size'] for name in self.names())
+        objects = 0
+        stored = 0
+        for directory, _, files in os.walk(os.path.join(self.root, OBJECTS)):
+            for entry in files:
+                objects += 1
+                stored += os.path.getsize(os.path.join(directory, entry))
+        return {'artifacts': len(self.names()), 'objects': objects,
+                'logical_bytes': logical, 'stored_bytes': stored}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--store', default=os.path.join(ROOT, 'build', 'trace_store'))
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    put = commands.add_parser('put', help='store VCD or log files')
+    put.add_argument('files', nargs='+')
+    put.add_argument('--prefix', default='', help='artifact name prefix, e.g. a commit id')
+
+    trace = commands.add_parser('put-trace', help='time a program and store its trace')
+    trace.add_argument('name')
+    trace.add_argument('program', help='workload name or program image')
+    trace.add_argument('--iterations', type=int)
+    trace.add_argument('--max-instructions', type=int)
+
+    get = commands.add_parser('get', help='read an artifact or a range of it')
+    get.add_argument('name')
+    get.add_argument('--start', type=int)
+    get.add_argument('--end', type=int)
+    get.add_argument('--by', choices=('cycle', 'instruction'), default='cycle')
+    get.add_argument('--output', help='write to a file instead of stdout')
+
+    commands.add_parser('stats', help='deduplication summary')
+    args = parser.parse_args()
+
+    store = TraceStore(args.store)
+    if args.command == 'put':
+        for path in args.files:
+            manifest = store.put_file(args.prefix + os.path.basename(path), path)
+            print(f"{path}: {len(manifest['chunks'])} chunks, "
+                  f"{manifest['new_bytes']} of {manifest['size']} bytes new")
+    elif args.command == 'put-trace':
+        if args.program in workloads.WORKLOADS:
+            program = words_to_bytes(workloads.load(args.program, args.iterations))
+        else:
+            program = read_image(args.program)
+        records = FunctionalSimulator(program).trace(args.max_instructions)
+        arrays = pipeline_model.trace_arrays(records)
+        manifest = store.put_trace(args.name, arrays, pipeline_model.simulate(arrays))
+        print(f"{args.name}: {manifest['instructions']} instructions, "
+              f"{len(manifest['chunks'])} chunks, {manifest['new_bytes']} of "
+              f"{manifest['size']} bytes new")
+    elif args.command == 'get':
+        if args.start is None and args.end is None:
+            data = store.read(args.name)
+        else:
+            data = store.read_range(args.name, args.start, args.end, args.by)
+        if isinstance(data, dict):
+            lines = [f"{pc:08x} {word:08x} {cycle}" for pc, word, cycle in
+                     zip(data.get('pc', []), data.get('word', []), data.get('id_end', []))]
+            data = ('\n'.join(lines) + '\n').encode()
+        if args.output:
+            with open(args.output, 'wb') as f:
+                f.write(data)
+        else:
+            os.write(1, data)
+    else:
+        stats = store.stats()
+        print("TRACE STORE")
+        print(f"  Artifacts: {stats['artifacts']}  Unique chunks: {stats['objects']}")
+        print(f"  Logical size: {stats['logical_bytes']} bytes")
+        print(f"  Stored size:  {stats['stored_bytes']} bytes "
+              f"({stats['stored_bytes'] / max(stats['logical_bytes'], 1):.1%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""
+VCD Reader and Compact Waveform Format
+Parses the value-change dumps written by the testbenches, writes them back as
+a zlib-compressed binary file (or FST through GTKWave's vcd2fst) and answers
+value-at-time queries for post-processing scripts
+"""
+
+import bisect
+import json
+import shutil
+import struct
+import subprocess
+import zlib
+from collections import namedtuple
+
+Signal = namedtuple('Signal', 'code width')
+
+COMPACT_MAGIC = b'WVC1'
+_HEADER_LENGTH = struct.Struct('<I')
+
+
+class Waveform:
+    """Signals by hierarchical name and their value changes by VCD id code
+
+    Several names may share one id code (aliased nets); changes are stored
+    once per code as parallel time and value lists. Values are the VCD
+    strings: '0'/'1'/'x'/'z' for scalars, bit strings without the 'b' for
+    vectors.
+    """
+
+    def __init__(self, timescale='1ns'):
+        self.timescale = timescale
+        self.signals = {}
+        self.changes = {}
+        self.end_time = 0
+
+    def add_signal(self, name, code, width):
+        self.signals[name] = Signal(code, width)
+        self.changes.setdefault(code, ([], []))
+
+    def history(self, name):
+        """(times, values) of a signal"""
+        return self.changes[self.signals[name].code]
+
+    def value_at(self, name, time):
+        """Value of a signal at a time, None before its first change"""
+        times, values = self.history(name)
+        index = bisect.bisect_right(times, time) - 1
+        return values[index] if index >= 0 else None
+
+    def change_count(self):
+        return sum(len(times) for times, _ in self.changes.values())
+
+
+def to_int(value):
+    """Integer of a VCD value string, None if it has x/z bits"""
+    try:
+        return int(value, 2)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_header(tokens, wave):
+    scope = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token == '$scope':
+            scope.append(tokens[i + 2])
+            i += 3
+        elif token == '$upscope':
+            scope.pop()
+            i += 1
+        elif token == '$var':
+            # $var type width code name [range] $end
+            end = tokens.index('$end', i)
+            width, code, name = int(tokens[i + 2]), tokens[i + 3], tokens[i + 4]
+            wave.add_signal('.'.join(scope + [name]), code, width)
+            i = end + 1
+        elif token == '$timescale':
+            end = tokens.index('$end', i)
+            wave.timescale = ''.join(tokens[i + 1:end])
+            i = end + 1
+        elif token.startswith('$') and token != '$end':
+            # $date, $version, $comment: skip to $end
+            i = tokens.index('$end', i) + 1
+        else:
+            i += 1
+
+
+def read_header(f):
+    """Waveform with the signals of a VCD, leaving f at the first body line"""
+    wave = Waveform()
+    header = []
+    for line in f:
+        header.extend(line.split())
+        if '$enddefinitions' in header:
+            break
+    _parse_header(header, wave)
+    return wave
+
+
+def iter_steps(lines, time=0):
+    """Stream a VCD body as (time, [(code, value), ...]) per timestamp
+
+    Changes before the first '#time' line are reported at `time`.
+    """
+    changes = []
+    for line in lines:
+        tokens = line.split()
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            first = token[0]
+            if first == '#':
+                if changes:
+                    yield time, changes
+                    changes = []
+                time = int(token[1:])
+            elif first in 'bBrR':
+                changes.append((tokens[i + 1], token[1:]))
+                i += 1
+            elif first != '$':
+                changes.append((token[1:], first))
+            i += 1
+    if changes:
+        yield time, changes
+
+
+def read_vcd(path):
+    """Parse a VCD file into a Waveform"""
+    with open(path) as f:
+        wave = read_header(f)
+
+        changes = wave.changes
+        time = 0
+        for line in f:
+            tokens = line.split()
+            i = 0
+            while i < len(tokens):
+                token = tokens[i]
+                first = token[0]
+                if first == '#':
+                    time = int(token[1:])
+                elif first in 'bBrR':
+                    entry = changes.get(tokens[i + 1])
+                    if entry is not None:
+                        entry[0].append(time)
+                        entry[1].append(token[1:])
+                    i += 1
+                elif first != '$':
+                    entry = changes.get(token[1:])
+                    if entry is not None:
+                        entry[0].append(time)
+                        entry[1].append(first)
+                i += 1
+        wave.end_time = time
+    return wave
+
+
+def write_compact(wave, path):
+    """Write a Waveform as header JSON plus a zlib-compressed change body
+
+    The body holds the delta-encoded change times of every id code as
+    little-endian uint64 followed by all values joined with newlines.
+    """
+    import numpy as np
+
+    codes = sorted(wave.changes)
+    counts = [len(wave.changes[code][0]) for code in codes]
+    header = json.dumps({
+        'timescale': wave.timescale,
+        'end_time': wave.end_time,
+        'signals': {name: [s.code, s.width] for name, s in wave.signals.items()},
+        'codes': codes,
+        'counts': counts,
+    }).encode()
+    parts = []
+    for code in codes:
+        times = np.array(wave.changes[code][0], dtype=np.uint64)
+        parts.append(np.diff(times, prepend=np.uint64(0)).astype('<u8').tobytes())
+    parts.append('\n'.join(v for code in codes for v in wave.changes[code][1]).encode())
+    with open(path, 'wb') as f:
+        f.write(COMPACT_MAGIC + _HEADER_LENGTH.pack(len(header)) + header)
+        f.write(zlib.compress(b''.join(parts), 6))
+
+
+def read_compact(path):
+    """Read a file written by write_compact back into a Waveform"""
+    import numpy as np
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != COMPACT_MAGIC:
+        raise ValueError(f"{path}: not a compact waveform file")
+    length, = _HEADER_LENGTH.unpack_from(data, 4)
+    header = json.loads(data[8:8 + length])
+    body = zlib.decompress(data[8 + length:])
+
+    wave = Waveform(header['timescale'])
+    wave.end_time = header['end_time']
+    for name, (code, width) in header['signals'].items():
+        wave.add_signal(name, code, width)
+    total = sum(header['counts'])
+    deltas = np.frombuffer(body, dtype='<u8', count=total)
+    values = body[total * 8:].decode().split('\n') if total else []
+    offset = 0
+    for code, count in zip(header['codes'], header['counts']):
+        times = np.cumsum(deltas[offset:offset + count]).tolist()
+        wave.changes[code] = (times, values[offset:offset + count])
+        offset += count
+    return wave
+
+
+def to_fst(vcd_path, fst_path):
+    """Convert a VCD to FST with GTKWave's vcd2fst"""
+    tool = shutil.which('vcd2fst')
+    if tool is None:
+        raise RuntimeError("vcd2fst (GTKWave) is required for FST output")
+    subprocess.run([tool, vcd_path, fst_path], check=True, capture_output=True)
+    return fst_path
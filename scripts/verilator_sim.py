@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Verilator Simulation Path for the RISC-V Processor Implementations
+Compiles a core with Verilator into a shared library and drives it from
+Python through ctypes: load memory images, step clocks and read the register
+file directly, without a testbench or vvp text output
+"""
+
+import argparse
+import ctypes
+import glob
+import os
+import subprocess
+import time
+
+import checkpoint
+import workloads
+from functional_sim import FunctionalSimulator
+from images import read_image
+from riscv_isa import words_to_bytes
+from rtl_sim import ROOT, RTL, SOURCES, TB
+
+HARNESS = os.path.join(TB, 'verilator', 'core_harness.cpp')
+BUILD_DIR = os.path.join(ROOT, 'build', 'verilator')
+
+# Cores whose data accesses the functional model reproduces. multi_cycle_processor
+# addresses unified_memory absolutely (data images sit at byte 4096, code at 0)
+# while the model's data memory starts at 0, so only its registers of programs
+# without loads and stores are comparable.
+ABSOLUTE_DATA_CORES = ('multi_cycle_processor',)
+
+# Preprocessor switch selecting the core in core_harness.cpp
+CORE_DEFINES = {
+    'pipelined_processor': 'CORE_PIPELINED',
+    'multi_cycle_processor': 'CORE_MULTI_CYCLE',
+    'single_cycle_processor': 'CORE_SINGLE_CYCLE',
+}
+
+VERILATOR_FLAGS = ['--cc', '--build', '-O3', '--public-flat-rw', '-Wno-fatal', '--x-assign', 'fast']
+CXXFLAGS = ['-O2', '-fPIC']
+
+_U64 = ctypes.c_uint64
+_U32 = ctypes.c_uint32
+_BYTES = ctypes.POINTER(ctypes.c_uint8)
+
+# (name, restype, argtypes) of the C interface in core_harness.cpp
+_FUNCTIONS = [
+    ('sim_new', ctypes.c_void_p, []),
+    ('sim_delete', None, [ctypes.c_void_p]),
+    ('sim_reset', None, [ctypes.c_void_p]),
+    ('sim_run', _U64, [ctypes.c_void_p, _U64, ctypes.c_int]),
+    ('sim_cycles', _U64, [ctypes.c_void_p]),
+    ('sim_get_pc', _U64, [ctypes.c_void_p]),
+    ('sim_set_pc', None, [ctypes.c_void_p, _U64]),
+    ('sim_read_regs', None, [ctypes.c_void_p, ctypes.POINTER(_U64)]),
+    ('sim_write_regs', None, [ctypes.c_void_p, ctypes.POINTER(_U64)]),
+    ('sim_read_counters', _U32, [ctypes.c_void_p, ctypes.POINTER(_U64)]),
+    ('sim_imem_size', _U32, []),
+    ('sim_dmem_size', _U32, []),
+    ('sim_write_imem', None, [ctypes.c_void_p, _U32, _BYTES, _U32]),
+    ('sim_read_imem', None, [ctypes.c_void_p, _U32, _BYTES, _U32]),
+    ('sim_write_dmem', None, [ctypes.c_void_p, _U32, _BYTES, _U32]),
+    ('sim_read_dmem', None, [ctypes.c_void_p, _U32, _BYTES, _U32]),
+]
+
+
+def _verilator_root():
+    result = subprocess.run(['verilator', '--getenv', 'VERILATOR_ROOT'],
+                            check=True, capture_output=True, text=True)
+    return result.stdout.strip()
+
+
+def library_path(core, build_dir=BUILD_DIR):
+    return os.path.join(build_dir, f'lib{core}.so')
+
+
+def build(core, build_dir=BUILD_DIR, force=False):
+    """Verilate a core and link it with the C harness into a shared library
+
+    Skips the build when the library is newer than the RTL and the harness.
+    Returns the library path.
+    """
+    sources = [os.path.join(RTL, name) for name in SOURCES[core]]
+    library = library_path(core, build_dir)
+    if not force and os.path.exists(library):
+        built = os.path.getmtime(library)
+        if all(os.path.getmtime(path) < built for path in sources + [HARNESS]):
+            return library
+
+    define = f'-D{CORE_DEFINES[core]}'
+    mdir = os.path.join(build_dir, core)
+    os.makedirs(mdir, exist_ok=True)
+    subprocess.run(['verilator'] + VERILATOR_FLAGS +
+                   ['-j', str(os.cpu_count() or 1), '--top-module', core, '--Mdir', mdir,
+                    '-CFLAGS', ' '.join(CXXFLAGS)] + sources, check=True)
+
+    # Verilator 5 archives the runtime as libverilated.a, older releases
+    # leave it as loose objects next to the model archive
+    archives = glob.glob(os.path.join(mdir, '*.a'))
+    if not any(os.path.basename(path) == 'libverilated.a' for path in archives):
+        archives += glob.glob(os.path.join(mdir, 'verilated*.o'))
+    include = os.path.join(_verilator_root(), 'include')
+    subprocess.run(['g++', '-shared', define] + CXXFLAGS +
+                   ['-I', mdir, '-I', include, '-I', os.path.join(include, 'vltstd'),
+                    HARNESS] + archives + ['-pthread', '-o', library], check=True)
+    return library
+
+
+def _buffer(data):
+    """data itself if ctypes can wrap it (writable, e.g. a copy-on-write image map), else a copy"""
+    if isinstance(data, (bytearray, memoryview)) and not memoryview(data).readonly:
+        return data
+    return bytearray(data)
+
+
+class VerilatedCore:
+    """A Verilator-compiled core instance driven through ctypes"""
+
+    _libraries = {}
+
+    def __init__(self, core, library=None):
+        library = library or library_path(core)
+        if library not in self._libraries:
+            lib = ctypes.CDLL(library)
+            for name, restype, argtypes in _FUNCTIONS:
+                function = getattr(lib, name)
+                function.restype = restype
+                function.argtypes = argtypes
+            self._libraries[library] = lib
+        self.core = core
+        self._lib = self._libraries[library]
+        self._handle = self._lib.sim_new()
+        self.imem_size = self._lib.sim_imem_size()
+        self.dmem_size = self._lib.sim_dmem_size()
+
+    def close(self):
+        if self._handle:
+            self._lib.sim_delete(self._handle)
+            self._handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def reset(self):
+        """Reset PC, pipeline state and register file; memories are kept"""
+        self._lib.sim_reset(self._handle)
+
+    def run(self, max_cycles, stop_idle=True):
+        """Clock the core; with stop_idle, stop after five all-zero fetches"""
+        return self._lib.sim_run(self._handle, max_cycles, int(stop_idle))
+
+    @property
+    def cycles(self):
+        return self._lib.sim_cycles(self._handle)
+
+    @property
+    def pc(self):
+        return self._lib.sim_get_pc(self._handle)
+
+    @pc.setter
+    def pc(self, value):
+        self._lib.sim_set_pc(self._handle, value)
+
+    @property
+    def regs(self):
+        values = (_U64 * 32)()
+        self._lib.sim_read_regs(self._handle, values)
+        return list(values)
+
+    @regs.setter
+    def regs(self, values):
+        self._lib.sim_write_regs(self._handle, (_U64 * 32)(*values))
+
+    def read_counters(self):
+        """Hardware performance counter values (empty if the core has none)"""
+        values = (_U64 * 32)()
+        count = self._lib.sim_read_counters(self._handle, values)
+        return list(values[:count])
+
+    def _transfer(self, function, offset, data):
+        buffer = (ctypes.c_uint8 * len(data)).from_buffer(data)
+        function(self._handle, offset, buffer, len(data))
+
+    def load_program(self, data, offset=0):
+        """Copy program bytes (or a list of instruction words) into instruction memory"""
+        if isinstance(data, (list, tuple)):
+            data = words_to_bytes(data)
+        self._transfer(self._lib.sim_write_imem, offset, _buffer(data))
+
+    def load_data(self, data, offset=0):
+        """Copy bytes into data memory"""
+        self._transfer(self._lib.sim_write_dmem, offset, _buffer(data))
+
+    def read_program(self, offset=0, length=None):
+        data = bytearray(self.imem_size - offset if length is None else length)
+        self._transfer(self._lib.sim_read_imem, offset, data)
+        return bytes(data)
+
+    def read_data(self, offset=0, length=None):
+        data = bytearray(self.dmem_size - offset if length is None else length)
+        self._transfer(self._lib.sim_read_dmem, offset, data)
+        return bytes(data)
+
+    def restore(self, directory):
+        """Resume from an architectural checkpoint written by checkpoint.py"""
+        sim = checkpoint.load(directory)
+        self.load_program(sim.imem[:self.imem_size])
+        self.reset()
+        self.load_data(sim.dmem[:self.dmem_size])
+        self.regs = sim.regs
+        self.pc = sim.pc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('program', nargs='?', default='tb_program',
+                        help='program image ($readmemh bytes) or workload name')
+    parser.add_argument('--core', choices=sorted(CORE_DEFINES), default='pipelined_processor')
+    parser.add_argument('--iterations', type=int, help='iteration count for a workload')
+    parser.add_argument('--data', help='initial data memory image')
+    parser.add_argument('--checkpoint', help='resume from a checkpoint directory instead')
+    parser.add_argument('--max-cycles', type=int, default=10000000)
+    parser.add_argument('--rebuild', action='store_true')
+    args = parser.parse_args()
+
+    library = build(args.core, force=args.rebuild)
+    with VerilatedCore(args.core, library) as core:
+        if args.checkpoint:
+            core.restore(args.checkpoint)
+            golden = checkpoint.load(args.checkpoint)
+        else:
+            if args.program in workloads.WORKLOADS:
+                program = workloads.load(args.program, args.iterations)
+            else:
+                program = read_image(args.program)
+            dmem = read_image(args.data, core.dmem_size, writable=True) if args.data else None
+            core.load_program(program)
+            core.reset()
+            if dmem:
+                core.load_data(dmem)
+            golden = FunctionalSimulator(program, bytearray(dmem) if dmem else None)
+
+        start = time.perf_counter()
+        cycles = core.run(args.max_cycles)
+        elapsed = time.perf_counter() - start
+        regs, pc = core.regs, core.pc
+
+    print(f"VERILATOR SIMULATION ({args.core})")
+    print(f"\nCycles: {cycles} in {elapsed:.3f} s ({cycles / elapsed / 1e6:.2f} MHz)")
+    print(f"Final PC: 0x{pc:x}")
+
+    if cycles < args.max_cycles:
+        instructions = golden.run()
+        mismatches = [i for i in range(32) if regs[i] != golden.regs[i]]
+        print(f"Instructions: {instructions} (CPI {cycles / max(instructions, 1):.2f})")
+        print(f"Registers vs functional model: "
+              f"{'match' if not mismatches else f'{len(mismatches)} mismatches'}")
+        for i in mismatches:
+            print(f"  x{i:<2} rtl={regs[i]:#x} expected={golden.regs[i]:#x}")
+        if args.core in ABSOLUTE_DATA_CORES:
+            print("  Note: this core addresses data absolutely in unified_memory, so the "
+                  "comparison\n  is only valid for programs without loads and stores")
+    else:
+        print("Cycle budget exhausted before the program finished")
+
+
+if __name__ == '__main__':
+    main()
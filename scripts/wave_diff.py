@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Waveform and Retire-Trace Diff for Regression Triage
+Streams two VCDs side by side and reports the first divergence of every
+signal, aligned by time or by a retired-instruction counter. Matching
+regions are skipped by comparing content-defined chunk hashes (their value
+changes only update the starting state); retire traces in the trace store
+are compared through the chunk digests of their manifests
+"""
+
+import argparse
+import hashlib
+import itertools
+
+import numpy as np
+
+import vcd
+from trace_store import TraceStore, _decode_arrays, text_chunks
+
+CLOCK_PERIOD = 10              # testbench clk toggles every #5
+INSTRET = 'dut.perf.instret'   # retired-instruction counter of pipelined_processor
+
+
+def _is_time(line):
+    return line.startswith(b'#')
+
+
+def skip_matching(lines_a, lines_b):
+    """Drop the chunks both bodies share
+
+    Returns (chunks skipped, {code: value} at the end of the skipped
+    chunks, remaining lines of a, remaining lines of b). Chunks are cut
+    before '#time' lines, so the remainders start at a timestamp at or
+    before the first difference; the skipped value changes are still
+    applied to the returned state, which both dumps share.
+    """
+    chunks_a = text_chunks(lines_a, _is_time)
+    chunks_b = text_chunks(lines_b, _is_time)
+    skipped = 0
+    state = {}
+    for chunk_a, chunk_b in itertools.zip_longest(chunks_a, chunks_b, fillvalue=[]):
+        if chunk_a and chunk_b and hashlib.sha256(b''.join(chunk_a)).digest() == \
+                hashlib.sha256(b''.join(chunk_b)).digest():
+            skipped += 1
+            for _, changes in vcd.iter_steps(line.decode() for line in chunk_a):
+                state.update(changes)
+            continue
+        rest_a = itertools.chain(chunk_a, itertools.chain.from_iterable(chunks_a))
+        rest_b = itertools.chain(chunk_b, itertools.chain.from_iterable(chunks_b))
+        return skipped, state, rest_a, rest_b
+    return skipped, state, iter(()), iter(())
+
+
+def samples(steps, names, key=None):
+    """Stream (key, time, {name: value}) from iter_steps output
+
+    Without a key signal every timestamp is a sample keyed by its time.
+    With one, a sample is taken each time the key signal changes and holds
+    the values changed since the previous sample.
+    """
+    pending = {}
+    for time, changes in steps:
+        changed_key = None
+        for code, value in changes:
+            for name in names.get(code, ()):
+                pending[name] = value
+                if name == key:
+                    changed_key = value
+        if key is None:
+            yield time, time, pending
+            pending = {}
+        elif vcd.to_int(changed_key) is not None:
+            # An x/z counter (before reset) does not start a sample
+            yield vcd.to_int(changed_key), time, pending
+            pending = {}
+
+
+def first_divergence(samples_a, samples_b, signals, initial=None):
+    """First sample at which each signal differs between the two streams
+
+    Both streams start from the {name: value} state `initial` (the values
+    of skipped matching chunks). Returns {name: (key, time a, time b,
+    value a, value b)}; stops early once every signal has diverged.
+    """
+    current_a, current_b = dict(initial or {}), dict(initial or {})
+    diverged = {}
+    end = (float('inf'), None, {})
+    sample_a = next(samples_a, end)
+    sample_b = next(samples_b, end)
+    time_a = time_b = None
+    while sample_a is not end or sample_b is not end:
+        key = min(sample_a[0], sample_b[0])
+        changed = set()
+        if sample_a[0] == key:
+            _, time_a, values = sample_a
+            current_a.update(values)
+            changed.update(values)
+            sample_a = next(samples_a, end)
+        if sample_b[0] == key:
+            _, time_b, values = sample_b
+            current_b.update(values)
+            changed.update(values)
+            sample_b = next(samples_b, end)
+        for name in changed:
+            if name not in diverged and current_a.get(name) != current_b.get(name):
+                diverged[name] = (key, time_a, time_b, current_a.get(name), current_b.get(name))
+        if len(diverged) == len(signals):
+            break
+    return diverged
+
+
+def diff_vcd(path_a, path_b, prefixes=(), key=None):
+    """First divergences between two VCDs
+
+    Signals are matched by hierarchical name, optionally limited to names
+    starting with one of `prefixes`. Returns (divergences, compared signal
+    count, chunks skipped).
+    """
+    with open(path_a, 'rb') as file_a, open(path_b, 'rb') as file_b:
+        waves = []
+        for f in (file_a, file_b):
+            waves.append(vcd.read_header(line.decode() for line in iter(f.readline, b'')))
+        wave_a, wave_b = waves
+        common = [name for name in wave_a.signals if name in wave_b.signals and
+                  (not prefixes or name.startswith(tuple(prefixes)) or name == key)]
+        if key is not None and key not in common:
+            raise ValueError(f"key signal {key} is not in both dumps")
+
+        # Chunk hashes only line up when both dumps use the same id codes
+        same_codes = all(wave_a.signals[name].code == wave_b.signals[name].code
+                         for name in common)
+        if same_codes:
+            skipped, state, rest_a, rest_b = skip_matching(file_a, file_b)
+        else:
+            skipped, state, rest_a, rest_b = 0, {}, file_a, file_b
+        initial = {name: state[wave_a.signals[name].code] for name in common
+                   if wave_a.signals[name].code in state}
+
+        streams = []
+        for wave, rest in ((wave_a, rest_a), (wave_b, rest_b)):
+            names = {}
+            for name in common:
+                names.setdefault(wave.signals[name].code, []).append(name)
+            steps = vcd.iter_steps(line.decode() for line in rest)
+            streams.append(samples(steps, names, key))
+        signals = [name for name in common if name != key]
+        return first_divergence(*streams, signals, initial), len(signals), skipped
+
+
+def diff_traces(store, name_a, name_b):
+    """First divergence of each field of two stored retire traces
+
+    Chunks with equal digests at the same position are skipped without
+    being read. Returns ({field: (instruction, value a, value b)}, chunks
+    skipped).
+    """
+    chunks_a = store.manifest(name_a)['chunks']
+    chunks_b = store.manifest(name_b)['chunks']
+    diverged = {}
+    skipped = 0
+    for entry_a, entry_b in zip(chunks_a, chunks_b):
+        if entry_a['digest'] == entry_b['digest']:
+            skipped += 1
+            continue
+        arrays_a = _decode_arrays(store.get_chunk(entry_a['digest']))
+        arrays_b = _decode_arrays(store.get_chunk(entry_b['digest']))
+        for field in arrays_a.keys() & arrays_b.keys():
+            if field in diverged:
+                continue
+            a, b = arrays_a[field], arrays_b[field]
+            length = min(len(a), len(b))
+            mismatch = np.flatnonzero(a[:length] != b[:length])
+            if len(mismatch):
+                index = mismatch[0]
+                diverged[field] = (entry_a['first'] + int(index), int(a[index]), int(b[index]))
+    if len(chunks_a) != len(chunks_b) or chunks_a[-1:] and \
+            chunks_a[-1]['count'] != chunks_b[-1]['count']:
+        count_a = sum(entry['count'] for entry in chunks_a)
+        count_b = sum(entry['count'] for entry in chunks_b)
+        diverged.setdefault('length', (min(count_a, count_b), count_a, count_b))
+    return diverged, skipped
+
+
+def _format(value):
+    number = vcd.to_int(value) if isinstance(value, str) else value
+    if number is None:
+        return '-' if value is None else value
+    return f'0x{number:x}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('a', help='reference VCD, or trace name with --store')
+    parser.add_argument('b', help='VCD or trace name to compare against it')
+    parser.add_argument('--signals', nargs='*', default=[],
+                        help='only compare names starting with these prefixes')
+    parser.add_argument('--align', choices=('cycle', 'instruction'), default='cycle')
+    parser.add_argument('--key', help=f'retire counter for --align instruction '
+                                      f'(default <tb>.{INSTRET})')
+    parser.add_argument('--period', type=int, default=CLOCK_PERIOD, help='clock period')
+    parser.add_argument('--store', help='compare retire traces of this trace store')
+    args = parser.parse_args()
+
+    if args.store:
+        diverged, skipped = diff_traces(TraceStore(args.store), args.a, args.b)
+        print(f"RETIRE TRACE DIFF ({skipped} matching chunks skipped)")
+        if not diverged:
+            print("  Traces are identical")
+        print(f"\n{'Field':<12} {'Instruction':>12} {'A':>12} {'B':>12}")
+        for field, (index, a, b) in sorted(diverged.items(), key=lambda item: item[1][0]):
+            show = _format if field in ('pc', 'word', 'next_pc') else str
+            print(f"{field:<12} {index:>12} {show(a):>12} {show(b):>12}")
+        return
+
+    key = None
+    if args.align == 'instruction':
+        key = args.key
+        if key is None:
+            with open(args.a) as f:
+                root = next(iter(vcd.read_header(f).signals)).split('.')[0]
+            key = f'{root}.{INSTRET}'
+    diverged, compared, skipped = diff_vcd(args.a, args.b, args.signals, key)
+
+    print(f"WAVEFORM DIFF ({compared} signals, {skipped} matching chunks skipped)")
+    if not diverged:
+        print("  No divergence")
+        return
+    position = 'Instret' if key else 'Cycle'
+    print(f"\n{'Signal':<48} {position:>8} {'Time A':>8} {'Time B':>8} {'A':>18} {'B':>18}")
+    for name, (at, time_a, time_b, a, b) in sorted(diverged.items(),
+                                                    key=lambda item: (item[1][0], item[0])):
+        at = at if key else at // args.period
+        print(f"{name:<48} {at:>8} {time_a if time_a is not None else '-':>8} "
+              f"{time_b if time_b is not None else '-':>8} {_format(a):>18} {_format(b):>18}")
+
+
+if __name__ == '__main__':
+    main()
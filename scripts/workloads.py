@@ -0,0 +1,171 @@
+"""
+Benchmark Programs for the RISC-V Processor Implementations
+Assembly kernels restricted to what the RTL cores execute (R-type, I-type
+ALU, LD, SD and BEQ), parameterized by iteration count
+"""
+
+from riscv_isa import assemble
+
+# Test program from tb/pipelined_processor_tb.v
+TB_PROGRAM = """
+    addi x1, x0, 10
+    addi x2, x0, 20
+    add  x3, x1, x2       # EX hazard - forward from MEM
+    sub  x4, x3, x1       # forward from MEM and WB
+    and  x5, x3, x2
+    or   x6, x1, x2
+    sd   x1, 0(x0)
+    sd   x2, 8(x0)
+    ld   x7, 0(x0)
+    add  x8, x7, x1       # load-use hazard
+"""
+
+# Fill {n} doublewords starting at address 0 with their index
+ARRAY_INIT = """
+    addi x5, x0, {n}
+    addi x10, x0, 0
+    addi x6, x0, 0
+loop:
+    sd   x6, 0(x10)
+    addi x6, x6, 1
+    addi x10, x10, 8
+    addi x5, x5, -1
+    beq  x5, x0, done
+    beq  x0, x0, loop
+done:
+"""
+
+# Copy {n} doublewords from address 0 to address 4096
+MEMCPY = """
+    addi x5, x0, {n}
+    addi x10, x0, 0
+    addi x11, x0, 2047
+    addi x11, x11, 2047
+    addi x11, x11, 2
+loop:
+    ld   x6, 0(x10)
+    sd   x6, 0(x11)
+    addi x10, x10, 8
+    addi x11, x11, 8
+    addi x5, x5, -1
+    beq  x5, x0, done
+    beq  x0, x0, loop
+done:
+"""
+
+# Sum an {n}-element array; every load feeds the next instruction
+ARRAY_SUM = """
+    addi x5, x0, {n}
+    addi x10, x0, 0
+    addi x7, x0, 0
+loop:
+    ld   x6, 0(x10)
+    add  x7, x7, x6
+    addi x10, x10, 8
+    addi x5, x5, -1
+    beq  x5, x0, done
+    beq  x0, x0, loop
+done:
+    sd   x7, 2040(x0)
+"""
+
+# Data-dependent control flow: count odd and even loop indices
+BRANCHY = """
+    addi x5, x0, {n}
+    addi x8, x0, 0
+    addi x9, x0, 0
+loop:
+    andi x6, x5, 1
+    beq  x6, x0, even
+    addi x8, x8, 1
+    beq  x0, x0, next
+even:
+    addi x9, x9, 1
+next:
+    slt  x7, x9, x8
+    beq  x7, x0, skip
+    or   x10, x8, x9
+skip:
+    addi x5, x5, -1
+    beq  x5, x0, done
+    beq  x0, x0, loop
+done:
+"""
+
+# Back-to-back dependent ALU operations (forwarding stress)
+DEPENDENCY_CHAIN = """
+    addi x5, x0, {n}
+    addi x1, x0, 1
+loop:
+    add  x2, x1, x1
+    sub  x3, x2, x1
+    add  x1, x3, x2
+    and  x4, x1, x3
+    or   x1, x4, x1
+    addi x5, x5, -1
+    beq  x5, x0, done
+    beq  x0, x0, loop
+done:
+"""
+
+# Alternates between store-, load- and ALU-bound phases {n} times
+PHASES = """
+    addi x20, x0, {n}
+outer:
+    addi x5, x0, 200
+    addi x10, x0, 0
+init:
+    sd   x5, 0(x10)
+    addi x10, x10, 8
+    addi x5, x5, -1
+    beq  x5, x0, sum
+    beq  x0, x0, init
+sum:
+    addi x5, x0, 200
+    addi x10, x0, 0
+sumloop:
+    ld   x6, 0(x10)
+    add  x7, x7, x6
+    addi x10, x10, 8
+    addi x5, x5, -1
+    beq  x5, x0, alu
+    beq  x0, x0, sumloop
+alu:
+    addi x5, x0, 400
+aluloop:
+    add  x8, x8, x7
+    or   x9, x8, x5
+    slt  x11, x9, x8
+    addi x5, x5, -1
+    beq  x5, x0, next
+    beq  x0, x0, aluloop
+next:
+    addi x20, x20, -1
+    beq  x20, x0, done
+    beq  x0, x0, outer
+done:
+"""
+
+# name -> (source, default iteration count)
+WORKLOADS = {
+    'tb_program': (TB_PROGRAM, None),
+    'array_init': (ARRAY_INIT, 256),
+    'memcpy': (MEMCPY, 256),
+    'array_sum': (ARRAY_SUM, 255),
+    'branchy': (BRANCHY, 1000),
+    'dependency_chain': (DEPENDENCY_CHAIN, 1000),
+    'phases': (PHASES, 100),
+}
+
+
+def source(name, n=None):
+    """Assembly text of a workload with its iteration count filled in"""
+    text, default = WORKLOADS[name]
+    if default is None:
+        return text
+    return text.format(n=default if n is None else n)
+
+
+def load(name, n=None):
+    """Assembled instruction words of a workload"""
+    return assemble(source(name, n))
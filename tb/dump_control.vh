@@ -0,0 +1,89 @@
+    // Selective waveform dumping, included in the body of a testbench module.
+    //
+    // Define before the include:
+    //   DUMP_DEFAULT_FILE  VCD written when +DUMP_FILE is not given
+    //   DUMP_ROOT          scope dumped when no scope list is compiled in
+    //   DUMP_PC            expression giving the fetch PC
+    //   DUMP_STALL         expression that is true while the pipeline stalls
+    //   DUMP_OPT_IN        (optional) dump only when +DUMP_FILE is given
+    //
+    // Scopes and signals are chosen at compile time: building with
+    // -DDUMP_SCOPES and a dump_scopes.vh on the include path (written by
+    // scripts/dump_runner.py) replaces the full $dumpvars of DUMP_ROOT.
+    //
+    // The dump window is chosen at run time with plusargs:
+    //   +NODUMP                no waveform at all
+    //   +DUMP_FILE=<path>      output file
+    //   +DUMP_START=<n>        first cycle after reset that may be dumped
+    //   +DUMP_END=<n>          cycle at which dumping stops for good
+    //   +DUMP_PC=<hex>         open the window when the fetch PC matches
+    //   +DUMP_STALL            open the window at the first stall
+    //   +DUMP_CYCLES=<n>       window length after a PC/stall trigger (default 100)
+    // Without a trigger the window is [DUMP_START, DUMP_END).
+
+    reg [8*256-1:0] dump_file;
+    reg [63:0] dump_pc;
+    integer dump_start;
+    integer dump_end;
+    integer dump_cycles;
+    integer dump_cycle;
+    integer dump_close;
+    reg dump_enabled;
+    reg dump_on_pc;
+    reg dump_on_stall;
+    reg dump_active;
+    reg dump_done;
+
+    initial begin
+`ifdef DUMP_OPT_IN
+        dump_enabled = $test$plusargs("DUMP_FILE");
+`else
+        dump_enabled = !$test$plusargs("NODUMP");
+`endif
+        if (!$value$plusargs("DUMP_FILE=%s", dump_file))
+            dump_file = `DUMP_DEFAULT_FILE;
+        if (!$value$plusargs("DUMP_START=%d", dump_start))
+            dump_start = 0;
+        if (!$value$plusargs("DUMP_END=%d", dump_end))
+            dump_end = -1;
+        if (!$value$plusargs("DUMP_CYCLES=%d", dump_cycles))
+            dump_cycles = 100;
+        dump_on_pc = $value$plusargs("DUMP_PC=%h", dump_pc);
+        dump_on_stall = $test$plusargs("DUMP_STALL");
+        dump_cycle = 0;
+        dump_close = -1;
+        dump_active = 0;
+        dump_done = 0;
+
+        if (dump_enabled) begin
+            $dumpfile(dump_file);
+`ifdef DUMP_SCOPES
+`include "dump_scopes.vh"
+`else
+            $dumpvars(0, `DUMP_ROOT);
+`endif
+            $dumpoff;
+        end
+    end
+
+    always @(posedge clk) begin
+        if (dump_enabled && !reset && !dump_done) begin
+            if (!dump_active) begin
+                if (dump_cycle >= dump_start &&
+                    (dump_on_pc || dump_on_stall
+                        ? (dump_on_pc && `DUMP_PC == dump_pc) || (dump_on_stall && `DUMP_STALL)
+                        : 1'b1)) begin
+                    dump_active = 1;
+                    dump_close = (dump_on_pc || dump_on_stall) ? dump_cycle + dump_cycles : dump_end;
+                    if (dump_end >= 0 && (dump_close < 0 || dump_close > dump_end))
+                        dump_close = dump_end;
+                    $dumpon;
+                end
+            end else if (dump_close >= 0 && dump_cycle >= dump_close) begin
+                dump_active = 0;
+                dump_done = 1;
+                $dumpoff;
+            end
+            dump_cycle = dump_cycle + 1;
+        end
+    end
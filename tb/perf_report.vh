@@ -0,0 +1,18 @@
+    // Prints the perf_counters block of a pipelined_processor instance as
+    // "PERF <name> <value>" lines, parsed by scripts/perf_counters.py.
+    // Included in the body of a testbench module; the instance is `PERF_DUT.
+
+    task perf_report;
+        begin
+            $display("PERF cycles %0d", `PERF_DUT.perf.cycles);
+            $display("PERF instret %0d", `PERF_DUT.perf.instret);
+            $display("PERF load_use_stalls %0d", `PERF_DUT.perf.load_use_stalls);
+            $display("PERF branch_flushes %0d", `PERF_DUT.perf.branch_flushes);
+            $display("PERF forwardA_mem %0d", `PERF_DUT.perf.forwardA_mem);
+            $display("PERF forwardA_wb %0d", `PERF_DUT.perf.forwardA_wb);
+            $display("PERF forwardB_mem %0d", `PERF_DUT.perf.forwardB_mem);
+            $display("PERF forwardB_wb %0d", `PERF_DUT.perf.forwardB_wb);
+            $display("PERF mem_reads %0d", `PERF_DUT.perf.mem_reads);
+            $display("PERF mem_writes %0d", `PERF_DUT.perf.mem_writes);
+        end
+    endtask
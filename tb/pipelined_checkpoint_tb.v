@@ -0,0 +1,102 @@
+`define DUMP_DEFAULT_FILE "pipelined_checkpoint.vcd"
+`define DUMP_ROOT pipelined_checkpoint_tb
+`define DUMP_PC dut.pc
+`define DUMP_STALL dut.stall
+`define DUMP_OPT_IN
+`define PERF_DUT dut
+
+module pipelined_checkpoint_tb;
+
+    // Runs a program on pipelined_processor starting from a checkpoint
+    // produced by scripts/checkpoint.py instead of from reset state.
+    //
+    // Plusargs:
+    //   +IMEM_FILE=<path>   program image ($readmemh bytes)
+    //   +REGS_FILE=<path>   register file image (32 x 64-bit words)
+    //   +DMEM_FILE=<path>   data memory image ($readmemh bytes)
+    //   +PC=<hex>           architectural PC to resume from
+    //   +CYCLES=<n>         cycle budget (default 100000)
+    //   +DUMP_FILE=<path>   write a waveform; windows as in dump_control.vh
+
+    reg clk;
+    reg reset;
+
+    reg [8*256-1:0] imem_file;
+    reg [8*256-1:0] regs_file;
+    reg [8*256-1:0] dmem_file;
+    reg [63:0] start_pc;
+    integer max_cycles;
+    integer cycle_count;
+    integer idle_cycles;
+    integer i;
+
+    pipelined_processor dut (
+        .clk(clk),
+        .reset(reset)
+    );
+
+    // Clock generation
+    initial begin
+        clk = 0;
+        forever #5 clk = ~clk;
+    end
+
+`include "dump_control.vh"
+`include "perf_report.vh"
+
+    initial begin
+        start_pc = 64'b0;
+        max_cycles = 100000;
+        if (!$value$plusargs("CYCLES=%d", max_cycles))
+            max_cycles = 100000;
+
+        // Wait for memory to be initialized
+        #1;
+
+        if ($value$plusargs("IMEM_FILE=%s", imem_file)) begin
+            $readmemh(imem_file, dut.imem.memory);
+        end else begin
+            $display("ERROR: +IMEM_FILE=<program image> is required");
+            $finish;
+        end
+
+        cycle_count = 0;
+        idle_cycles = 0;
+
+        // Reset clears the pipeline registers, register file and PC
+        reset = 1;
+        #19;
+        reset = 0;
+
+        // Restore architectural state before the first active clock edge
+        if ($value$plusargs("REGS_FILE=%s", regs_file))
+            $readmemh(regs_file, dut.reg_file.registers);
+        if ($value$plusargs("DMEM_FILE=%s", dmem_file))
+            $readmemh(dmem_file, dut.dmem.memory);
+        if ($value$plusargs("PC=%h", start_pc))
+            dut.PC = start_pc;
+
+        $display("Resuming at PC=%h", dut.PC);
+    end
+
+    // Run until the budget is spent or the pipeline drains at the end of
+    // the program (five consecutive all-zero fetches)
+    always @(posedge clk) begin
+        if (!reset) begin
+            cycle_count = cycle_count + 1;
+            idle_cycles = (dut.if_instruction == 32'b0) ? idle_cycles + 1 : 0;
+
+            if (cycle_count >= max_cycles || idle_cycles >= 5) begin
+                #1;
+                $display("\n========== CHECKPOINT RUN RESULTS ==========");
+                $display("CYCLES %0d", cycle_count);
+                $display("PC %h", dut.PC);
+                for (i = 0; i < 32; i = i + 1)
+                    $display("REG x%0d %h", i, dut.reg_file.registers[i]);
+                perf_report;
+                $finish;
+            end
+        end
+    end
+
+endmodule
@@ -1,11 +1,15 @@
+`define DUMP_DEFAULT_FILE "pipelined_processor.vcd"
+`define DUMP_ROOT pipelined_processor_tb
+`define DUMP_PC dut.pc
+`define DUMP_STALL dut.stall
+`define PERF_DUT dut
+
 module pipelined_processor_tb;
 
     reg clk;
     reg reset;
     
     integer cycle_count;
-    integer stall_count;
-    integer forward_count;
     integer i;
     
     pipelined_processor dut (
@@ -18,12 +22,13 @@ module pipelined_processor_tb;
         clk = 0;
         forever #5 clk = ~clk;
     end
+
+    // Waveform dump (see dump_control.vh for the plusargs)
+`include "dump_control.vh"
+`include "perf_report.vh"
     
     // Load test program into instruction memory
     initial begin
-        $dumpfile("pipelined_processor.vcd");
-        $dumpvars(0, pipelined_processor_tb);
-        
         // Wait for memory to be initialized
         #1;
         
@@ -134,8 +139,6 @@ module pipelined_processor_tb;
         
         // Initialize counters
         cycle_count = 0;
-        stall_count = 0;
-        forward_count = 0;
         
         // Reset
         reset = 1;
@@ -166,11 +169,15 @@ module pipelined_processor_tb;
                 {dut.dmem.memory[15], dut.dmem.memory[14], dut.dmem.memory[13], dut.dmem.memory[12],
                  dut.dmem.memory[11], dut.dmem.memory[10], dut.dmem.memory[9], dut.dmem.memory[8]});
         
-        $display("\nPerformance Metrics:");
-        $display("  Total cycles: %0d", cycle_count);
-        $display("  Stalls: %0d", stall_count);
-        $display("  Forwards: %0d", forward_count);
-        $display("  CPI: %.2f", $itor(cycle_count) / 10.0);
+        $display("\nPerformance Metrics (perf_counters):");
+        $display("  Total cycles: %0d", dut.perf.cycles);
+        $display("  Instructions: %0d", dut.perf.instret);
+        $display("  Stalls: %0d", dut.perf.load_use_stalls);
+        $display("  Forwards: A=%0d/%0d B=%0d/%0d (MEM/WB)",
+                dut.perf.forwardA_mem, dut.perf.forwardA_wb,
+                dut.perf.forwardB_mem, dut.perf.forwardB_wb);
+        $display("  CPI: %.2f", $itor(dut.perf.cycles) / $itor(dut.perf.instret));
+        perf_report;
         
         // Check correctness
         $display("\n========== TEST RESULTS ==========");
@@ -199,7 +206,6 @@ module pipelined_processor_tb;
     // Monitor stalls
     always @(posedge clk) begin
         if (!reset && dut.stall) begin
-            stall_count = stall_count + 1;
             $display("  >>> STALL at cycle %0d", cycle_count);
         end
     end
@@ -208,7 +214,6 @@ module pipelined_processor_tb;
     always @(posedge clk) begin
         if (!reset) begin
             if (dut.forwardA != 2'b00 || dut.forwardB != 2'b00) begin
-                forward_count = forward_count + 1;
                 $display("  >>> FORWARD at cycle %0d:", cycle_count);
                 if (dut.forwardA == 2'b01)
                     $display("      ForwardA=MEM: rs1=x%0d, MEM_rd=x%0d, value=%0d", 
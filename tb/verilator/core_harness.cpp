@@ -0,0 +1,234 @@
+// C interface to a Verilator model of one processor core, loaded by
+// scripts/verilator_sim.py through ctypes.
+//
+// Build with exactly one of -DCORE_PIPELINED, -DCORE_MULTI_CYCLE or
+// -DCORE_SINGLE_CYCLE and verilate the core with --public-flat-rw so the
+// memories, register file and PC are reachable through rootp.
+//
+// Memory images are byte addressed and little-endian for every core; the
+// accessors below map them onto each core's storage (byte arrays for the
+// multi-cycle and pipelined cores, 32/64-bit word arrays for single-cycle).
+
+#include <cstdint>
+
+#include "verilated.h"
+
+#if defined(CORE_PIPELINED)
+#include "Vpipelined_processor.h"
+#include "Vpipelined_processor___024root.h"
+typedef Vpipelined_processor Top;
+typedef Vpipelined_processor___024root Root;
+#define IMEM_SIZE 4096
+#define DMEM_SIZE 8192
+#define REGS(r) (r)->pipelined_processor__DOT__reg_file__DOT__registers
+#define PC(r) (r)->pipelined_processor__DOT__PC
+static uint8_t imem_read(Root* r, uint32_t a) {
+    return r->pipelined_processor__DOT__imem__DOT__memory[a];
+}
+static void imem_write(Root* r, uint32_t a, uint8_t v) {
+    r->pipelined_processor__DOT__imem__DOT__memory[a] = v;
+}
+static uint8_t dmem_read(Root* r, uint32_t a) {
+    return r->pipelined_processor__DOT__dmem__DOT__memory[a];
+}
+static void dmem_write(Root* r, uint32_t a, uint8_t v) {
+    r->pipelined_processor__DOT__dmem__DOT__memory[a] = v;
+}
+// perf_counters, in the port order of rtl/perf_counters.v
+#define NUM_COUNTERS 10
+static void read_counters(Root* r, uint64_t* c) {
+    c[0] = r->pipelined_processor__DOT__perf__DOT__cycles;
+    c[1] = r->pipelined_processor__DOT__perf__DOT__instret;
+    c[2] = r->pipelined_processor__DOT__perf__DOT__load_use_stalls;
+    c[3] = r->pipelined_processor__DOT__perf__DOT__branch_flushes;
+    c[4] = r->pipelined_processor__DOT__perf__DOT__forwardA_mem;
+    c[5] = r->pipelined_processor__DOT__perf__DOT__forwardA_wb;
+    c[6] = r->pipelined_processor__DOT__perf__DOT__forwardB_mem;
+    c[7] = r->pipelined_processor__DOT__perf__DOT__forwardB_wb;
+    c[8] = r->pipelined_processor__DOT__perf__DOT__mem_reads;
+    c[9] = r->pipelined_processor__DOT__perf__DOT__mem_writes;
+}
+
+#elif defined(CORE_MULTI_CYCLE)
+#include "Vmulti_cycle_processor.h"
+#include "Vmulti_cycle_processor___024root.h"
+typedef Vmulti_cycle_processor Top;
+typedef Vmulti_cycle_processor___024root Root;
+// unified_memory: instructions at 0, data at DATA_BASE. The dmem accessors
+// place data images where unified_memory's $readmemh puts data_memory.hex,
+// but the core itself addresses memory absolutely through ALUOut: ld 0(x0)
+// reads instruction bytes and stores below DATA_BASE overwrite the program.
+// The functional model's 0-based data memory therefore only matches this
+// core for programs that do not touch memory.
+#define IMEM_SIZE 4096
+#define DMEM_SIZE 8192
+#define DATA_BASE 4096
+#define REGS(r) (r)->multi_cycle_processor__DOT__reg_file__DOT__registers
+#define PC(r) (r)->multi_cycle_processor__DOT__PC
+static uint8_t imem_read(Root* r, uint32_t a) {
+    return r->multi_cycle_processor__DOT__memory__DOT__memory[a];
+}
+static void imem_write(Root* r, uint32_t a, uint8_t v) {
+    r->multi_cycle_processor__DOT__memory__DOT__memory[a] = v;
+}
+static uint8_t dmem_read(Root* r, uint32_t a) {
+    return r->multi_cycle_processor__DOT__memory__DOT__memory[DATA_BASE + a];
+}
+static void dmem_write(Root* r, uint32_t a, uint8_t v) {
+    r->multi_cycle_processor__DOT__memory__DOT__memory[DATA_BASE + a] = v;
+}
+
+#elif defined(CORE_SINGLE_CYCLE)
+#include "Vsingle_cycle_processor.h"
+#include "Vsingle_cycle_processor___024root.h"
+typedef Vsingle_cycle_processor Top;
+typedef Vsingle_cycle_processor___024root Root;
+// instruction_fetch holds 1024 x 32-bit words, memory 1024 x 64-bit words
+#define IMEM_SIZE 4096
+#define DMEM_SIZE 8192
+#define REGS(r) (r)->single_cycle_processor__DOT__id_stage__DOT__registers
+#define PC(r) (r)->single_cycle_processor__DOT__if_stage__DOT__pc_current
+static uint8_t imem_read(Root* r, uint32_t a) {
+    return r->single_cycle_processor__DOT__if_stage__DOT__instr_mem[a >> 2] >> ((a & 3) * 8);
+}
+static void imem_write(Root* r, uint32_t a, uint8_t v) {
+    IData& word = r->single_cycle_processor__DOT__if_stage__DOT__instr_mem[a >> 2];
+    int shift = (a & 3) * 8;
+    word = (word & ~(0xFFu << shift)) | (IData(v) << shift);
+}
+static uint8_t dmem_read(Root* r, uint32_t a) {
+    return r->single_cycle_processor__DOT__mem_stage__DOT__mem[a >> 3] >> ((a & 7) * 8);
+}
+static void dmem_write(Root* r, uint32_t a, uint8_t v) {
+    QData& word = r->single_cycle_processor__DOT__mem_stage__DOT__mem[a >> 3];
+    int shift = (a & 7) * 8;
+    word = (word & ~(0xFFull << shift)) | (QData(v) << shift);
+}
+
+#else
+#error "define CORE_PIPELINED, CORE_MULTI_CYCLE or CORE_SINGLE_CYCLE"
+#endif
+
+#ifndef NUM_COUNTERS
+#define NUM_COUNTERS 0
+static void read_counters(Root*, uint64_t*) {}
+#endif
+
+// Same end-of-program rule as the testbenches: consecutive all-zero fetches
+#define IDLE_LIMIT 5
+
+struct Sim {
+    VerilatedContext* context;
+    Top* top;
+    uint64_t cycles;
+};
+
+static void tick(Sim* sim) {
+    sim->top->clk = 1;
+    sim->top->eval();
+    sim->top->clk = 0;
+    sim->top->eval();
+}
+
+static uint32_t fetch_word(Sim* sim) {
+    Root* r = sim->top->rootp;
+    uint64_t pc = PC(r);
+    if (pc + 4 > IMEM_SIZE) return 0;
+    uint32_t a = (uint32_t)pc;
+    return imem_read(r, a) | (imem_read(r, a + 1) << 8) |
+           (imem_read(r, a + 2) << 16) | ((uint32_t)imem_read(r, a + 3) << 24);
+}
+
+extern "C" {
+
+Sim* sim_new(void) {
+    Sim* sim = new Sim;
+    sim->context = new VerilatedContext;
+    sim->top = new Top(sim->context);
+    sim->cycles = 0;
+    sim->top->clk = 0;
+    sim->top->reset = 1;
+    sim->top->eval();
+    return sim;
+}
+
+void sim_delete(Sim* sim) {
+    sim->top->final();
+    delete sim->top;
+    delete sim->context;
+    delete sim;
+}
+
+// Hold reset for two clock edges; clears PC, pipeline and register file
+// but leaves the memories intact
+void sim_reset(Sim* sim) {
+    sim->top->reset = 1;
+    tick(sim);
+    tick(sim);
+    sim->top->reset = 0;
+    sim->top->eval();
+    sim->cycles = 0;
+}
+
+// Run up to max_cycles clock cycles; with stop_idle, stop once IDLE_LIMIT
+// consecutive cycles fetched a zero word. Returns the cycles executed.
+uint64_t sim_run(Sim* sim, uint64_t max_cycles, int stop_idle) {
+    uint64_t executed = 0;
+    int idle = 0;
+    while (executed < max_cycles) {
+        if (stop_idle) {
+            idle = fetch_word(sim) ? 0 : idle + 1;
+            if (idle > IDLE_LIMIT) break;
+        }
+        tick(sim);
+        executed++;
+    }
+    sim->cycles += executed;
+    return executed;
+}
+
+uint64_t sim_cycles(Sim* sim) { return sim->cycles; }
+
+uint64_t sim_get_pc(Sim* sim) { return PC(sim->top->rootp); }
+
+void sim_set_pc(Sim* sim, uint64_t pc) { PC(sim->top->rootp) = pc; }
+
+void sim_read_regs(Sim* sim, uint64_t* regs) {
+    for (int i = 0; i < 32; i++) regs[i] = REGS(sim->top->rootp)[i];
+}
+
+void sim_write_regs(Sim* sim, const uint64_t* regs) {
+    for (int i = 0; i < 32; i++) REGS(sim->top->rootp)[i] = regs[i];
+}
+
+// Copies the hardware performance counters; returns how many the core has
+uint32_t sim_read_counters(Sim* sim, uint64_t* counters) {
+    read_counters(sim->top->rootp, counters);
+    return NUM_COUNTERS;
+}
+
+uint32_t sim_imem_size(void) { return IMEM_SIZE; }
+
+uint32_t sim_dmem_size(void) { return DMEM_SIZE; }
+
+void sim_write_imem(Sim* sim, uint32_t offset, const uint8_t* data, uint32_t length) {
+    for (uint32_t i = 0; i < length && offset + i < IMEM_SIZE; i++)
+        imem_write(sim->top->rootp, offset + i, data[i]);
+}
+
+void sim_read_imem(Sim* sim, uint32_t offset, uint8_t* data, uint32_t length) {
+    for (uint32_t i = 0; i < length && offset + i < IMEM_SIZE; i++)
+        data[i] = imem_read(sim->top->rootp, offset + i);
+}
+
+void sim_write_dmem(Sim* sim, uint32_t offset, const uint8_t* data, uint32_t length) {
+    for (uint32_t i = 0; i < length && offset + i < DMEM_SIZE; i++)
+        dmem_write(sim->top->rootp, offset + i, data[i]);
+}
+
+void sim_read_dmem(Sim* sim, uint32_t offset, uint8_t* data, uint32_t length) {
+    for (uint32_t i = 0; i < length && offset + i < DMEM_SIZE; i++)
+        data[i] = dmem_read(sim->top->rootp, offset + i);
+}
+
+}  // extern "C"